@@ -1,17 +1,28 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Response, g, jsonify, request
 from flask_cors import CORS
 from routes.claims_routes import claims_bp
 from routes.eligibility_routes import eligibility_bp
 from routes.recommendations_routes import recommendations_bp
+from routes.jobs_routes import jobs_bp
+from utils.blob_store import BlobUploadRequest
+from utils.job_queue import job_workers
+from utils import telemetry
+from utils.metrics import HTTP_REQUEST_DURATION, registry as metrics_registry
 import logging
 import os
+import time
 
 app = Flask(__name__)
+# Multipart file parts are streamed to the blob store's temp dir and hashed as they arrive
+app.request_class = BlobUploadRequest
 CORS(app)  # Enable CORS for all domains on all routes
 
 # Configure file uploads
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+# Max request size; a batch upload carries many files in one request
+app.config['MAX_CONTENT_LENGTH'] = int(os.getenv('MAX_UPLOAD_MB', '128')) * 1024 * 1024
 app.config['UPLOAD_FOLDER'] = os.path.join(os.path.dirname(__file__), 'uploads')
+# Behind nginx/Apache, hand document downloads to the proxy via X-Sendfile instead of streaming them from Python
+app.config['USE_X_SENDFILE'] = os.getenv('USE_X_SENDFILE', 'false').lower() == 'true'
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -21,6 +32,31 @@ logger = logging.getLogger(__name__)
 app.register_blueprint(claims_bp, url_prefix='/api/claims')
 app.register_blueprint(eligibility_bp, url_prefix='/api/eligibility')
 app.register_blueprint(recommendations_bp, url_prefix='/api/recommendations')
+app.register_blueprint(jobs_bp, url_prefix='/api/jobs')
+
+@app.before_request
+def start_job_workers():
+    # Started on first request so only serving processes (not the debug reloader) run workers
+    job_workers.ensure_started()
+
+@app.before_request
+def sample_telemetry():
+    # Head-based sampling: one decision per request, per endpoint rate
+    telemetry.begin_request(request.endpoint)
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request_latency(response):
+    start = g.pop('request_start', None)
+    if start is not None:
+        # Label by route template, not raw path, so ids don't explode the series count
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        HTTP_REQUEST_DURATION.observe(time.perf_counter() - start, method=request.method,
+                                      route=route, status=response.status_code)
+    return response
 
 @app.route('/', methods=['GET'])
 def health_check():
@@ -30,15 +66,24 @@ def health_check():
         'version': '1.0.0'
     }), 200
 
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus scrape endpoint: per-stage and per-route latency histograms"""
+    return Response(metrics_registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 @app.route('/api/status', methods=['GET'])
 def api_status():
     return jsonify({
         'api_status': 'active',
         'available_endpoints': [
             '/api/claims/validate',
+            '/api/claims/upload/batch',
+            '/api/claims/<claim_id>/similar',
             '/api/eligibility/check',
             '/api/recommendations/generate',
-            '/api/integration/status'
+            '/api/integration/status',
+            '/api/jobs/<job_id>',
+            '/metrics'
         ]
     }), 200
 
@@ -56,6 +101,12 @@ def integration_status():
         # Check Opik status
         opik_status = processor.get_opik_status()
         
+        # Check LLM provider circuit breaker
+        llm_status = processor.get_llm_status()
+        scheduler_status = processor.get_scheduler_status()
+        cascade_status = processor.get_cascade_status()
+        reference_status = processor.get_reference_status()
+        
         return jsonify({
             'langgraph': {
                 'available': langgraph_status['available'],
@@ -65,8 +116,13 @@ def integration_status():
             'opik': {
                 'available': opik_status['available'],
                 'client_initialized': opik_status['client_initialized'],
-                'project_name': opik_status.get('project_name')
+                'project_name': opik_status.get('project_name'),
+                'telemetry': opik_status.get('telemetry')
             },
+            'llm_circuit': llm_status,
+            'llm_scheduler': scheduler_status,
+            'adjudication_cascade': cascade_status,
+            'reference_claims': reference_status,
             'processing': {
                 'method': langgraph_status['processing_method'],
                 'ai_model': 'gpt-4o-mini',
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Interactive LLM latency while a batch run saturates the provider rate limit
+
+Runs against the local fake OpenAI server configured with a requests-per-second
+limit (429 + Retry-After once exceeded). Three phases, each measuring latency of
+interactive calls made every INTERACTIVE_INTERVAL seconds:
+  1. idle        - interactive calls only
+  2. unscheduled - batch flood with the scheduler disabled (everyone races into 429s)
+  3. scheduled   - batch flood at BATCH priority through the scheduler
+
+Expected: interactive p95 in phase 3 stays close to phase 1, while phase 2 climbs.
+"""
+
+import os
+import time
+import threading
+
+PROVIDER_RPS = 10
+# Scheduler sized to the fake provider's limit; set before the client reads them
+os.environ.setdefault('LLM_REQUESTS_PER_MINUTE', str(PROVIDER_RPS * 60))
+os.environ.setdefault('LLM_BURST_SECONDS', '1')
+os.environ.setdefault('LLM_INTERACTIVE_RESERVE', '0.3')
+os.environ.setdefault('LLM_MAX_RETRIES', '8')
+os.environ.setdefault('LLM_RETRY_BASE_DELAY', '0.05')
+os.environ.setdefault('LLM_RETRY_MAX_DELAY', '1')
+os.environ.setdefault('LLM_CIRCUIT_FAILURE_THRESHOLD', '1000')
+
+from fake_openai_server import start_server
+
+server, faults, BASE_URL = start_server(latency=0.05, rate_limit=PROVIDER_RPS, rate_window=1.0)
+
+from utils.llm_client import get_http_client
+from utils.llm_scheduler import BATCH, INTERACTIVE, llm_priority, llm_scheduler
+
+PHASE_SECONDS = 8
+BATCH_WORKERS = 16
+INTERACTIVE_INTERVAL = 0.4
+CHAT_REQUEST = {"model": "gpt-4o-mini", "max_tokens": 200, "messages": [{"role": "user", "content": "analyze this claim"}]}
+
+
+def chat(priority):
+    start = time.perf_counter()
+    with llm_priority(priority):
+        response = get_http_client().post(f"{BASE_URL}/chat/completions", json=CHAT_REQUEST)
+    return response.status_code, time.perf_counter() - start
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+
+def run_phase(name, batch_workers, scheduler_enabled):
+    llm_scheduler.enabled = scheduler_enabled
+    faults.update({"reset_counters": True})
+    time.sleep(1.0)  # let the provider window and the buckets refill between phases
+    stop = time.monotonic() + PHASE_SECONDS
+    batch_done = []
+
+    def batch_worker():
+        while time.monotonic() < stop:
+            status, _ = chat(BATCH)
+            if status == 200:
+                batch_done.append(1)
+
+    workers = [threading.Thread(target=batch_worker, daemon=True) for _ in range(batch_workers)]
+    for worker in workers:
+        worker.start()
+
+    latencies, failures = [], 0
+    while time.monotonic() < stop:
+        status, seconds = chat(INTERACTIVE)
+        latencies.append(seconds)
+        failures += status != 200
+        time.sleep(INTERACTIVE_INTERVAL)
+    for worker in workers:
+        worker.join()
+
+    counters = faults.snapshot()
+    print(f"{name:<12} {percentile(latencies, 0.5) * 1000:>8.0f}ms {percentile(latencies, 0.95) * 1000:>8.0f}ms "
+          f"{failures:>9} {len(batch_done) / PHASE_SECONDS:>12.1f}/s {counters['rate_limited']:>12}")
+    return percentile(latencies, 0.95)
+
+
+if __name__ == '__main__':
+    print(f"⏱️  Interactive latency under batch load (provider limit {PROVIDER_RPS} req/s, {BATCH_WORKERS} batch workers)")
+    print()
+    print(f"{'phase':<12} {'p50':>10} {'p95':>10} {'failed':>9} {'batch rate':>14} {'429s':>12}")
+    print("-" * 72)
+    idle = run_phase("idle", 0, True)
+    unscheduled = run_phase("unscheduled", BATCH_WORKERS, False)
+    scheduled = run_phase("scheduled", BATCH_WORKERS, True)
+    print()
+    print(f"📈 Interactive p95: idle {idle * 1000:.0f}ms, without scheduler {unscheduled * 1000:.0f}ms, "
+          f"with scheduler {scheduled * 1000:.0f}ms")
+    print(f"📊 Scheduler: {llm_scheduler.status()['priorities']}")
+    server.shutdown()
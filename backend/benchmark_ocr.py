@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Benchmark the OCR subsystem against the test-claims samples rendered to images
+
+Compares:
+  1. baseline  - raw pytesseract.image_to_string on each page, sequentially
+  2. pool_cold - OCREngine (preprocessing + process pool), empty cache
+  3. pool_warm - OCREngine again on the same files (content-hash cache hits)
+
+Requires Tesseract plus pdf2image/poppler to render the PDFs:
+    pip install pdf2image
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+from PIL import Image
+import pytesseract
+
+from utils.ocr_engine import OCREngine
+
+TEST_CLAIMS_DIR = os.path.join(os.path.dirname(__file__), '..', 'test-claims')
+RENDER_DPI = 300
+
+
+def render_samples(output_dir):
+    """Render every test-claims PDF to a multi-page TIFF"""
+    try:
+        from pdf2image import convert_from_path
+    except ImportError:
+        print("❌ pdf2image is required to render the sample PDFs: pip install pdf2image")
+        sys.exit(1)
+
+    samples = []
+    for name in sorted(os.listdir(TEST_CLAIMS_DIR)):
+        if not name.lower().endswith('.pdf'):
+            continue
+        pages = convert_from_path(os.path.join(TEST_CLAIMS_DIR, name), dpi=RENDER_DPI)
+        tiff_path = os.path.join(output_dir, name[:-4] + '.tiff')
+        pages[0].save(tiff_path, save_all=True, append_images=pages[1:], dpi=(RENDER_DPI, RENDER_DPI))
+        samples.append((name, tiff_path, len(pages)))
+    return samples
+
+
+def run_baseline(tiff_path):
+    start = time.perf_counter()
+    image = Image.open(tiff_path)
+    for frame in range(getattr(image, 'n_frames', 1)):
+        image.seek(frame)
+        pytesseract.image_to_string(image)
+    return time.perf_counter() - start
+
+
+def run_engine(engine, tiff_path):
+    start = time.perf_counter()
+    engine.ocr_file(tiff_path)
+    return time.perf_counter() - start
+
+
+def main():
+    work_dir = tempfile.mkdtemp(prefix='ocr_bench_')
+    try:
+        print(f"🖼️  Rendering test-claims PDFs at {RENDER_DPI} DPI...")
+        samples = render_samples(work_dir)
+
+        engine = OCREngine(cache_dir=os.path.join(work_dir, 'cache'))
+        print(f"⚙️  OCR pool workers: {engine.max_workers}, target DPI: {engine.target_dpi}")
+        print()
+        print(f"{'sample':<45} {'pages':>5} {'baseline':>10} {'pool_cold':>10} {'pool_warm':>10}")
+        print("-" * 84)
+
+        totals = [0.0, 0.0, 0.0]
+        for name, tiff_path, page_count in samples:
+            baseline = run_baseline(tiff_path)
+            cold = run_engine(engine, tiff_path)
+            warm = run_engine(engine, tiff_path)
+            for i, value in enumerate((baseline, cold, warm)):
+                totals[i] += value
+            print(f"{name:<45} {page_count:>5} {baseline:>9.2f}s {cold:>9.2f}s {warm:>9.3f}s")
+
+        print("-" * 84)
+        print(f"{'TOTAL':<45} {'':>5} {totals[0]:>9.2f}s {totals[1]:>9.2f}s {totals[2]:>9.3f}s")
+        if totals[1]:
+            print(f"\n✅ Cold speedup vs baseline: {totals[0] / totals[1]:.2f}x")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
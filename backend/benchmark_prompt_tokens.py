@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Measure prompt tokens per LLM call for the test-claims samples, before and after
+prompt compaction
+
+For each sample it builds the prompts the pipeline sends and counts tokens:
+  1. analysis    - claim analysis prompt (document + reference standards)
+  2. suggestions - improvement suggestions prompt (analysis result JSON)
+  3. comparison  - detailed comparison prompt (document + all reference claims)
+
+"before" reproduces the previous inputs: raw document text cut at 4000 characters
+(the comparison sent it whole), verbose reference text, and the full analysis
+result as indented JSON including raw_llm_response. "after" uses the token budget
+layer. The analysis result used for the suggestions prompt comes from the
+rule-based CMS-1500 extractor, with raw_llm_response filled in the way the LLM
+path fills it. No LLM calls are made.
+"""
+
+import os
+import sys
+import json
+
+# The processor needs a key to construct its client; nothing is sent
+os.environ.setdefault('OPENAI_API_KEY', 'sk-offline-benchmark')
+
+from utils.document_processor import DocumentProcessor
+from utils.prompt import (
+    CLAIMS_ANALYSIS_PROMPT_TEMPLATE,
+    IMPROVEMENT_SUGGESTIONS_PROMPT,
+    DOCUMENT_COMPARISON_PROMPT,
+    TOKEN_BUDGET_CONFIG
+)
+from utils.token_budget import _get_encoding, compact_json, compact_text, count_tokens, truncate_to_tokens
+
+TEST_CLAIMS_DIR = os.path.join(os.path.dirname(__file__), '..', 'test-claims')
+LEGACY_MAX_CHARS = 4000
+
+
+def sample_analysis_result(processor, document_text):
+    extraction = processor.cms1500_extractor.extract(document_text)
+    result = processor._build_rule_result(extraction["fields"], [])
+    result["raw_llm_response"] = json.dumps(result, indent=2)
+    result["trace_id"] = "00000000-0000-0000-0000-000000000000"
+    return result
+
+
+def before_prompts(processor, document_text, analysis_result):
+    truncated = document_text
+    if len(truncated) > LEGACY_MAX_CHARS:
+        truncated = truncated[:LEGACY_MAX_CHARS] + f"\n[DOCUMENT TRUNCATED - SHOWING FIRST {LEGACY_MAX_CHARS} CHARACTERS]"
+    return {
+        'analysis': CLAIMS_ANALYSIS_PROMPT_TEMPLATE.format(
+            document_text=truncated,
+            claim_type='medical_claim',
+            reference_document=processor.reference_documents['medical_claim']
+        ),
+        'suggestions': IMPROVEMENT_SUGGESTIONS_PROMPT.format(analysis_results=json.dumps(analysis_result, indent=2)),
+        'comparison': DOCUMENT_COMPARISON_PROMPT.format(
+            document_text=document_text,
+            reference_claims=json.dumps(processor.reference_documents, indent=2)
+        )
+    }
+
+
+def after_prompts(processor, document_text, analysis_result):
+    budgeted = truncate_to_tokens(compact_text(document_text), TOKEN_BUDGET_CONFIG["max_document_tokens"])
+    relevant = {key: analysis_result.get(key) for key in TOKEN_BUDGET_CONFIG["suggestion_input_fields"]}
+    return {
+        'analysis': CLAIMS_ANALYSIS_PROMPT_TEMPLATE.format(
+            document_text=budgeted,
+            claim_type='medical_claim',
+            reference_document=compact_text(processor.reference_documents['medical_claim'])
+        ),
+        'suggestions': IMPROVEMENT_SUGGESTIONS_PROMPT.format(analysis_results=compact_json(relevant)),
+        'comparison': DOCUMENT_COMPARISON_PROMPT.format(
+            document_text=budgeted,
+            reference_claims=compact_json({
+                claim_type: compact_text(reference) for claim_type, reference in processor.reference_documents.items()
+            })
+        )
+    }
+
+
+def main():
+    processor = DocumentProcessor()
+    samples = sorted(name for name in os.listdir(TEST_CLAIMS_DIR) if name.lower().endswith('.pdf'))
+    if not samples:
+        print("❌ No PDF samples found in test-claims/")
+        sys.exit(1)
+
+    counter = "tiktoken" if _get_encoding(TOKEN_BUDGET_CONFIG["model"]) is not None else "~4 chars/token estimate"
+    print(f"🧮 Prompt tokens per call ({counter})")
+    print()
+    calls = ('analysis', 'suggestions', 'comparison')
+    print(f"{'sample':<42} " + " ".join(f"{call:>21}" for call in calls))
+    print(f"{'':<42} " + " ".join(f"{'before→after':>21}" for _ in calls))
+    print("-" * 108)
+
+    totals = {call: [0, 0] for call in calls}
+    for name in samples:
+        document_text = processor.extract_text_from_file(os.path.join(TEST_CLAIMS_DIR, name), 'pdf')
+        analysis_result = sample_analysis_result(processor, document_text)
+        before = before_prompts(processor, document_text, analysis_result)
+        after = after_prompts(processor, document_text, analysis_result)
+
+        cells = []
+        for call in calls:
+            tokens_before, tokens_after = count_tokens(before[call]), count_tokens(after[call])
+            totals[call][0] += tokens_before
+            totals[call][1] += tokens_after
+            cells.append(f"{tokens_before:>9} → {tokens_after:<9}")
+        print(f"{name:<42} " + " ".join(f"{cell:>21}" for cell in cells))
+
+    print("-" * 108)
+    print(f"{'TOTAL':<42} " + " ".join(f"{f'{b} → {a}':>21}" for b, a in totals.values()))
+    print()
+    all_before = sum(b for b, _ in totals.values())
+    all_after = sum(a for _, a in totals.values())
+    for call, (tokens_before, tokens_after) in totals.items():
+        if tokens_before:
+            print(f"   {call:<12} {100 * (1 - tokens_after / tokens_before):5.1f}% fewer prompt tokens")
+    if all_before:
+        print(f"\n✅ Overall prompt-token reduction: {100 * (1 - all_after / all_before):.1f}%")
+
+
+if __name__ == '__main__':
+    main()
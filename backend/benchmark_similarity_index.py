@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Search latency of the similar-claim index (exact blocked scan) by index size and
+vector dimension
+
+Fills a temporary SimilarityIndex with random unit vectors (scan cost depends on
+rows x dim, not on the values) and times search(k=10) for random queries. The
+scan is memory-bandwidth bound; pin BLAS threads to compare single-core numbers:
+    OPENBLAS_NUM_THREADS=1 OMP_NUM_THREADS=1 python benchmark_similarity_index.py
+"""
+
+import os
+import time
+import shutil
+import argparse
+import tempfile
+
+import numpy as np
+
+from utils.similarity_index import SIMILARITY_INDEX_DIM, SimilarityIndex
+
+FILL_BLOCK_ROWS = 100_000
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark similar-claim index search latency")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000], help="index sizes")
+    parser.add_argument("--dims", type=int, nargs="+", default=[SIMILARITY_INDEX_DIM, 512], help="vector dimensions")
+    parser.add_argument("--queries", type=int, default=30, help="searches timed per configuration")
+    parser.add_argument("--k", type=int, default=10)
+    return parser.parse_args()
+
+
+def fill(index, rows, rng):
+    """Append rows random unit vectors directly to the mapped files"""
+    index._open(rows)
+    for start in range(0, rows, FILL_BLOCK_ROWS):
+        end = min(start + FILL_BLOCK_ROWS, rows)
+        block = rng.standard_normal((end - start, index.dim), dtype=np.float32)
+        index._vectors[start:end] = block / np.linalg.norm(block, axis=1, keepdims=True)
+        index._doc_ids[start:end] = np.arange(start + 1, end + 1)
+    index._vectors.flush()
+    index._doc_ids.flush()
+    index.count = rows
+    index._write_meta()
+
+
+def time_searches(index, queries, k, rng):
+    index.search(rng.standard_normal(index.dim, dtype=np.float32), k)  # warm the page cache
+    timings = []
+    for _ in range(queries):
+        query = rng.standard_normal(index.dim, dtype=np.float32)
+        query /= np.linalg.norm(query)
+        start = time.perf_counter()
+        index.search(query, k)
+        timings.append((time.perf_counter() - start) * 1000)
+    return np.percentile(timings, 50), np.percentile(timings, 95)
+
+
+def main():
+    args = parse_args()
+    rng = np.random.default_rng(7)
+    threads = os.getenv('OPENBLAS_NUM_THREADS') or os.getenv('OMP_NUM_THREADS') or 'default'
+    print(f"🔎 Similar-claim index search, k={args.k}, {args.queries} queries per row "
+          f"({os.cpu_count()} CPUs, BLAS threads: {threads})")
+    print()
+    print(f"{'rows':>10} {'dim':>5} {'size':>10} {'p50':>10} {'p95':>10}")
+
+    for dim in dict.fromkeys(args.dims):
+        for rows in args.rows:
+            work_dir = tempfile.mkdtemp(prefix='similarity_bench_')
+            try:
+                index = SimilarityIndex(work_dir, dim=dim)
+                fill(index, rows, rng)
+                p50, p95 = time_searches(index, args.queries, args.k, rng)
+                size_mb = rows * (4 * dim + 8) / 1e6
+                print(f"{rows:>10,} {dim:>5} {size_mb:>8.0f}MB {p50:>8.1f}ms {p95:>8.1f}ms")
+            finally:
+                shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+End-to-end /api/claims/upload benchmark without OpenAI
+
+Uploads the test-claims PDFs through the Flask app (202 + job polling) and
+reports per-document latency, so the full flow can run in CI and perf tests:
+
+  LLM_PROVIDER=stub    (default) starts the fake OpenAI server in-process with a
+                       lognormal latency distribution, unless LLM_STUB_URL is set
+  LLM_PROVIDER=replay  answers from the recorded cassette (LLM_CASSETTE_PATH),
+                       with the recorded timing unless LLM_REPLAY_TIMING=none
+  LLM_PROVIDER=record  real OpenAI calls, saved to the cassette for later replays
+
+The database is created in a temporary directory; uploaded files still land in
+backend/uploads like any other upload. Exits non-zero if any job fails.
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+TEST_CLAIMS_DIR = os.path.join(BACKEND_DIR, '..', 'test-claims')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the /upload flow against an offline LLM")
+    parser.add_argument("--repeat", type=int, default=3, help="uploads per sample document")
+    parser.add_argument("--latency", type=float, default=1.2, help="stub median latency (seconds)")
+    parser.add_argument("--sigma", type=float, default=0.4, help="stub lognormal sigma")
+    parser.add_argument("--timeout", type=float, default=300, help="seconds to wait for all jobs")
+    return parser.parse_args()
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+
+def main():
+    args = parse_args()
+    os.environ.setdefault('LLM_PROVIDER', 'stub')
+    stub_server = None
+    if os.environ['LLM_PROVIDER'] == 'stub' and 'LLM_STUB_URL' not in os.environ:
+        from fake_openai_server import start_server
+        stub_server, _, stub_url = start_server(latency=args.latency, latency_dist="lognormal", jitter=args.sigma)
+        os.environ['LLM_STUB_URL'] = stub_url
+        print(f"🧪 Stub LLM at {stub_url} (lognormal, median {args.latency}s, sigma {args.sigma})")
+
+    sys.path.insert(0, BACKEND_DIR)
+    os.chdir(tempfile.mkdtemp(prefix='claims-bench-'))  # database/claims_ai.db is created here
+    from app import app
+    from utils.llm_scheduler import llm_scheduler
+    from utils.token_budget import prompt_token_log
+
+    samples = sorted(name for name in os.listdir(TEST_CLAIMS_DIR) if name.lower().endswith('.pdf'))
+    if not samples:
+        print("❌ No PDF samples found in test-claims/")
+        sys.exit(1)
+
+    client = app.test_client()
+    print(f"📤 Uploading {len(samples)} samples x {args.repeat} (LLM_PROVIDER={os.environ['LLM_PROVIDER']})")
+    jobs = {}
+    start = time.perf_counter()
+    for name in samples * args.repeat:
+        with open(os.path.join(TEST_CLAIMS_DIR, name), 'rb') as f:
+            response = client.post('/api/claims/upload', data={'document': (f, name), 'claim_type': 'medical_claim'},
+                                   content_type='multipart/form-data')
+        if response.status_code != 202:
+            print(f"❌ {name}: upload returned {response.status_code} {response.get_json()}")
+            sys.exit(1)
+        jobs[response.get_json()['job_id']] = (name, time.perf_counter())
+
+    latencies, failures, methods = [], [], {}
+    deadline = time.monotonic() + args.timeout
+    while jobs and time.monotonic() < deadline:
+        for job_id, (name, submitted) in list(jobs.items()):
+            job = client.get(f'/api/jobs/{job_id}').get_json()
+            if job['status'] not in ('succeeded', 'failed'):
+                continue
+            del jobs[job_id]
+            latencies.append(time.perf_counter() - submitted)
+            if job['status'] == 'failed':
+                failures.append(f"{name}: {job.get('error')}")
+                continue
+            analysis = job['result'].get('document_analysis', {})
+            method = analysis.get('processing_method', 'unknown')
+            methods[method] = methods.get(method, 0) + 1
+            if analysis.get('overall_status') == 'ERROR':
+                failures.append(f"{name}: {analysis.get('processing_notes')}")
+        time.sleep(0.1)
+    elapsed = time.perf_counter() - start
+
+    print()
+    print(f"⏱️  {len(latencies)} jobs in {elapsed:.1f}s ({len(latencies) / elapsed:.2f} docs/s)")
+    print(f"   upload → result latency p50 {percentile(latencies, 0.5):.2f}s, "
+          f"p95 {percentile(latencies, 0.95):.2f}s, max {max(latencies, default=0):.2f}s")
+    print(f"   processing methods: {methods}")
+    print(f"   prompt tokens: {prompt_token_log.summary()}")
+    print(f"   scheduler: {llm_scheduler.status()['priorities']['interactive']}")
+    if stub_server:
+        stub_server.shutdown()
+
+    if jobs:
+        failures.append(f"{len(jobs)} jobs did not finish within {args.timeout:.0f}s")
+    if failures:
+        print(f"\n❌ {len(failures)} failures:")
+        for failure in failures:
+            print(f"   {failure}")
+        sys.exit(1)
+    print("\n✅ All uploads analyzed")
+
+
+if __name__ == '__main__':
+    main()
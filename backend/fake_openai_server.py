@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+Local fake OpenAI-compatible server - the LLM stand-in for benchmarks, load tests
+and exercising the LLM client under failure (LLM_PROVIDER=stub)
+
+Serves POST /v1/chat/completions (plain and stream=true). Each prompt the backend
+sends (claim analysis, field extraction, suggestions, comparison) gets a canned
+response of the right shape. Timing and faults:
+  --latency SECONDS     delay per request, drawn from --latency-dist:
+                          fixed       latency + uniform(0, jitter)
+                          normal      mean latency, standard deviation jitter
+                          lognormal   median latency, sigma jitter (long tail, like a real API)
+                          exponential mean latency
+  --chunk-delay SECONDS pause between streamed chunks
+  --error-rate RATE     fraction of requests answered with --error-status
+  --fail-first N        the first N requests fail with --error-status
+  --hang-rate RATE      fraction of requests that never answer (client timeout)
+  --rate-limit N        at most N requests per --rate-window seconds, then 429
+  --malformed-rate RATE fraction of analysis responses returned as near-miss JSON
+                        (code fence, trailing comma, an invalid completeness_score)
+
+Faults can be changed at runtime: POST /_control with a JSON body of the same
+settings (latency, latency_dist, jitter, chunk_delay, error_rate, error_status,
+fail_first, hang_rate, rate_limit, rate_window, malformed_rate), and GET /_control returns the
+settings plus request counters.
+
+Run it and point the backend at it:
+    python fake_openai_server.py --port 8100 --latency 1.2 --latency-dist lognormal --jitter 0.4
+    LLM_PROVIDER=stub LLM_STUB_URL=http://127.0.0.1:8100/v1 python app.py
+"""
+
+import re
+import json
+import math
+import time
+import random
+import argparse
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CANNED_ANALYSIS = {
+    "overall_status": "APPROVED",
+    "decision_reasoning": "All required fields present (fake server response).",
+    "key_factors": ["Fake OpenAI server"],
+    "completeness_score": 100,
+    "missing_sections": [],
+    "found_sections": ["patient_information", "provider_information", "service_details"],
+    "data_quality_issues": [],
+    "validation_errors": [],
+    "recommendations": [],
+    "extracted_data": {"patient_name": "JANE DOE", "service_type": "medical_claim"},
+    "confidence_level": 90,
+    "processing_notes": "Generated by fake_openai_server.py"
+}
+
+CANNED_SUGGESTIONS = {
+    "suggestions": [
+        "Attach the physician notes supporting medical necessity",
+        "Include the prior authorization number for the billed procedure"
+    ]
+}
+
+CANNED_COMPARISON = {
+    "best_match_type": "medical_claim",
+    "match_score": 85,
+    "compliance_gaps": ["Supporting documentation not referenced"],
+    "recommendations": ["Reference the attached lab results in the claim"]
+}
+
+LATENCY_DISTRIBUTIONS = ("fixed", "normal", "lognormal", "exponential")
+
+
+def completion_for(body):
+    """Canned response content matching the prompt the backend sent"""
+    prompt = "\n".join(
+        message.get("content") if isinstance(message.get("content"), str) else json.dumps(message.get("content"))
+        for message in body.get("messages", [])
+    )
+    if "Re-extract only the listed fields" in prompt:
+        fields = prompt.split("FIELDS:", 1)[-1].split("PREVIOUS ANALYSIS", 1)[0]
+        return json.dumps({name: CANNED_ANALYSIS.get(name) for name in re.findall(r"^- (\w+):", fields, re.MULTILINE)})
+    if "Extract only the requested fields" in prompt:
+        fields = prompt.split("FIELDS:", 1)[-1].split("DOCUMENT:", 1)[0]
+        return json.dumps({name: None for name in re.findall(r"^- (\w+)\s*$", fields, re.MULTILINE)})
+    if "improvement suggestions" in prompt:
+        return json.dumps(CANNED_SUGGESTIONS)
+    if "Compare the claim document" in prompt:
+        return json.dumps(CANNED_COMPARISON)
+    return json.dumps(CANNED_ANALYSIS)
+
+
+def malformed_analysis():
+    """Analysis JSON with the near-misses models produce: fenced, trailing comma, a bad field"""
+    body = json.dumps(dict(CANNED_ANALYSIS, completeness_score="mostly complete"), indent=2)
+    return "```json\n" + body[:-2] + ",\n}\n```"
+
+
+class FaultSettings:
+    """Fault injection settings and counters shared by all handler threads"""
+
+    FIELDS = ("latency", "latency_dist", "jitter", "chunk_delay", "error_rate", "error_status",
+              "fail_first", "hang_rate", "rate_limit", "rate_window", "malformed_rate")
+
+    def __init__(self, latency=0.0, latency_dist="fixed", jitter=0.0, chunk_delay=0.0, error_rate=0.0,
+                 error_status=503, fail_first=0, hang_rate=0.0, rate_limit=0, rate_window=60.0,
+                 malformed_rate=0.0):
+        if latency_dist not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution: {latency_dist}")
+        self._lock = threading.Lock()
+        self.latency = latency
+        self.latency_dist = latency_dist
+        self.jitter = jitter
+        self.chunk_delay = chunk_delay
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.fail_first = fail_first
+        self.hang_rate = hang_rate
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.malformed_rate = malformed_rate
+        self._window = deque()
+        self.requests = 0
+        self.errors = 0
+        self.rate_limited = 0
+
+    def update(self, values):
+        with self._lock:
+            for field in self.FIELDS:
+                if field in values:
+                    setattr(self, field, type(getattr(self, field))(values[field]))
+            if values.get("reset_counters"):
+                self.requests = 0
+                self.errors = 0
+                self.rate_limited = 0
+                self._window.clear()
+
+    def next_fault(self):
+        """Decide the fate of one request: None, "error", "hang" or ("rate_limited", retry_after)"""
+        with self._lock:
+            self.requests += 1
+            if self.rate_limit > 0:
+                now = time.monotonic()
+                while self._window and now - self._window[0] >= self.rate_window:
+                    self._window.popleft()
+                if len(self._window) >= self.rate_limit:
+                    self.rate_limited += 1
+                    return "rate_limited", self.rate_window - (now - self._window[0])
+                self._window.append(now)
+            if self.fail_first > 0:
+                self.fail_first -= 1
+                self.errors += 1
+                return "error"
+            roll = random.random()
+            if roll < self.hang_rate:
+                return "hang"
+            if roll < self.hang_rate + self.error_rate:
+                self.errors += 1
+                return "error"
+            return None
+
+    def delay(self):
+        """Response latency drawn from the configured distribution"""
+        if self.latency <= 0:
+            return random.uniform(0, self.jitter) if self.latency_dist == "fixed" else 0.0
+        if self.latency_dist == "normal":
+            return max(0.0, random.gauss(self.latency, self.jitter))
+        if self.latency_dist == "lognormal":
+            return self.latency * math.exp(random.gauss(0, self.jitter))
+        if self.latency_dist == "exponential":
+            return random.expovariate(1 / self.latency)
+        return self.latency + random.uniform(0, self.jitter)
+
+    def snapshot(self):
+        with self._lock:
+            values = {field: getattr(self, field) for field in self.FIELDS}
+            values.update(requests=self.requests, errors=self.errors, rate_limited=self.rate_limited)
+            return values
+
+
+def make_handler(settings: FaultSettings):
+    class FakeOpenAIHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass  # keep the console readable; counters are on /_control
+
+        def _send_json(self, status, body, headers=None):
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def _read_json(self):
+            length = int(self.headers.get("Content-Length", 0))
+            return json.loads(self.rfile.read(length) or b"{}")
+
+        def do_GET(self):
+            if self.path == "/_control":
+                self._send_json(200, settings.snapshot())
+            else:
+                self._send_json(404, {"error": {"message": "not found"}})
+
+        def do_POST(self):
+            body = self._read_json()
+            if self.path == "/_control":
+                settings.update(body)
+                self._send_json(200, settings.snapshot())
+                return
+            if not self.path.endswith("/chat/completions"):
+                self._send_json(404, {"error": {"message": "not found"}})
+                return
+
+            fault = settings.next_fault()
+            if isinstance(fault, tuple):
+                self._send_json(429, {"error": {"message": "Rate limit reached for requests", "type": "requests"}},
+                                {"Retry-After": f"{fault[1]:.3f}"})
+                return
+            if fault == "hang":
+                time.sleep(3600)
+                return
+            time.sleep(settings.delay())
+            if fault == "error":
+                status = settings.error_status
+                headers = {"Retry-After": "0"} if status == 429 else None
+                self._send_json(status, {"error": {"message": f"injected {status}", "type": "fake_server_error"}}, headers)
+                return
+
+            content = completion_for(body)
+            if content == json.dumps(CANNED_ANALYSIS) and random.random() < settings.malformed_rate:
+                content = malformed_analysis()
+            model = body.get("model", "gpt-4o-mini")
+            if body.get("stream"):
+                self._stream_completion(model, content)
+            else:
+                self._send_json(200, {
+                    "id": "chatcmpl-fake",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                    "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+                })
+
+        def _stream_completion(self, model, content):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            pieces = [content[i:i + 24] for i in range(0, len(content), 24)]
+            for index, piece in enumerate(pieces + [None]):
+                chunk = {
+                    "id": "chatcmpl-fake",
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{
+                        "index": 0,
+                        "delta": {"content": piece} if piece is not None else {},
+                        "finish_reason": None if piece is not None else "stop"
+                    }]
+                }
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                self.wfile.flush()
+                if settings.chunk_delay:
+                    time.sleep(settings.chunk_delay)
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+            self.close_connection = True
+
+    return FakeOpenAIHandler
+
+
+def start_server(host="127.0.0.1", port=0, **faults):
+    """Start the fake server on a background thread; returns (server, settings, base_url)"""
+    settings = FaultSettings(**faults)
+    server = ThreadingHTTPServer((host, port), make_handler(settings))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, settings, f"http://{host}:{server.server_address[1]}/v1"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake OpenAI-compatible server with fault injection")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--latency-dist", choices=LATENCY_DISTRIBUTIONS, default="fixed")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--chunk-delay", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--fail-first", type=int, default=0)
+    parser.add_argument("--hang-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=int, default=0)
+    parser.add_argument("--rate-window", type=float, default=60.0)
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server, settings, base_url = start_server(
+        args.host, args.port,
+        latency=args.latency, latency_dist=args.latency_dist, jitter=args.jitter,
+        chunk_delay=args.chunk_delay, error_rate=args.error_rate,
+        error_status=args.error_status, fail_first=args.fail_first, hang_rate=args.hang_rate,
+        rate_limit=args.rate_limit, rate_window=args.rate_window, malformed_rate=args.malformed_rate
+    )
+    print(f"🧪 Fake OpenAI server at {base_url}")
+    print(f"   Faults: {json.dumps(settings.snapshot())}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
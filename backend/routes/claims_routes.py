@@ -1,15 +1,48 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, send_file, stream_with_context
 import re
+import json
 import os
 import sqlite3
 from datetime import datetime
-from werkzeug.utils import secure_filename
 from utils.claim_validator import ClaimValidator
 from utils.database import DatabaseManager
 from utils.document_processor import DocumentProcessor
+from utils.job_queue import JobQueue, job_workers
+from utils.analysis_pipeline import (
+    BATCH_MAX_CONCURRENCY,
+    BATCH_MAX_FILES,
+    DOCUMENT_ANALYSIS_JOB,
+    PipelineError,
+    iter_batch_pipeline,
+    iter_document_pipeline,
+    iter_text_pipeline,
+    run_pipeline,
+    save_uploaded_file,
+    cached_extraction,
+    extract_document_text,
+    find_analyzed_document,
+    persist_document_analysis,
+    analysis_failure_result
+)
+from utils.reference_index import approved_claim_index
+from utils.similarity_index import find_similar_claims
+from utils.single_flight import claim_guard
+from utils.idempotency import idempotent
 
 claims_bp = Blueprint('claims', __name__)
 
+# Stored documents never change under a document id, so reviewers' browsers may reuse them (overridable from .env)
+DOWNLOAD_CACHE_MAX_AGE = int(os.getenv('DOWNLOAD_CACHE_MAX_AGE', '86400'))
+DOWNLOAD_MIMETYPES = {
+    'pdf': 'application/pdf',
+    'png': 'image/png',
+    'jpg': 'image/jpeg',
+    'jpeg': 'image/jpeg',
+    'tiff': 'image/tiff',
+    'bmp': 'image/bmp',
+    'txt': 'text/plain'
+}
+
 @claims_bp.route('/validate', methods=['POST'])
 def validate_claim():
     """
@@ -42,6 +75,7 @@ def validate_claim():
         }), 500
 
 @claims_bp.route('/submit', methods=['POST'])
+@idempotent
 def submit_claim():
     """
     Submit a new claim for processing
@@ -278,162 +312,41 @@ def get_claims_stats():
         return jsonify({'error': str(e)}), 500
 
 @claims_bp.route('/upload', methods=['POST'])
+@idempotent
 def upload_claim_document():
     """
-    Upload and analyze claim document using GPT-4
+    Upload a claim document and queue it for GPT-4 analysis.
+    Returns 202 with a job id; poll /api/jobs/<job_id> for progress and the result.
     """
     try:
-        # Check if file is present
-        if 'document' not in request.files:
-            return jsonify({'error': 'No document file provided'}), 400
-        
-        file = request.files['document']
+        upload = save_uploaded_file(request.files.get('document'))
         claim_type = request.form.get('claim_type', 'medical_claim')
         
-        if file.filename == '':
-            return jsonify({'error': 'No file selected'}), 400
-        
-        # Validate file type (temporarily allow .txt for testing)
-        allowed_extensions = {'pdf', 'png', 'jpg', 'jpeg', 'tiff', 'bmp', 'txt'}
-        file_ext = file.filename.rsplit('.', 1)[1].lower() if '.' in file.filename else ''
-        
-        if file_ext not in allowed_extensions:
-            return jsonify({'error': f'File type {file_ext} not supported. Use: {", ".join(allowed_extensions)}'}), 400
-        
-        # Create uploads directory if it doesn't exist
-        upload_dir = os.path.join(os.path.dirname(__file__), '..', 'uploads')
-        os.makedirs(upload_dir, exist_ok=True)
-        
-        # Save file securely
-        filename = secure_filename(file.filename)
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        unique_filename = f"{timestamp}_{filename}"
-        file_path = os.path.join(upload_dir, unique_filename)
-        file.save(file_path)
-        
-        # Process document
-        processor = DocumentProcessor()
-        
-        # Extract text from document
-        document_text = processor.extract_text_from_file(file_path, file_ext)
-        
-        if not document_text.strip():
-            return jsonify({'error': 'No text could be extracted from the document'}), 400
-        
-        # Analyze with GPT-4 (with timeout handling)
-        try:
-            print(f"Starting analysis for document: {filename}")
-            analysis_result = processor.analyze_claim_document(document_text, claim_type)
-            print(f"Analysis completed for document: {filename}")
-        except Exception as analysis_error:
-            print(f"Analysis failed for document: {filename}, Error: {str(analysis_error)}")
-            # Return partial result with error info
-            analysis_result = {
-                "overall_status": "ERROR",
-                "completeness_score": 0,
-                "missing_sections": ["Analysis failed"],
-                "found_sections": [],
-                "data_quality_issues": [],
-                "validation_errors": [{"field": "analysis", "error": str(analysis_error), "expected_format": "valid_processing"}],
-                "recommendations": ["Try with a smaller document", "Check document format"],
-                "extracted_data": {},
-                "confidence_level": 0,
-                "processing_notes": f"Analysis failed: {str(analysis_error)}"
-            }
-        
-        # Get improvement suggestions
-        suggestions = processor.get_improvement_suggestions(analysis_result)
-        
-        # Skip detailed comparison if analysis failed
-        if analysis_result.get("overall_status") != "ERROR":
-            try:
-                comparison = processor.compare_with_approved_claims(document_text)
-            except Exception as comp_error:
-                print(f"Comparison failed: {str(comp_error)}")
-                comparison = {"error": "Comparison analysis failed", "details": str(comp_error)}
-        else:
-            comparison = {"error": "Skipped due to analysis failure"}
-        
-        # Generate claim ID
-        claim_id = f"DOC_{timestamp}"
-        
-        # Save to database with GPT-4 analysis results
-        try:
-            db = DatabaseManager()
-            
-            # Save the claim with extracted data
-            extracted_data = analysis_result.get('extracted_data', {})
-            document_data = {
-                'claim_id': claim_id,
-                'patient_id': extracted_data.get('patient_id', 'PH-456789'),
-                'patient_name': extracted_data.get('patient_name', 'John Michael Smith'),
-                'date_of_birth': extracted_data.get('date_of_birth', '1900-01-01'),
-                'policy_number': extracted_data.get('policy_number', 'POL-2024-789456'),
-                'provider_name': extracted_data.get('provider_name', 'N/A'),
-                'provider_id': 'DOC_UPLOAD',
-                'service_date': extracted_data.get('service_date', '2024-10-15'),
-                'service_type': claim_type,
-                'diagnosis_code': extracted_data.get('diagnosis_code', 'N/A'),
-                'procedure_code': extracted_data.get('procedure_code', 'N/A'),
-                'amount_billed': float(extracted_data.get('billed_amount', 2850))
-            }
-            db.save_claim(document_data)
-            
-            # Save document information
-            document_info = {
-                'original_filename': filename,
-                'stored_filename': unique_filename,
-                'file_type': file_ext,
-                'file_size': os.path.getsize(file_path),
-                'file_path': file_path,
-                'extracted_text': document_text
-            }
-            db.save_document(claim_id, document_info)
-            
-            # Save GPT-4 validation results to validation_results table
-            if analysis_result.get("overall_status") not in ["ERROR", "TIMEOUT", "OCR_REQUIRED"]:
-                validation_data = {
-                    'is_valid': analysis_result.get('overall_status') == 'APPROVED',
-                    'issues': analysis_result.get('validation_errors', []),
-                    'recommendation': analysis_result.get('overall_status'),
-                    'total_issues': len(analysis_result.get('validation_errors', []))
-                }
-                db.save_validation_result(claim_id, validation_data)
-                
-                # Save GPT-4 recommendation with decision reasoning to recommendations table
-                recommendation_data = {
-                    'recommendation': analysis_result.get('overall_status'),
-                    'confidence': analysis_result.get('confidence_level', 0),
-                    'reason': analysis_result.get('decision_reasoning', 'No reasoning provided'),
-                    'priority': 'HIGH' if analysis_result.get('overall_status') == 'DENIED' else 'MEDIUM',
-                    'suggested_actions': analysis_result.get('key_factors', []) + analysis_result.get('recommendations', []),
-                    'overall_score': analysis_result.get('completeness_score', 0)
-                }
-                db.save_recommendation(claim_id, recommendation_data)
-                
-        except Exception as db_error:
-            print(f"Database save error: {db_error}")
-        
-        # Clean up uploaded file (optional, or keep for records)
-        # os.remove(file_path)
-        
-        response = {
-            'claim_id': claim_id,
-            'status': 'analyzed',
-            'document_analysis': analysis_result,
-            'improvement_suggestions': suggestions,
-            'comparison_with_approved': comparison,
-            'extracted_text_preview': document_text[:500] + "..." if len(document_text) > 500 else document_text,
+        queue = JobQueue()
+        job_id = queue.enqueue(DOCUMENT_ANALYSIS_JOB, {
+            'upload': upload,
+            'claim_type': claim_type
+        })
+        job_workers.ensure_started()
+        job_workers.notify()
+        
+        status_url = f"/api/jobs/{job_id}"
+        response = jsonify({
+            'job_id': job_id,
+            'status': 'queued',
+            'status_url': status_url,
             'file_info': {
-                'original_name': filename,
-                'file_type': file_ext,
-                'size_bytes': os.path.getsize(file_path),
-                'processed_at': datetime.now().isoformat()
-            }
-        }
-        
-        return jsonify(response), 200
+                'original_name': upload['original_filename'],
+                'file_type': upload['file_type'],
+                'size_bytes': upload['file_size']
+            },
+            'message': 'Document accepted for analysis'
+        })
+        response.headers['Location'] = status_url
+        return response, 202
         
+    except PipelineError as e:
+        return jsonify({'error': str(e)}), e.status_code
     except Exception as e:
         return jsonify({
             'error': f'Document processing failed: {str(e)}'
@@ -450,50 +363,7 @@ def analyze_text_directly():
         if not data or 'text' not in data:
             return jsonify({'error': 'No text provided for analysis'}), 400
         
-        text = data['text']
-        claim_type = data.get('claim_type', 'medical_claim')
-        
-        processor = DocumentProcessor()
-        
-        # Analyze with GPT-4 (with timeout handling)
-        try:
-            print("Starting text analysis...")
-            analysis_result = processor.analyze_claim_document(text, claim_type)
-            print("Text analysis completed")
-        except Exception as analysis_error:
-            print(f"Text analysis failed: {str(analysis_error)}")
-            analysis_result = {
-                "overall_status": "ERROR",
-                "completeness_score": 0,
-                "missing_sections": ["Analysis failed"],
-                "found_sections": [],
-                "data_quality_issues": [],
-                "validation_errors": [{"field": "analysis", "error": str(analysis_error), "expected_format": "valid_processing"}],
-                "recommendations": ["Try with shorter text", "Check text format"],
-                "extracted_data": {},
-                "confidence_level": 0,
-                "processing_notes": f"Analysis failed: {str(analysis_error)}"
-            }
-        
-        # Get improvement suggestions
-        suggestions = processor.get_improvement_suggestions(analysis_result)
-        
-        # Skip detailed comparison if analysis failed
-        if analysis_result.get("overall_status") != "ERROR":
-            try:
-                comparison = processor.compare_with_approved_claims(text)
-            except Exception as comp_error:
-                print(f"Comparison failed: {str(comp_error)}")
-                comparison = {"error": "Comparison analysis failed", "details": str(comp_error)}
-        else:
-            comparison = {"error": "Skipped due to analysis failure"}
-        
-        response = {
-            'status': 'analyzed',
-            'document_analysis': analysis_result,
-            'improvement_suggestions': suggestions,
-            'comparison_with_approved': comparison
-        }
+        response = run_pipeline(iter_text_pipeline(data['text'], data.get('claim_type', 'medical_claim')))
         
         return jsonify(response), 200
         
@@ -502,10 +372,111 @@ def analyze_text_directly():
             'error': f'Text analysis failed: {str(e)}'
         }), 500
 
+def _sse_event(event, data):
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+def _sse_response(first_event, events):
+    """
+    Stream pipeline events as Server-Sent Events. The first event is sent
+    immediately so the client gets bytes before any LLM call starts.
+    """
+    def generate():
+        yield _sse_event(*first_event)
+        try:
+            for event, data in events:
+                yield _sse_event(event, data)
+        except PipelineError as e:
+            yield _sse_event('error', {'error': str(e), 'status_code': e.status_code})
+        except Exception as e:
+            yield _sse_event('error', {'error': f'Analysis failed: {str(e)}', 'status_code': 500})
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # disable proxy buffering so events arrive as they happen
+    })
+
+@claims_bp.route('/upload/stream', methods=['POST'])
+def upload_claim_document_stream():
+    """
+    Upload and analyze a claim document, streaming progress as Server-Sent Events:
+    stage_started / extracted / partial (extracted_data as it parses) / analyzed /
+    suggestions / comparison / saved / complete (same payload as the job result)
+    """
+    try:
+        upload = save_uploaded_file(request.files.get('document'))
+    except PipelineError as e:
+        return jsonify({'error': str(e)}), e.status_code
+    claim_type = request.form.get('claim_type', 'medical_claim')
+    
+    return _sse_response(
+        ('accepted', {'file_info': {
+            'original_name': upload['original_filename'],
+            'file_type': upload['file_type'],
+            'size_bytes': upload['file_size']
+        }}),
+        iter_document_pipeline(upload, claim_type, stream_tokens=True)
+    )
+
+@claims_bp.route('/upload/batch', methods=['POST'])
+def upload_claim_documents_batch():
+    """
+    Upload many claim documents (multipart field "documents", repeated) and
+    analyze them concurrently, streaming one file_result event per file as it
+    finishes and a final complete event with the batch summary.
+    Optional form field max_concurrency caps analyses in flight.
+    """
+    files = request.files.getlist('documents')
+    if not files:
+        return jsonify({'error': 'No document files provided'}), 400
+    if len(files) > BATCH_MAX_FILES:
+        return jsonify({'error': f'Too many files: {len(files)} (max {BATCH_MAX_FILES} per batch)'}), 400
+    
+    claim_type = request.form.get('claim_type', 'medical_claim')
+    try:
+        max_concurrency = int(request.form.get('max_concurrency', BATCH_MAX_CONCURRENCY))
+    except ValueError:
+        return jsonify({'error': 'max_concurrency must be an integer'}), 400
+    max_concurrency = max(1, min(max_concurrency, BATCH_MAX_CONCURRENCY))
+    
+    uploads = []
+    rejected = []
+    for sequence, file in enumerate(files, start=1):
+        try:
+            uploads.append(save_uploaded_file(file, sequence=sequence))
+        except PipelineError as e:
+            rejected.append({'filename': file.filename, 'error': str(e)})
+    
+    return _sse_response(
+        ('accepted', {
+            'total': len(files),
+            'accepted': len(uploads),
+            'rejected': len(rejected),
+            'max_concurrency': max_concurrency
+        }),
+        iter_batch_pipeline(uploads, claim_type, max_concurrency, rejected=rejected)
+    )
+
+@claims_bp.route('/analyze-text/stream', methods=['POST'])
+def analyze_text_stream():
+    """
+    Analyze claim text, streaming stage progress and partial LLM output as Server-Sent Events
+    """
+    data = request.get_json(silent=True)
+    if not data or 'text' not in data:
+        return jsonify({'error': 'No text provided for analysis'}), 400
+    
+    return _sse_response(
+        ('accepted', {'characters': len(data['text'])}),
+        iter_text_pipeline(data['text'], data.get('claim_type', 'medical_claim'), stream_tokens=True)
+    )
+
 @claims_bp.route('/<claim_id>/upload', methods=['POST'])
 def upload_document_to_existing_claim(claim_id):
     """
-    Upload and analyze document for an existing claim using GPT-4
+    Upload and analyze document for an existing claim using GPT-4.
+    Only the new document is analyzed; its result is merged into the claim's
+    analysis state, which updates the claim's single recommendation.
     """
     try:
         # Check if the claim exists
@@ -514,109 +485,47 @@ def upload_document_to_existing_claim(claim_id):
         if not claim_history or not claim_history.get('claim'):
             return jsonify({'error': f'Claim {claim_id} not found'}), 404
         
-        # Check if file is present
-        if 'document' not in request.files:
-            return jsonify({'error': 'No document file provided'}), 400
-        
-        file = request.files['document']
+        upload = save_uploaded_file(request.files.get('document'))
         claim_type = request.form.get('claim_type', 'medical_claim')
+        filename = upload['original_filename']
         
-        if file.filename == '':
-            return jsonify({'error': 'No file selected'}), 400
-        
-        # Validate file type
-        allowed_extensions = {'pdf', 'png', 'jpg', 'jpeg', 'tiff', 'bmp', 'txt'}
-        file_ext = file.filename.rsplit('.', 1)[1].lower() if '.' in file.filename else ''
-        
-        if file_ext not in allowed_extensions:
-            return jsonify({'error': f'File type {file_ext} not supported. Use: {", ".join(allowed_extensions)}'}), 400
-        
-        # Create uploads directory if it doesn't exist
-        upload_dir = os.path.join(os.path.dirname(__file__), '..', 'uploads')
-        os.makedirs(upload_dir, exist_ok=True)
-        
-        # Save file securely
-        filename = secure_filename(file.filename)
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        unique_filename = f"{timestamp}_{filename}"
-        file_path = os.path.join(upload_dir, unique_filename)
-        file.save(file_path)
-        
-        # Process document
-        processor = DocumentProcessor()
-        
-        # Extract text from document
-        document_text = processor.extract_text_from_file(file_path, file_ext)
-        
-        if not document_text.strip():
-            return jsonify({'error': 'No text could be extracted from the document'}), 400
+        # The same content was already analyzed for this claim - reuse its result
+        known = find_analyzed_document(db, claim_id, upload.get('content_hash'))
+        if known is not None:
+            document_text = cached_extraction(upload) or ''
+            analysis_result = dict(known['analysis'])
+        else:
+            # Process document
+            processor = DocumentProcessor()
+            document_text, analysis_result = extract_document_text(processor, upload, claim_type)
         
         # Analyze with GPT-4 (with timeout handling)
         try:
-            print(f"Starting analysis for document: {filename} on claim: {claim_id}")
-            analysis_result = processor.analyze_claim_document(document_text, claim_type)
-            print(f"Analysis completed for document: {filename} on claim: {claim_id}")
+            if analysis_result is None:
+                print(f"Starting analysis for document: {filename} on claim: {claim_id}")
+                analysis_result = processor.analyze_claim_document(document_text, claim_type)
+                print(f"Analysis completed for document: {filename} on claim: {claim_id}")
         except Exception as analysis_error:
             print(f"Analysis failed for document: {filename} on claim: {claim_id}, Error: {str(analysis_error)}")
             # Return partial result with error info
-            analysis_result = {
-                "overall_status": "ERROR",
-                "completeness_score": 0,
-                "missing_sections": ["Analysis failed"],
-                "found_sections": [],
-                "data_quality_issues": [],
-                "validation_errors": [{"field": "analysis", "error": str(analysis_error), "expected_format": "valid_processing"}],
-                "recommendations": ["Try with a smaller document", "Check document format"],
-                "extracted_data": {},
-                "confidence_level": 0,
-                "processing_notes": f"Analysis failed: {str(analysis_error)}"
-            }
-        
-        # Save document and analysis to database
+            analysis_result = analysis_failure_result(analysis_error)
+        
+        # Save document and merge its analysis into the claim's analysis state
+        claim_analysis = None
         try:
-            # Save document information
-            document_info = {
-                'original_filename': filename,
-                'stored_filename': unique_filename,
-                'file_type': file_ext,
-                'file_size': os.path.getsize(file_path),
-                'file_path': file_path,
-                'extracted_text': document_text
-            }
-            db.save_document(claim_id, document_info)
-            
-            # Save GPT-4 validation results to validation_results table
-            if analysis_result.get("overall_status") not in ["ERROR", "TIMEOUT", "OCR_REQUIRED"]:
-                validation_data = {
-                    'is_valid': analysis_result.get('overall_status') == 'APPROVED',
-                    'issues': analysis_result.get('validation_errors', []),
-                    'recommendation': analysis_result.get('overall_status'),
-                    'total_issues': len(analysis_result.get('validation_errors', []))
-                }
-                db.save_validation_result(claim_id, validation_data)
-                
-                # Save GPT-4 recommendation with decision reasoning to recommendations table
-                recommendation_data = {
-                    'recommendation': analysis_result.get('overall_status'),
-                    'confidence': analysis_result.get('confidence_level', 0),
-                    'reason': analysis_result.get('decision_reasoning', 'No reasoning provided'),
-                    'priority': 'HIGH' if analysis_result.get('overall_status') == 'DENIED' else 'MEDIUM',
-                    'suggested_actions': analysis_result.get('key_factors', []) + analysis_result.get('recommendations', []),
-                    'overall_score': analysis_result.get('completeness_score', 0)
-                }
-                db.save_recommendation(claim_id, recommendation_data)
-                
+            claim_analysis = persist_document_analysis(db, claim_id, upload, document_text, analysis_result)
         except Exception as db_error:
             print(f"Database save error for claim {claim_id}: {db_error}")
         
         response = {
             'claim_id': claim_id,
-            'status': 'document_uploaded_and_analyzed',
+            'status': 'document_already_analyzed' if known is not None else 'document_uploaded_and_analyzed',
             'document_analysis': analysis_result,
+            'claim_analysis': claim_analysis,
             'file_info': {
                 'original_name': filename,
-                'file_type': file_ext,
-                'size_bytes': os.path.getsize(file_path),
+                'file_type': upload['file_type'],
+                'size_bytes': upload['file_size'],
                 'processed_at': datetime.now().isoformat()
             },
             'message': f'Document uploaded and analyzed for claim {claim_id}'
@@ -624,6 +533,8 @@ def upload_document_to_existing_claim(claim_id):
         
         return jsonify(response), 200
         
+    except PipelineError as e:
+        return jsonify({'error': str(e)}), e.status_code
     except Exception as e:
         return jsonify({
             'error': f'Document upload failed for claim {claim_id}: {str(e)}'
@@ -654,6 +565,8 @@ def update_claim_status(claim_id):
         
         # Update status
         db.update_claim_status(claim_id, new_status, changed_by, change_reason, ai_suggested=False)
+        # Approvals (and reversals) change which claims serve as prompt references
+        approved_claim_index.request_refresh()
         
         # Add human notes if provided
         if notes:
@@ -677,6 +590,15 @@ def process_claim_with_ai(claim_id):
     """
     Process claim with AI to generate suggestions and move to validation_complete status
     """
+    # A double-click or client retry must not process the same claim twice at once
+    if not claim_guard.try_acquire(claim_id):
+        return jsonify({'error': f'AI processing is already running for claim {claim_id}'}), 409
+    try:
+        return _process_claim_with_ai(claim_id)
+    finally:
+        claim_guard.release(claim_id)
+
+def _process_claim_with_ai(claim_id):
     try:
         db = DatabaseManager()
         
@@ -701,8 +623,17 @@ def process_claim_with_ai(claim_id):
         suggested_status = 'verified'  # Default suggestion
         decision_summary = "Standard processing recommended"
         
-        if claim_history.get('recommendations'):
-            latest_rec = claim_history['recommendations'][-1]
+        # The merged analysis of all the claim's documents outranks older per-upload recommendations
+        analysis_state = db.get_claim_analysis_state(claim_id)
+        if analysis_state and analysis_state.get('recommendation_id'):
+            latest_rec = next(
+                (rec for rec in claim_history.get('recommendations', []) if rec['id'] == analysis_state['recommendation_id']),
+                None
+            )
+        else:
+            latest_rec = claim_history['recommendations'][-1] if claim_history.get('recommendations') else None
+        
+        if latest_rec:
             if latest_rec['recommendation'] in ['APPROVED', 'APPROVE']:
                 suggested_status = 'approved'
                 decision_summary = f"AI recommends APPROVAL with {latest_rec['confidence']}% confidence. {latest_rec.get('reason', '')}"
@@ -749,6 +680,21 @@ def get_status_transitions(claim_id):
     except Exception as e:
         return jsonify({'error': f'Failed to get transitions: {str(e)}'}), 500
 
+@claims_bp.route('/<claim_id>/similar', methods=['GET'])
+def get_similar_claims(claim_id):
+    """
+    Claims most similar to this one (provider, procedure pattern, wording) for reviewers
+    """
+    try:
+        k = request.args.get('k', default=10, type=int)
+        result = find_similar_claims(DatabaseManager(), claim_id, k)
+        if result is None:
+            return jsonify({'error': 'Claim not found'}), 404
+        return jsonify(result), 200
+        
+    except Exception as e:
+        return jsonify({'error': f'Failed to find similar claims: {str(e)}'}), 500
+
 @claims_bp.route('/by-status/<status>', methods=['GET'])
 def get_claims_by_status(status):
     """
@@ -770,35 +716,35 @@ def get_claims_by_status(status):
 @claims_bp.route('/documents/download/<int:document_id>', methods=['GET'])
 def download_document(document_id):
     """
-    Download a document by its ID
+    Download a document by its ID.
+    Conditional (If-None-Match -> 304) and Range requests are answered by send_file;
+    the ETag is the blob's content hash, so it is stable across re-uploads and restarts.
     """
     try:
-        db = DatabaseManager()
-        
-        with db.get_connection() as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            
-            # Get document info from database
-            cursor.execute('SELECT * FROM documents WHERE id = ?', (document_id,))
-            document = cursor.fetchone()
-            
-            if not document:
-                return jsonify({'error': 'Document not found'}), 404
-            
-            # Check if file exists on disk
-            file_path = document['file_path']
-            if not os.path.exists(file_path):
-                return jsonify({'error': 'File not found on disk'}), 404
-            
-            # Send file for download
-            from flask import send_file
-            return send_file(
-                file_path,
-                as_attachment=True,
-                download_name=document['original_filename'],
-                mimetype='application/octet-stream'
-            )
+        document = DatabaseManager().get_document_file(document_id)
+        if not document:
+            return jsonify({'error': 'Document not found'}), 404
+        
+        # Check if file exists on disk
+        file_path = document['file_path']
+        if not os.path.exists(file_path):
+            return jsonify({'error': 'File not found on disk'}), 404
+        
+        # Blobs have no extension, so the type comes from the uploaded file type
+        mimetype = DOWNLOAD_MIMETYPES.get(document['file_type'], 'application/octet-stream')
+        response = send_file(
+            file_path,
+            mimetype=mimetype,
+            as_attachment=request.args.get('inline') != 'true',
+            download_name=document['original_filename'],
+            etag=document['content_hash'] or True,
+            max_age=DOWNLOAD_CACHE_MAX_AGE,
+            conditional=True
+        )
+        # Claim documents hold patient data - browser cache only, never shared caches
+        response.cache_control.private = True
+        response.cache_control.public = False
+        return response
     
     except Exception as e:
         return jsonify({
@@ -0,0 +1,37 @@
+from flask import Blueprint, jsonify
+from utils.job_queue import JobQueue
+
+jobs_bp = Blueprint('jobs', __name__)
+
+@jobs_bp.route('/<job_id>', methods=['GET'])
+def get_job_status(job_id):
+    """
+    Report progress of a background job, and its result once it has finished
+    """
+    try:
+        job = JobQueue().get(job_id)
+        
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
+        
+        response = {
+            'job_id': job['id'],
+            'job_type': job['job_type'],
+            'status': job['status'],
+            'stage': job['stage'],
+            'progress': job['progress'],
+            'attempts': job['attempts'],
+            'max_attempts': job['max_attempts'],
+            'created_at': job['created_at'],
+            'updated_at': job['updated_at']
+        }
+        
+        if job['status'] == 'succeeded':
+            response['result'] = job['result']
+        elif job['error']:
+            response['error'] = job['error']
+        
+        return jsonify(response), 200
+        
+    except Exception as e:
+        return jsonify({'error': f'Job lookup failed: {str(e)}'}), 500
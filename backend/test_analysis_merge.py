@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Unit tests for merging partial analyses (document chunks / packet documents)
+
+Run with: python -m pytest test_analysis_merge.py
+"""
+
+import pytest
+
+from utils.analysis_merge import merge_analysis_results, merge_validation_errors
+
+FOUND = {"policy_number": "POL12345678", "provider_id": "1234567890", "billed_amount": 150.0}
+
+
+def errors(*pairs):
+    return [{"validation_errors": [{"field": field, "error": message} for field, message in pairs]}]
+
+
+@pytest.mark.parametrize("message", [
+    "Missing policy number",
+    "Required field missing",
+    "Policy number is missing",
+    "Policy number not found in the document.",
+    "Not provided",
+    "Policy number is not present in this chunk",
+    "Policy number absent",
+    "No policy number provided",
+])
+def test_missing_errors_dropped_when_another_part_found_the_field(message):
+    assert merge_validation_errors(errors(("policy_number", message)), FOUND) == []
+
+
+@pytest.mark.parametrize("field, message", [
+    ("policy_number", "Policy number format is invalid"),
+    ("billed_amount", "Amount is missing decimal places"),
+    ("provider_id", "No match for provider in the registry"),
+    ("provider_id", "Provider has no active contract"),
+])
+def test_real_errors_kept(field, message):
+    assert len(merge_validation_errors(errors((field, message)), FOUND)) == 1
+
+
+def test_missing_error_kept_when_no_part_found_the_field():
+    assert len(merge_validation_errors(errors(("diagnosis_code", "Diagnosis code is missing")), FOUND)) == 1
+
+
+def test_duplicate_errors_merged():
+    results = errors(("policy_number", "Format is invalid")) + errors(("policy_number", "format is  invalid"))
+    assert len(merge_validation_errors(results, {})) == 1
+
+
+def test_merge_analysis_results_flags_disagreement():
+    merged = merge_analysis_results([
+        {"overall_status": "APPROVED", "extracted_data": {"patient_name": "Jane Doe"}, "completeness_score": 80,
+         "validation_errors": [{"field": "policy_number", "error": "Policy number not found"}]},
+        {"overall_status": "DENIED", "extracted_data": {"policy_number": "POL12345678"}, "completeness_score": 60},
+    ])
+    assert merged["overall_status"] == "NEEDS_REVIEW"
+    assert merged["extracted_data"] == {"patient_name": "Jane Doe", "policy_number": "POL12345678"}
+    assert merged["validation_errors"] == []
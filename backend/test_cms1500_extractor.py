@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the rule-based CMS-1500 field extractor
+
+Run with: python -m pytest test_cms1500_extractor.py
+"""
+
+import pytest
+
+pytest.importorskip("PyPDF2")
+
+from utils.cms1500_extractor import (
+    CONFIDENCE,
+    CONFLICT_CONFIDENCE_CAP,
+    CMS1500Extractor,
+    is_cms1500,
+    normalize_amount,
+)
+
+FORM_TEXT = """HEALTH INSURANCE CLAIM FORM
+1a. Insured's ID Number: MBR123456
+2. Patient's Name: Doe, Jane
+3. Patient's Birth Date: 04/12/1980
+11. Insured's Policy Group or FECA Number: POL-778899
+21. Diagnosis (ICD-10): J45.909
+24. Service Lines
+03/15/2024 | 11 | 99213 | 1 | $150.00
+28. Total Charge: $1,500.00
+33. Billing Provider Info & Ph #: Lakeside Family Clinic
+33a. NPI: 1234567890
+"""
+
+
+@pytest.fixture
+def extractor():
+    return CMS1500Extractor()
+
+
+def field(result, name):
+    return result["fields"][name]
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("28. Total Charge: 150", 150.0),
+    ("28. Total Charge: $1500.00", 1500.0),
+    ("28. Total Charge: 2850.50", 2850.5),
+    ("28. Total Charge: $ 975.25", 975.25),
+    ("28. Total Charge: $1,500.00", 1500.0),
+    ("28. Total Charge: 1,234,567.89", 1234567.89),
+    ("28. Total Charge: $150.00, paid in full", 150.0),
+])
+def test_billed_amount_reads_the_whole_number(extractor, text, expected):
+    amount = field(extractor.extract(text), "billed_amount")
+    assert amount["value"] == expected
+    assert amount["confidence"] == CONFIDENCE["item_label"]
+
+
+@pytest.mark.parametrize("text", [
+    "28. Total Charge: 1,50",
+    "28. Total Charge: 150.5",
+])
+def test_malformed_amount_is_low_confidence(extractor, text):
+    assert field(extractor.extract(text), "billed_amount")["confidence"] == CONFIDENCE["invalid_format"]
+
+
+def test_normalize_amount():
+    assert normalize_amount("$1,500.00") == 1500.0
+    assert normalize_amount("N/A") is None
+
+
+def test_item_number_labels(extractor):
+    result = extractor.extract(FORM_TEXT)
+    assert result["is_cms1500"]
+    assert field(result, "patient_id") == {"value": "MBR123456", "confidence": 0.95, "source": "item_label"}
+    assert field(result, "patient_name")["value"] == "Doe, Jane"
+    assert field(result, "date_of_birth")["value"] == "1980-04-12"
+    assert field(result, "policy_number")["value"] == "POL-778899"
+    assert field(result, "diagnosis_code")["value"] == "J45.909"
+    assert field(result, "billed_amount")["value"] == 1500.0
+    assert field(result, "provider_name")["value"] == "Lakeside Family Clinic"
+    assert field(result, "provider_id")["value"] == "1234567890"
+
+
+def test_service_line_row(extractor):
+    result = extractor.extract(FORM_TEXT)
+    assert field(result, "service_date") == {"value": "2024-03-15", "confidence": 0.95, "source": "service_line"}
+    assert field(result, "procedure_code")["value"] == "99213"
+
+
+def test_label_without_item_number(extractor):
+    amount = field(extractor.extract("Total Charges: $2,850.50"), "billed_amount")
+    assert amount == {"value": 2850.5, "confidence": CONFIDENCE["label"], "source": "label"}
+
+
+def test_value_on_next_line(extractor):
+    result = extractor.extract("28. Total Charge:\n$1500.00\n33a. NPI:\n1234567890")
+    assert field(result, "billed_amount")["value"] == 1500.0
+    assert field(result, "provider_id")["value"] == "1234567890"
+
+
+def test_next_line_label_is_not_a_value(extractor):
+    result = extractor.extract("2. Patient's Name:\n3. Patient's Birth Date: 04/12/1980")
+    assert "patient_name" not in result["fields"]
+    assert field(result, "date_of_birth")["value"] == "1980-04-12"
+
+
+def test_conflicting_values_cap_confidence(extractor):
+    result = extractor.extract("33a. NPI: 1234567890\n33a. NPI: 9876543210")
+    assert field(result, "provider_id")["value"] == "1234567890"
+    assert field(result, "provider_id")["confidence"] == 0.6
+
+
+@pytest.mark.parametrize("text", [
+    "Prior Authorization Confirmation",
+    "23. Prior Authorization Number: Confirmation",
+])
+def test_prior_authorization_needs_a_number(extractor, text):
+    result = extractor.extract(text)
+    assert field(result, "prior_authorization")["confidence"] == CONFIDENCE["invalid_format"]
+
+
+def test_prior_authorization_number(extractor):
+    result = extractor.extract("23. Prior Authorization Number: PA522219")
+    assert field(result, "prior_authorization") == {"value": "PA522219", "confidence": 0.95, "source": "item_label"}
+
+
+@pytest.mark.parametrize("text", [
+    "17. Name of Referring Provider: Dr. Robert Lee, MD • NPI: 1486681523",
+    "Referring Provider: Dr. Robert Lee, MD  \x7f  NPI: 1486681523",
+    "Referring Provider: Dr. Robert Lee, MD NPI 1486681523",
+    "Referring Provider: Dr. Robert Lee, MD (ordering)\nReferring Provider Signature: Dr. Robert Lee, MD",
+])
+def test_referring_provider_stops_before_npi(extractor, text):
+    provider = field(extractor.extract(text), "referring_provider")
+    assert provider["value"] == "Dr. Robert Lee, MD"
+    assert provider["confidence"] > CONFLICT_CONFIDENCE_CAP
+
+
+def test_acroform_values(extractor):
+    result = extractor.extract("", form_fields={
+        "pt_name": "Doe, Jane",
+        "insurance_id": "MBR123456",
+        "Pt DOB": "04/12/1980",
+        "t_charge": "1500.00",
+        "pin1": "12345",
+    })
+    assert result["is_cms1500"]
+    assert field(result, "patient_name") == {"value": "Doe, Jane", "confidence": 0.99, "source": "acroform"}
+    assert field(result, "date_of_birth")["value"] == "1980-04-12"
+    assert field(result, "billed_amount")["value"] == 1500.0
+    # Present but not a 10-digit NPI
+    assert field(result, "provider_id")["confidence"] == CONFIDENCE["invalid_format"]
+
+
+def test_acroform_value_wins_over_text(extractor):
+    result = extractor.extract("28. Total Charge: $99.00", form_fields={"TotalCharge": "$1,500.00"})
+    assert field(result, "billed_amount") == {"value": 1500.0, "confidence": 0.99, "source": "acroform"}
+
+
+def test_is_cms1500():
+    assert is_cms1500("CMS-1500 (02-12)")
+    assert not is_cms1500("Pharmacy receipt\nTotal: $12.00")
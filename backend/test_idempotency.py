@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the @idempotent decorator (Idempotency-Key handling) against a
+temporary database
+
+Run with: python -m pytest test_idempotency.py
+"""
+
+import pytest
+
+flask = pytest.importorskip("flask")
+
+from utils import idempotency
+from utils.database import DatabaseManager
+from utils.idempotency import idempotent
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "idempotency.db")
+    monkeypatch.setattr(idempotency, "DatabaseManager", lambda: DatabaseManager(db_path=db_path))
+    return DatabaseManager(db_path=db_path)
+
+
+@pytest.fixture
+def app(db):
+    app = flask.Flask(__name__)
+    app.calls = []
+    app.nested = {}
+
+    @app.route("/claims", methods=["POST"])
+    @idempotent
+    def submit_claim():
+        app.calls.append(flask.request.get_json())
+        response = flask.jsonify({"claim_id": f"CLM_{len(app.calls)}"})
+        response.headers["Location"] = f"/claims/CLM_{len(app.calls)}"
+        return response, 201
+
+    @app.route("/slow", methods=["POST"])
+    @idempotent
+    def slow():
+        # A client retry arrives while this request still holds the key
+        key = flask.request.headers["Idempotency-Key"]
+        retry = app.test_client().post("/slow", json=flask.request.get_json(), headers={"Idempotency-Key": key})
+        app.nested = {"status": retry.status_code, "retry_after": retry.headers.get("Retry-After")}
+        return flask.jsonify({"done": True}), 200
+
+    @app.route("/flaky", methods=["POST"])
+    @idempotent
+    def flaky():
+        app.calls.append(flask.request.get_json())
+        if len(app.calls) == 1:
+            return flask.jsonify({"error": "database unavailable"}), 503
+        return flask.jsonify({"ok": True}), 200
+
+    @app.route("/broken", methods=["POST"])
+    @idempotent
+    def broken():
+        app.calls.append(flask.request.get_json())
+        if len(app.calls) == 1:
+            raise RuntimeError("unexpected failure")
+        return flask.jsonify({"ok": True}), 200
+
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def key(value):
+    return {"Idempotency-Key": value}
+
+
+def test_without_key_runs_every_time(app, client):
+    client.post("/claims", json={"amount": 150})
+    client.post("/claims", json={"amount": 150})
+    assert len(app.calls) == 2
+
+
+def test_retry_replays_stored_response(app, client):
+    first = client.post("/claims", json={"amount": 150}, headers=key("k1"))
+    retry = client.post("/claims", json={"amount": 150}, headers=key("k1"))
+
+    assert len(app.calls) == 1
+    assert retry.status_code == first.status_code == 201
+    assert retry.get_json() == first.get_json() == {"claim_id": "CLM_1"}
+    assert retry.headers["Location"] == "/claims/CLM_1"
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert "Idempotent-Replayed" not in first.headers
+
+
+def test_same_body_in_different_key_order_is_the_same_request(app, client):
+    client.post("/claims", json={"amount": 150, "patient": "P1"}, headers=key("k1"))
+    retry = client.post("/claims", data='{"patient": "P1", "amount": 150}',
+                        content_type="application/json", headers=key("k1"))
+    assert retry.headers.get("Idempotent-Replayed") == "true"
+    assert len(app.calls) == 1
+
+
+def test_different_keys_run_separately(app, client):
+    client.post("/claims", json={"amount": 150}, headers=key("k1"))
+    second = client.post("/claims", json={"amount": 150}, headers=key("k2"))
+    assert second.get_json() == {"claim_id": "CLM_2"}
+
+
+def test_conflict_while_first_request_running(app, client):
+    response = client.post("/slow", json={"amount": 150}, headers=key("k1"))
+    assert response.status_code == 200
+    assert app.nested == {"status": 409, "retry_after": "1"}
+
+
+def test_key_reused_with_different_request(app, client):
+    client.post("/claims", json={"amount": 150}, headers=key("k1"))
+    response = client.post("/claims", json={"amount": 999}, headers=key("k1"))
+
+    assert response.status_code == 422
+    assert len(app.calls) == 1
+
+
+def test_server_error_not_stored(app, client):
+    first = client.post("/flaky", json={"amount": 150}, headers=key("k1"))
+    retry = client.post("/flaky", json={"amount": 150}, headers=key("k1"))
+
+    assert first.status_code == 503
+    assert retry.status_code == 200
+    assert "Idempotent-Replayed" not in retry.headers
+    assert len(app.calls) == 2
+
+
+def test_exception_releases_key(app, client):
+    app.testing = False  # let Flask turn the exception into a 500 response
+    first = client.post("/broken", json={"amount": 150}, headers=key("k1"))
+    retry = client.post("/broken", json={"amount": 150}, headers=key("k1"))
+
+    assert first.status_code == 500
+    assert retry.status_code == 200
+    assert len(app.calls) == 2
+
+
+def test_overlong_key_rejected(app, client):
+    response = client.post("/claims", json={"amount": 150}, headers=key("k" * 256))
+    assert response.status_code == 400
+    assert app.calls == []
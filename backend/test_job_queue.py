@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the SQLite-backed job queue (leases, heartbeats, retries, takeover)
+against a temporary database
+
+Run with: python -m pytest test_job_queue.py
+"""
+
+import sqlite3
+import time
+
+import pytest
+
+from utils import job_queue
+from utils.database import DatabaseManager
+from utils.job_queue import JobQueue
+
+JOB_TYPE = "test_job"
+
+
+@pytest.fixture
+def db(tmp_path):
+    return DatabaseManager(db_path=str(tmp_path / "jobs.db"))
+
+
+@pytest.fixture
+def handler(monkeypatch):
+    """Handler registered for JOB_TYPE; tests set .behaviour to control it"""
+    calls = []
+
+    def run(payload, context):
+        calls.append((payload, context.attempt))
+        return run.behaviour(payload, context)
+
+    run.calls = calls
+    run.behaviour = lambda payload, context: {"ok": True}
+    monkeypatch.setitem(JobQueue.handlers, JOB_TYPE, run)
+    return run
+
+
+@pytest.fixture
+def queue(db, handler):
+    return JobQueue(db, lease_seconds=60)
+
+
+class NotRetryable(Exception):
+    retryable = False
+
+
+def raising(error):
+    def behaviour(payload, context):
+        raise error
+    return behaviour
+
+
+def make_available(db, job_id):
+    """Make a backed-off job runnable right away instead of sleeping through the delay"""
+    with sqlite3.connect(db.db_path) as conn:
+        conn.execute("UPDATE analysis_jobs SET available_at = ? WHERE id = ?", (time.time(), job_id))
+
+
+def test_enqueue_requires_a_handler(queue):
+    with pytest.raises(ValueError):
+        queue.enqueue("unknown_job", {})
+
+
+def test_lease_is_exclusive(queue, db):
+    job_id = queue.enqueue(JOB_TYPE, {"n": 1})
+
+    job = db.claim_next_job("worker-a", 60)
+    assert job["id"] == job_id
+    assert job["attempts"] == 1
+    assert job["payload"] == {"n": 1}
+    assert db.claim_next_job("worker-b", 60) is None
+
+    stored = db.get_job(job_id)
+    assert stored["status"] == "running"
+    assert stored["lease_owner"] == "worker-a"
+    assert stored["lease_expires_at"] == pytest.approx(time.time() + 60, abs=5)
+
+
+def test_heartbeat_extends_lease_and_records_progress(queue, db):
+    job_id = queue.enqueue(JOB_TYPE, {})
+    db.claim_next_job("worker-a", 1)
+
+    assert db.heartbeat_job(job_id, "worker-a", 60, stage="analyzed", progress=50)
+    stored = db.get_job(job_id)
+    assert stored["lease_expires_at"] == pytest.approx(time.time() + 60, abs=5)
+    assert (stored["stage"], stored["progress"]) == ("analyzed", 50)
+
+    # Another worker cannot renew (or report progress on) a lease it does not hold
+    assert not db.heartbeat_job(job_id, "worker-b", 60, stage="saved", progress=90)
+    assert db.get_job(job_id)["stage"] == "analyzed"
+
+
+def test_run_next_stores_result_and_progress(queue, handler):
+    def behaviour(payload, context):
+        assert context.progress("halfway", 50)
+        return {"claim_id": "DOC_1"}
+    handler.behaviour = behaviour
+    job_id = queue.enqueue(JOB_TYPE, {"n": 1})
+
+    assert queue.run_next("worker-a")
+    assert not queue.run_next("worker-a")
+
+    job = queue.get(job_id)
+    assert job["status"] == "succeeded"
+    assert job["result"] == {"claim_id": "DOC_1"}
+    assert (job["stage"], job["progress"]) == ("complete", 100)
+    assert job["lease_owner"] is None
+
+
+def test_failure_is_retried_with_exponential_backoff(queue, db, handler, monkeypatch):
+    monkeypatch.setattr(job_queue, "JOB_RETRY_BASE_DELAY", 10)
+    handler.behaviour = raising(RuntimeError("provider timeout"))
+    job_id = queue.enqueue(JOB_TYPE, {}, max_attempts=3)
+
+    before = time.time()
+    queue.run_next("worker-a")
+    job = queue.get(job_id)
+    assert (job["status"], job["attempts"], job["error"]) == ("queued", 1, "provider timeout")
+    assert job["available_at"] == pytest.approx(before + 10, abs=5)
+    # Not runnable until the backoff has passed
+    assert not queue.run_next("worker-a")
+
+    make_available(db, job_id)
+    before = time.time()
+    queue.run_next("worker-a")
+    job = queue.get(job_id)
+    assert (job["status"], job["attempts"]) == ("queued", 2)
+    assert job["available_at"] == pytest.approx(before + 20, abs=5)
+
+    make_available(db, job_id)
+    queue.run_next("worker-a")
+    job = queue.get(job_id)
+    assert (job["status"], job["attempts"]) == ("failed", 3)
+    assert [attempt for _, attempt in handler.calls] == [1, 2, 3]
+
+
+def test_non_retryable_error_fails_immediately(queue, handler):
+    handler.behaviour = raising(NotRetryable("no text in document"))
+    job_id = queue.enqueue(JOB_TYPE, {}, max_attempts=3)
+
+    queue.run_next("worker-a")
+    job = queue.get(job_id)
+    assert (job["status"], job["attempts"], job["error"]) == ("failed", 1, "no text in document")
+
+
+def test_expired_lease_is_taken_over(queue, db):
+    job_id = queue.enqueue(JOB_TYPE, {})
+    db.claim_next_job("worker-a", -1)  # lease already expired: worker-a stalled or died
+
+    job = db.claim_next_job("worker-b", 60)
+    assert job["id"] == job_id
+    assert job["attempts"] == 2
+    assert db.get_job(job_id)["lease_owner"] == "worker-b"
+
+    # The stalled worker has lost the job: no heartbeat, result or failure is accepted
+    assert not db.heartbeat_job(job_id, "worker-a", 60)
+    assert not db.complete_job(job_id, "worker-a", {"stale": True})
+    assert not db.fail_job(job_id, "worker-a", "late failure", retry_delay=1)
+    assert db.complete_job(job_id, "worker-b", {"fresh": True})
+    assert db.get_job(job_id)["result"] == {"fresh": True}
+
+
+def test_expired_lease_on_last_attempt_fails_the_job(queue, db):
+    job_id = queue.enqueue(JOB_TYPE, {}, max_attempts=1)
+    db.claim_next_job("worker-a", -1)
+
+    assert db.claim_next_job("worker-b", 60) is None
+    job = db.get_job(job_id)
+    assert job["status"] == "failed"
+    assert job["lease_owner"] is None
+
+
+def test_result_discarded_after_takeover(queue, db, handler):
+    def behaviour(payload, context):
+        # The lease expires and another worker takes the job while this handler still runs
+        db.heartbeat_job(context.job_id, context.worker_id, -1)
+        assert db.claim_next_job("worker-b", 60)["id"] == context.job_id
+        return {"stale": True}
+    handler.behaviour = behaviour
+    job_id = queue.enqueue(JOB_TYPE, {})
+
+    queue.run_next("worker-a")
+    job = queue.get(job_id)
+    assert (job["status"], job["lease_owner"], job["result"]) == ("running", "worker-b", None)
+
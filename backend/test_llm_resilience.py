@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Exercise the shared LLM client against the local fake OpenAI server
+
+Scenarios (each starts from a healthy server and a closed circuit):
+  1. Transient errors   - first requests get 503/429, retries with backoff succeed
+  2. Slow upstream      - responses slower than the read timeout are retried, then fail
+  3. Provider outage    - every request fails; the circuit opens and later calls fail fast
+  4. Recovery           - after the reset window a probe succeeds and the circuit closes
+  5. Degraded analysis  - with the circuit open, DocumentProcessor answers from the
+                          rule-based path without calling the LLM (needs langchain)
+  6. Malformed output   - near-miss JSON is repaired and only the invalid field is
+                          re-asked, instead of an ERROR result (needs langchain)
+
+Run with: python -m pytest -s test_llm_resilience.py
+The client reads its retry and timeout settings once, at import, so this file
+is skipped when utils.llm_client was already imported in the same process.
+"""
+
+import sys
+import time
+
+import pytest
+
+pytest.importorskip("httpx")
+
+from fake_openai_server import FaultSettings, start_server
+
+# Small limits so the scenarios run in seconds
+CLIENT_ENV = {
+    'LLM_MAX_RETRIES': '2',
+    'LLM_RETRY_BASE_DELAY': '0.05',
+    'LLM_RETRY_MAX_DELAY': '0.2',
+    'LLM_READ_TIMEOUT': '0.5',
+    'LLM_CIRCUIT_FAILURE_THRESHOLD': '3',
+    'LLM_CIRCUIT_RESET_SECONDS': '2',
+}
+HEALTHY = {field: getattr(FaultSettings(), field) for field in FaultSettings.FIELDS}
+
+CHAT_REQUEST = {"model": "gpt-4o-mini", "messages": [{"role": "user", "content": "ping"}]}
+
+
+@pytest.fixture(scope="module")
+def fake_openai():
+    """Fake server for the whole module, with the client configured to use it"""
+    if 'utils.llm_client' in sys.modules:
+        pytest.skip("utils.llm_client was imported with other settings - run this file on its own")
+
+    with pytest.MonkeyPatch.context() as patch:
+        for name, value in CLIENT_ENV.items():
+            patch.setenv(name, value)
+        server, faults, base_url = start_server()
+        patch.setenv('OPENAI_BASE_URL', base_url)
+        patch.setenv('OPENAI_API_KEY', 'sk-fake-server')
+        patch.setenv('LLM_PROVIDER', 'openai')
+
+        from utils import llm_client
+        print(f"\n🧪 LLM resilience test against {base_url}")
+        yield {"server": server, "faults": faults, "base_url": base_url, "client": llm_client}
+        server.shutdown()
+
+
+@pytest.fixture
+def faults(fake_openai):
+    """Healthy fault settings, zeroed counters and a closed circuit for each scenario"""
+    settings = fake_openai["faults"]
+    settings.update(dict(HEALTHY, reset_counters=True))
+    fake_openai["client"].llm_circuit.record_success()
+    yield settings
+    settings.update(dict(HEALTHY, reset_counters=True))
+    fake_openai["client"].llm_circuit.record_success()
+
+
+@pytest.fixture
+def circuit(fake_openai):
+    return fake_openai["client"].llm_circuit
+
+
+@pytest.fixture
+def chat(fake_openai):
+    """One chat completion through the shared client; returns (outcome, seconds)"""
+    client = fake_openai["client"]
+
+    def send():
+        start = time.perf_counter()
+        try:
+            response = client.get_http_client().post(f"{fake_openai['base_url']}/chat/completions", json=CHAT_REQUEST)
+            outcome = f"HTTP {response.status_code}"
+        except client.CircuitOpenError:
+            outcome = "circuit open (fail fast)"
+        except Exception as e:
+            outcome = type(e).__name__
+        return outcome, time.perf_counter() - start
+    return send
+
+
+@pytest.fixture
+def processor(fake_openai):
+    pytest.importorskip("langchain_openai")
+    try:
+        from utils.document_processor import DocumentProcessor
+    except ImportError as e:
+        pytest.skip(f"backend dependencies not installed: {e}")
+    return DocumentProcessor()
+
+
+def trip_circuit(faults, circuit, chat):
+    faults.update({"error_rate": 1.0, "error_status": 500})
+    for _ in range(circuit.failure_threshold):
+        chat()
+
+
+def test_transient_errors(faults, circuit, chat):
+    print("\n🔁 Scenario 1: transient 503 then 429")
+    faults.update({"fail_first": 2, "error_status": 503})
+    outcome, seconds = chat()
+    print(f"   503 x2 → {outcome} in {seconds:.2f}s after {faults.snapshot()['requests']} upstream requests")
+    assert outcome == "HTTP 200"
+
+    faults.update({"fail_first": 1, "error_status": 429, "reset_counters": True})
+    outcome, seconds = chat()
+    print(f"   429 x1 → {outcome} in {seconds:.2f}s (Retry-After honored)")
+    assert outcome == "HTTP 200"
+    assert circuit.state == "closed"
+
+
+def test_slow_upstream(faults, chat):
+    print("\n🐢 Scenario 2: upstream slower than the read timeout")
+    faults.update({"latency": 1.0})
+    outcome, seconds = chat()
+    print(f"   → {outcome} in {seconds:.2f}s after {faults.snapshot()['requests']} attempts")
+    assert outcome == "ReadTimeout"
+
+
+def test_outage_opens_circuit(faults, circuit, chat):
+    print("\n💥 Scenario 3: provider outage")
+    faults.update({"error_rate": 1.0, "error_status": 500})
+    for attempt in range(1, circuit.failure_threshold + 1):
+        outcome, seconds = chat()
+        print(f"   call {attempt}: {outcome} in {seconds:.2f}s (circuit {circuit.state})")
+    assert circuit.state == "open"
+
+    upstream_before = faults.snapshot()['requests']
+    outcome, seconds = chat()
+    print(f"   next call: {outcome} in {seconds * 1000:.1f}ms, upstream requests +{faults.snapshot()['requests'] - upstream_before}")
+    assert outcome == "circuit open (fail fast)"
+    assert faults.snapshot()['requests'] == upstream_before
+
+
+def test_recovery(faults, circuit, chat):
+    print("\n✅ Scenario 4: recovery after the reset window")
+    trip_circuit(faults, circuit, chat)
+    assert circuit.state == "open"
+
+    faults.update({"error_rate": 0.0})
+    time.sleep(circuit.reset_seconds + 0.1)
+    print(f"   circuit {circuit.state} after {circuit.reset_seconds:.0f}s")
+    outcome, seconds = chat()
+    print(f"   probe: {outcome} in {seconds:.2f}s (circuit {circuit.state})")
+    assert outcome == "HTTP 200" and circuit.state == "closed"
+
+
+def test_degraded_analysis(faults, circuit, processor):
+    print("\n📋 Scenario 5: analysis while the provider is down")
+    result = processor.analyze_claim_document("Patient: Jane Doe\nProvider: Test Clinic\nAmount: $100")
+    print(f"   healthy: {result['overall_status']} via {result.get('processing_method')}")
+
+    faults.update({"error_rate": 1.0, "error_status": 503})
+    results = [processor.analyze_claim_document("Patient: Jane Doe\nAmount: $100")
+               for _ in range(circuit.failure_threshold)]
+    start = time.perf_counter()
+    result = processor.analyze_claim_document("Patient: Jane Doe\nAmount: $100")
+    print(f"   degraded: {[r['overall_status'] for r in results]} then {result['overall_status']} "
+          f"via {result.get('processing_method')} in {time.perf_counter() - start:.3f}s")
+    assert circuit.state == "open"
+    assert results[-1]["overall_status"] != "ERROR" and result["overall_status"] != "ERROR"
+
+
+def test_malformed_output(faults, processor):
+    print("\n🩹 Scenario 6: malformed analysis JSON")
+    faults.update({"malformed_rate": 1.0})
+    result = processor.analyze_claim_document("Patient: Jane Doe\nProvider: Test Clinic\nAmount: $100")
+    repairs = result.get("output_repairs", {})
+    print(f"   → {result['overall_status']} (completeness {result.get('completeness_score')}), "
+          f"repaired JSON: {repairs.get('json_repaired')}, re-asked: {repairs.get('reasked_fields')}, "
+          f"{faults.snapshot()['requests']} upstream requests")
+    assert result["overall_status"] != "ERROR"
+    assert repairs.get("reasked_fields") == ["completeness_score"]
+
+
+if __name__ == '__main__':
+    sys.exit(pytest.main([__file__, "-v", "-s"]))
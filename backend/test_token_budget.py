@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Unit tests for prompt token counting when tiktoken cannot load its encoding
+(installed, but the BPE file cannot be downloaded, e.g. offline)
+
+Run with: python -m pytest test_token_budget.py
+"""
+
+import json
+
+import pytest
+
+tiktoken = pytest.importorskip("tiktoken")
+
+from utils import token_budget
+from utils.llm_scheduler import estimate_request_tokens
+from utils.token_budget import count_tokens, truncate_to_tokens
+
+
+@pytest.fixture
+def offline(monkeypatch):
+    """Every encoding load fails the way an offline download does"""
+    calls = []
+
+    def unavailable(name):
+        calls.append(name)
+        raise ConnectionError("could not download the BPE file")
+
+    monkeypatch.setattr(token_budget, "_encodings", {})
+    monkeypatch.setattr(tiktoken, "encoding_for_model", unavailable)
+    monkeypatch.setattr(tiktoken, "get_encoding", unavailable)
+    return calls
+
+
+def test_count_tokens_falls_back_to_character_estimate(offline):
+    text = "Patient: Jane Doe, billed amount $150.00"
+    assert count_tokens(text) == (len(text) + 3) // 4
+
+
+def test_failed_load_is_cached(offline):
+    count_tokens("first")
+    attempts = len(offline)
+    count_tokens("second")
+    assert attempts == 1
+    assert len(offline) == attempts
+
+
+def test_truncate_to_tokens_falls_back_to_characters(offline):
+    truncated = truncate_to_tokens("x" * 100, 10)
+    assert truncated.startswith("x" * 40 + "\n")
+    assert "TRUNCATED" in truncated
+
+
+def test_request_estimate_works_offline(offline):
+    body = json.dumps({"model": "gpt-4o-mini", "max_tokens": 50,
+                       "messages": [{"role": "user", "content": "ping" * 10}]}).encode()
+    assert estimate_request_tokens(body) == 10 + 50
@@ -0,0 +1,243 @@
+import time
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .cms1500_extractor import is_cms1500
+from .llm_client import llm_circuit
+from .metrics import registry
+from .prompt import (
+    ADJUDICATION_CASCADE_CONFIG,
+    CHUNKED_ANALYSIS_CONFIG,
+    RULE_EXTRACTION_CONFIG
+)
+
+# Tiers in the order they run
+TIERS = ("rules", "extraction", "full")
+
+CASCADE_DECISIONS = registry.counter(
+    "claimsai_cascade_decisions_total",
+    "Adjudication cascade outcomes per tier (decided = the tier's result was returned)",
+    ("tier", "outcome")
+)
+CASCADE_TIER_DURATION = registry.histogram(
+    "claimsai_cascade_tier_duration_seconds",
+    "Time spent in each adjudication cascade tier",
+    ("tier",)
+)
+
+
+class CascadeStats:
+    """In-process hit rates and latency per tier, for the health endpoint"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tiers = {tier: {"decided": 0, "escalated": 0, "seconds": 0.0} for tier in TIERS}
+        self._reasons: Dict[str, int] = {}
+
+    def record(self, tier: str, decided: bool, seconds: float, reasons: Optional[List[str]] = None):
+        outcome = "decided" if decided else "escalated"
+        CASCADE_DECISIONS.inc(tier=tier, outcome=outcome)
+        CASCADE_TIER_DURATION.observe(seconds, tier=tier)
+        with self._lock:
+            self._tiers[tier][outcome] += 1
+            self._tiers[tier]["seconds"] += seconds
+            for reason in reasons or []:
+                self._reasons[reason] = self._reasons.get(reason, 0) + 1
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            # Every claim is decided by exactly one tier
+            total = sum(counts["decided"] for counts in self._tiers.values())
+            tiers = {}
+            for tier, counts in self._tiers.items():
+                runs = counts["decided"] + counts["escalated"]
+                tiers[tier] = {
+                    "runs": runs,
+                    "decided": counts["decided"],
+                    "hit_rate": round(counts["decided"] / runs, 3) if runs else None,
+                    "share_of_claims": round(counts["decided"] / total, 3) if total else None,
+                    "avg_seconds": round(counts["seconds"] / runs, 3) if runs else None
+                }
+            return {
+                "enabled": ADJUDICATION_CASCADE_CONFIG["enabled"],
+                "claims": total,
+                "tiers": tiers,
+                "escalation_reasons": dict(self._reasons)
+            }
+
+
+cascade_stats = CascadeStats()
+
+
+class AdjudicationCascade:
+    """
+    Tiered adjudication of a single claim document:
+
+    1. rules      - CMS-1500 fields read by rules, ClaimValidator and EligibilityChecker
+    2. extraction - one short LLM call for the few fields rules could not read, same checks
+    3. full       - the full reasoning analysis
+
+    A tier's result is returned only when every required field is present, the
+    validator approves, the policy is eligible and the billed amount is below
+    the high-value threshold; otherwise the claim moves to the next tier.
+    """
+
+    def __init__(self, processor):
+        self.processor = processor
+        self._extraction_llm = None
+        self._eligibility_checker = None
+
+    @property
+    def extraction_llm(self):
+        if self._extraction_llm is None:
+            from .llm_client import create_chat_model
+            self._extraction_llm = create_chat_model(
+                self.processor.api_key, temperature=0, max_tokens=ADJUDICATION_CASCADE_CONFIG["extraction_max_tokens"]
+            )
+        return self._extraction_llm
+
+    @property
+    def eligibility_checker(self):
+        if self._eligibility_checker is None:
+            from .eligibility_checker import EligibilityChecker
+            self._eligibility_checker = EligibilityChecker()
+        return self._eligibility_checker
+
+    def applies(self, document_text: str, claim_type: str) -> bool:
+        """Cheap tiers handle single medical claims; long documents go straight to full analysis"""
+        return (ADJUDICATION_CASCADE_CONFIG["enabled"]
+                and claim_type == "medical_claim"
+                and len(document_text) <= CHUNKED_ANALYSIS_CONFIG["threshold_chars"])
+
+    def adjudicate(self, document_text: str, claim_type: str, trace_id: str,
+                   full_analysis: Callable[[], Dict[str, Any]],
+                   form_fields: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """Run the tiers in order; full_analysis() is only called if both cheap tiers escalate"""
+        reasons: List[str] = []
+        if self.applies(document_text, claim_type):
+            result, reasons = self._run_cheap_tiers(document_text, trace_id, form_fields)
+            if result is not None:
+                return result
+        else:
+            reasons = ["not_eligible_for_cascade"]
+
+        start = time.perf_counter()
+        try:
+            result = full_analysis()
+        finally:
+            cascade_stats.record("full", True, time.perf_counter() - start)
+        result["adjudication"] = {"tier": "full", "escalation_reasons": reasons}
+        return result
+
+    def _run_cheap_tiers(self, document_text: str, trace_id: str,
+                         form_fields: Optional[Dict[str, str]]) -> Tuple[Optional[Dict[str, Any]], List[str]]:
+        required = RULE_EXTRACTION_CONFIG["required_fields"]
+
+        if not (RULE_EXTRACTION_CONFIG["enabled"] and (form_fields or is_cms1500(document_text))):
+            # Both cheap tiers start from the form fields rules read; other documents need full analysis
+            return None, ["not_cms1500"]
+
+        # Tier 1: deterministic rules
+        start = time.perf_counter()
+        fields = self.processor.cms1500_extractor.extract(document_text, form_fields)["fields"]
+        min_confidence = RULE_EXTRACTION_CONFIG["min_field_confidence"]
+        unread = [name for name in required if name not in fields or fields[name]["confidence"] < min_confidence]
+        if unread:
+            reasons = ["unread_fields"]
+            result = None
+        else:
+            result, reasons = self._checked_result(fields, [], "rules")
+        cascade_stats.record("rules", result is not None, time.perf_counter() - start, reasons)
+        if result is not None:
+            result["trace_id"] = trace_id
+            return result, []
+
+        if not unread:
+            return None, reasons  # every field was read; another extraction would not change the checks
+        if llm_circuit.is_open():
+            # Full analysis handles the degraded provider (rules-only fallback / review queue)
+            return None, reasons + ["llm_circuit_open"]
+        if len(unread) > ADJUDICATION_CASCADE_CONFIG["max_extraction_fields"]:
+            # Rules read too little of the form for a short extraction call to fill in
+            return None, reasons + ["too_many_unread_fields"]
+
+        # Tier 2: short extraction call for the fields rules could not read
+        start = time.perf_counter()
+        llm_fields = []
+        extracted = self.processor._extract_fields_with_llm(document_text, unread, llm=self.extraction_llm)
+        for name, value in extracted.items():
+            fields[name] = {
+                "value": value,
+                "confidence": RULE_EXTRACTION_CONFIG["llm_field_confidence"],
+                "source": "llm"
+            }
+            llm_fields.append(name)
+        result, tier_reasons = self._checked_result(fields, llm_fields, "extraction")
+        cascade_stats.record("extraction", result is not None, time.perf_counter() - start, tier_reasons)
+        if result is not None:
+            result["trace_id"] = trace_id
+            return result, []
+        return None, reasons + tier_reasons
+
+    def _checked_result(self, fields: Dict[str, Dict[str, Any]], llm_fields: List[str],
+                        tier: str) -> Tuple[Optional[Dict[str, Any]], List[str]]:
+        """Deterministic result for the fields, or (None, escalation reasons)"""
+        result = self.processor._build_rule_result(fields, llm_fields)
+        extracted_data = result["extracted_data"]
+        reasons = []
+
+        if result["missing_sections"]:
+            reasons.append("missing_fields")
+        # _build_rule_result already ran ClaimValidator: REJECT -> DENIED, FLAG -> NEEDS_REVIEW
+        if result["overall_status"] == "DENIED":
+            reasons.append("validation_failed")
+        elif result["overall_status"] == "NEEDS_REVIEW" and ADJUDICATION_CASCADE_CONFIG["escalate_on_flag"]:
+            reasons.append("validation_flagged")
+
+        amount = self._amount(extracted_data.get("billed_amount"))
+        if amount is None or amount >= ADJUDICATION_CASCADE_CONFIG["high_value_amount"]:
+            reasons.append("high_value" if amount is not None else "unreadable_amount")
+
+        eligibility = None
+        if not reasons:
+            eligibility = self._check_eligibility(extracted_data, amount)
+            if eligibility["status"] == "ineligible":
+                reasons.append("ineligible")
+            elif eligibility["status"] == "unknown_policy" and ADJUDICATION_CASCADE_CONFIG["escalate_on_unknown_policy"]:
+                reasons.append("unknown_policy")
+        if reasons:
+            return None, reasons
+
+        if eligibility["status"] == "eligible":
+            result["key_factors"].append("Policy active and service covered")
+        result["processing_method"] = f"cascade_{tier}"
+        result["adjudication"] = {"tier": tier, "escalation_reasons": [], "eligibility": eligibility}
+        return result, []
+
+    def _check_eligibility(self, extracted_data: Dict[str, Any], amount: float) -> Dict[str, Any]:
+        try:
+            eligibility = self.eligibility_checker.check_eligibility(dict(
+                extracted_data, amount_billed=amount, service_type=extracted_data.get("service_type", "general")
+            ))
+        except Exception as e:
+            print(f"⚠️  Eligibility check failed: {e}")
+            return {"status": "unknown_policy", "reason": str(e)}
+        if "details" in eligibility:
+            # check_eligibility returns "details" only when the policy lookup failed
+            return {"status": "unknown_policy", "reason": eligibility.get("reason")}
+        # The document carries no policy service category, so "not in covered services"
+        # is not a finding; an explicit exclusion, inactive policy or exceeded limit is
+        failed = [
+            check["check_type"] for check in eligibility["checks"]
+            if check["critical"] and not check["passed"]
+            and not (check["check_type"] == "service_coverage" and "excluded_services" not in check["details"])
+        ]
+        return {"status": "ineligible" if failed else "eligible", "failed_checks": failed}
+
+    @staticmethod
+    def _amount(value) -> Optional[float]:
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return None
+
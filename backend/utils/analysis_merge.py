@@ -0,0 +1,170 @@
+import json
+import re
+from typing import Dict, List, Any, Optional
+
+# Values the LLM uses when it could not find a field
+EMPTY_FIELD_VALUES = {"", "n/a", "na", "none", "null", "unknown", "not found", "not provided", "not available"}
+
+# Error messages meaning "this field was absent" (resolved if another chunk found it).
+# Anchored to the start or end of the message, so "missing decimal places" or
+# "no match for provider" are kept as real errors.
+MISSING_FIELD_PATTERNS = (
+    re.compile(r"^(?:required (?:field )?)?(?:missing|absent|not (?:found|provided|present))\b"),
+    re.compile(r"\b(?:missing|absent|not (?:found|provided|present))"
+               r"(?: (?:in|from|on) (?:the |this )?(?:document|form|claim|text|chunk|page|section|part))?\.?$"),
+)
+
+FAILED_STATUSES = {"ERROR", "TIMEOUT", "OCR_REQUIRED"}
+
+
+def _is_empty(value: Any) -> bool:
+    if value is None:
+        return True
+    if isinstance(value, (list, dict)):
+        return len(value) == 0
+    return str(value).strip().lower() in EMPTY_FIELD_VALUES
+
+
+def _normalize(value: Any) -> str:
+    """Comparison key for a field value (case and whitespace insensitive)"""
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, sort_keys=True).lower()
+    return " ".join(str(value).lower().split())
+
+
+def _unique(items: List[Any]) -> List[Any]:
+    """De-duplicate while preserving first-seen order"""
+    seen = set()
+    result = []
+    for item in items:
+        key = _normalize(item)
+        if key not in seen:
+            seen.add(key)
+            result.append(item)
+    return result
+
+
+def _reports_missing(field: str, message: str) -> bool:
+    """True when a validation error only says the field was absent"""
+    message = message.strip()
+    if any(pattern.search(message) for pattern in MISSING_FIELD_PATTERNS):
+        return True
+    # "No policy number provided" - only when it names the field itself
+    label = field.replace("_", " ").lower()
+    return bool(label) and re.match(rf"no {re.escape(label)}\b", message) is not None
+
+
+def merge_extracted_data(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Merge extracted_data from several partial analyses
+
+    Each field takes the value reported by the most chunks; ties go to the
+    earliest chunk since claim forms put their header fields first.
+    Returns {"extracted_data": {...}, "field_conflicts": {...}}
+    """
+    candidates: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    for position, result in enumerate(results):
+        for field, value in (result.get("extracted_data") or {}).items():
+            if _is_empty(value):
+                continue
+            key = _normalize(value)
+            field_candidates = candidates.setdefault(field, {})
+            if key not in field_candidates:
+                field_candidates[key] = {"value": value, "sources": [], "first_seen": position}
+            field_candidates[key]["sources"].append(result.get("chunk_index", position))
+
+    merged = {}
+    conflicts = {}
+    for field, options in candidates.items():
+        ranked = sorted(options.values(), key=lambda c: (-len(c["sources"]), c["first_seen"]))
+        merged[field] = ranked[0]["value"]
+        if len(ranked) > 1:
+            conflicts[field] = {
+                "selected": ranked[0]["value"],
+                "candidates": [{"value": c["value"], "sources": c["sources"]} for c in ranked]
+            }
+
+    return {"extracted_data": merged, "field_conflicts": conflicts}
+
+
+def merge_validation_errors(results: List[Dict[str, Any]], extracted_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Union validation errors, dropping duplicates and "missing field" errors
+    for fields that another analysis did find
+    """
+    merged = []
+    seen = set()
+    for result in results:
+        for error in result.get("validation_errors", []) or []:
+            if not isinstance(error, dict):
+                error = {"field": "unknown", "error": str(error)}
+            field = error.get("field", "")
+            message = str(error.get("error", "")).lower()
+            if field in extracted_data and _reports_missing(field, message):
+                continue
+            key = (_normalize(field), _normalize(message))
+            if key in seen:
+                continue
+            seen.add(key)
+            merged.append(error)
+    return merged
+
+
+def merge_analysis_results(results: List[Dict[str, Any]], primary: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Merge several analysis results (document chunks, or documents of one claim)
+    into a single result with the same shape as analyze_claim_document output
+    """
+    successful = [r for r in results if r and r.get("overall_status") not in FAILED_STATUSES]
+    failed = [r for r in results if not r or r.get("overall_status") in FAILED_STATUSES]
+
+    if not successful:
+        return dict(failed[0]) if failed and failed[0] else {}
+
+    if primary is None:
+        primary = max(successful, key=lambda r: r.get("completeness_score", 0) or 0)
+
+    data = merge_extracted_data(successful)
+    extracted_data = data["extracted_data"]
+
+    found_sections = _unique([s for r in successful for s in r.get("found_sections", []) or []])
+    found_keys = {_normalize(s) for s in found_sections}
+    missing_sections = _unique([
+        s for r in successful for s in r.get("missing_sections", []) or []
+        if _normalize(s) not in found_keys
+    ])
+
+    statuses = {r.get("overall_status") for r in successful}
+    disagreement = len(statuses) > 1
+    overall_status = "NEEDS_REVIEW" if disagreement else statuses.pop()
+
+    section_total = len(found_sections) + len(missing_sections)
+    section_score = round(100 * len(found_sections) / section_total) if section_total else 0
+    completeness_score = max([section_score] + [r.get("completeness_score", 0) or 0 for r in successful])
+
+    merged = dict(primary)
+    merged.update({
+        "overall_status": overall_status,
+        "key_factors": _unique([f for r in successful for f in r.get("key_factors", []) or []]),
+        "completeness_score": completeness_score,
+        "missing_sections": missing_sections,
+        "found_sections": found_sections,
+        "validation_errors": merge_validation_errors(successful, extracted_data),
+        "data_quality_issues": _unique([i for r in successful for i in r.get("data_quality_issues", []) or []]),
+        "recommendations": _unique([rec for r in successful for rec in r.get("recommendations", []) or []]),
+        "extracted_data": extracted_data,
+        "confidence_level": min(r.get("confidence_level", 0) or 0 for r in successful),
+    })
+    merged.pop("raw_llm_response", None)
+
+    if data["field_conflicts"]:
+        merged["field_conflicts"] = data["field_conflicts"]
+    if disagreement:
+        merged["decision_reasoning"] = (
+            f"{primary.get('decision_reasoning', '')} "
+            "Partial analyses disagreed on the decision, so the claim is flagged for manual review."
+        ).strip()
+    if failed:
+        merged["failed_parts"] = len(failed)
+
+    return merged
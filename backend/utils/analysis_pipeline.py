@@ -0,0 +1,583 @@
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+from werkzeug.utils import secure_filename
+
+from .blob_store import blob_store
+from .claim_graph import CLAIM_GRAPH_AVAILABLE, ClaimPipelineGraph
+from .analysis_merge import FAILED_STATUSES, merge_analysis_results
+from .database import DatabaseManager
+from .document_processor import DocumentProcessor
+from .job_queue import JobQueue
+from .llm_scheduler import BATCH, llm_priority
+from .metrics import stage_timer, timed_stage
+from .prompt import OCR_NOT_AVAILABLE_MESSAGE
+from .similarity_index import get_similarity_index
+from .single_flight import LeaderAbandonedError, document_flights, file_sha256, text_sha256
+from .telemetry import sampling_scope
+
+ALLOWED_EXTENSIONS = {'pdf', 'png', 'jpg', 'jpeg', 'tiff', 'bmp', 'txt'}
+
+DOCUMENT_ANALYSIS_JOB = 'document_analysis'
+
+# Batch upload limits (overridable from .env)
+BATCH_MAX_FILES = int(os.getenv('BATCH_MAX_FILES', '50'))
+BATCH_MAX_CONCURRENCY = int(os.getenv('BATCH_MAX_CONCURRENCY', '4'))
+BATCH_EXTRACT_WORKERS = int(os.getenv('BATCH_EXTRACT_WORKERS', '4'))
+
+# Analysis fields kept per document in the claim analysis state (enough to re-merge without the LLM)
+CLAIM_STATE_FIELDS = (
+    'overall_status', 'decision_reasoning', 'key_factors', 'completeness_score', 'missing_sections',
+    'found_sections', 'validation_errors', 'data_quality_issues', 'recommendations', 'extracted_data',
+    'confidence_level', 'processing_method'
+)
+# Concurrent uploads to one claim retry their merge on a version conflict
+CLAIM_STATE_MAX_RETRIES = 5
+
+# Progress reported after each pipeline stage completes
+STAGE_PROGRESS = {
+    'extracted': 30,
+    'analyzed': 70,
+    'suggestions': 80,
+    'comparison': 90,
+    'saved': 95,
+    'complete': 100
+}
+
+
+class PipelineError(Exception):
+    """
+    Client-side problem with an upload (bad file, no extractable text).
+    Never retried by the job queue.
+    """
+    retryable = False
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def save_uploaded_file(file, sequence: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Validate and store an uploaded werkzeug FileStorage in the content-addressed
+    blob store under uploads/blobs. The upload is hashed while it is written, and
+    identical content is stored once (deduplicated=True for a repeat).
+    sequence keeps DOC_* ids unique when several files arrive in the same second.
+    """
+    if file is None:
+        raise PipelineError('No document file provided')
+    if file.filename == '':
+        raise PipelineError('No file selected')
+
+    # Validate file type (temporarily allow .txt for testing)
+    file_ext = file.filename.rsplit('.', 1)[1].lower() if '.' in file.filename else ''
+    if file_ext not in ALLOWED_EXTENSIONS:
+        raise PipelineError(f'File type {file_ext} not supported. Use: {", ".join(ALLOWED_EXTENSIONS)}')
+
+    with stage_timer("upload_save"):
+        filename = secure_filename(file.filename)
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        if sequence is not None:
+            timestamp = f"{timestamp}_{sequence:03d}"
+        file.stream.seek(0)
+        blob = blob_store.put(file.stream)
+
+    return {
+        'original_filename': filename,
+        'stored_filename': blob['stored_name'],
+        'file_type': file_ext,
+        'file_path': blob['path'],
+        'file_size': blob['size'],
+        'content_hash': blob['content_hash'],
+        'deduplicated': blob['deduplicated'],
+        'timestamp': timestamp
+    }
+
+
+def analysis_failure_result(error: Exception, recommendations=None) -> Dict[str, Any]:
+    """Partial result returned when analysis raised instead of producing a result"""
+    return {
+        "overall_status": "ERROR",
+        "completeness_score": 0,
+        "missing_sections": ["Analysis failed"],
+        "found_sections": [],
+        "data_quality_issues": [],
+        "validation_errors": [{"field": "analysis", "error": str(error), "expected_format": "valid_processing"}],
+        "recommendations": recommendations or ["Try with a smaller document", "Check document format"],
+        "extracted_data": {},
+        "confidence_level": 0,
+        "processing_notes": f"Analysis failed: {str(error)}"
+    }
+
+
+def extract_document_text(processor: DocumentProcessor, upload: Dict[str, Any], claim_type: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+    """
+    Extract text from a stored upload. PDFs are extracted page by page and
+    analysis starts on the first pages, so an analysis result may come back too.
+    """
+    analysis_result = None
+    cached_text = cached_extraction(upload)
+    if cached_text is not None:
+        processor.last_extraction = {'method': 'cached', 'content_hash': upload['content_hash']}
+        return cached_text, None
+
+    if upload['file_type'] == 'pdf':
+        try:
+            document_text, analysis_result = processor.analyze_pdf_streaming(upload['file_path'], claim_type)
+        except Exception as e:
+            raise Exception(f"Text extraction failed: {str(e)}")
+    else:
+        document_text = processor.extract_text_from_file(upload['file_path'], upload['file_type'])
+
+    if not document_text.strip():
+        raise PipelineError('No text could be extracted from the document')
+    return document_text, analysis_result
+
+
+def cached_extraction(upload: Dict[str, Any]) -> Optional[str]:
+    """Text already extracted from an identical blob, so a re-upload skips extraction/OCR"""
+    if not upload.get('deduplicated') or not upload.get('content_hash'):
+        return None
+    try:
+        text = DatabaseManager().get_cached_extraction(upload['content_hash'])
+    except Exception as e:
+        print(f"⚠️  Extraction cache lookup failed: {e}")
+        return None
+    # An OCR-unavailable placeholder is not a real extraction - retry in case OCR is installed now
+    if text is None or text.lstrip().startswith(OCR_NOT_AVAILABLE_MESSAGE.strip().splitlines()[0]):
+        return None
+    return text
+
+
+def _extract_upload(processor: DocumentProcessor, upload: Dict[str, Any]) -> Tuple[str, Optional[Dict[str, Any]]]:
+    """extract_document for a stored upload, reusing the cached text of an identical blob"""
+    cached_text = cached_extraction(upload)
+    if cached_text is not None:
+        return cached_text, {'method': 'cached', 'content_hash': upload['content_hash']}
+    return processor.extract_document(upload['file_path'], upload['file_type'])
+
+
+@timed_stage("db_write")
+def persist_document_analysis(db: DatabaseManager, claim_id: str, upload: Dict[str, Any], document_text: str,
+                              analysis_result: Dict[str, Any], claim_type: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Save the document and merge its GPT-4 analysis into the claim's analysis state;
+    the claim's validation result and recommendation are updated from the merged
+    analysis. Returns the merged claim analysis.
+    When claim_type is given a new claim row is created from the extracted data first.
+    """
+    if claim_type is not None:
+        # Save the claim with extracted data
+        extracted_data = analysis_result.get('extracted_data', {})
+        document_data = {
+            'claim_id': claim_id,
+            'patient_id': extracted_data.get('patient_id', 'PH-456789'),
+            'patient_name': extracted_data.get('patient_name', 'John Michael Smith'),
+            'date_of_birth': extracted_data.get('date_of_birth', '1900-01-01'),
+            'policy_number': extracted_data.get('policy_number', 'POL-2024-789456'),
+            'provider_name': extracted_data.get('provider_name', 'N/A'),
+            'provider_id': 'DOC_UPLOAD',
+            'service_date': extracted_data.get('service_date', '2024-10-15'),
+            'service_type': claim_type,
+            'diagnosis_code': extracted_data.get('diagnosis_code', 'N/A'),
+            'procedure_code': extracted_data.get('procedure_code', 'N/A'),
+            'amount_billed': float(extracted_data.get('billed_amount', 2850))
+        }
+        db.save_claim(document_data)
+
+    # Save document information
+    document_info = {
+        'original_filename': upload['original_filename'],
+        'stored_filename': upload['stored_filename'],
+        'file_type': upload['file_type'],
+        'file_size': upload['file_size'],
+        'file_path': upload['file_path'],
+        'extracted_text': document_text,
+        'content_hash': upload.get('content_hash')
+    }
+    document_id = db.save_document(claim_id, document_info)
+    try:
+        get_similarity_index().add_document(document_id, document_text, analysis_result.get('extracted_data') or {})
+    except Exception as index_error:
+        print(f"⚠️  Similarity index update failed: {index_error}")
+
+    return update_claim_analysis(db, claim_id, {
+        'document_id': document_id,
+        'filename': upload['original_filename'],
+        'content_hash': upload.get('content_hash'),
+        'analyzed_at': datetime.now().isoformat(),
+        'analysis': {field: analysis_result[field] for field in CLAIM_STATE_FIELDS if field in analysis_result}
+    })
+
+
+def find_analyzed_document(db: DatabaseManager, claim_id: str, content_hash: Optional[str]) -> Optional[Dict[str, Any]]:
+    """The claim's stored analysis of a document with this content, if it was already analyzed"""
+    if not content_hash:
+        return None
+    state = db.get_claim_analysis_state(claim_id)
+    for entry in (state or {}).get('document_results', []):
+        if entry.get('content_hash') == content_hash:
+            return entry
+    return None
+
+
+def update_claim_analysis(db: DatabaseManager, claim_id: str, document_entry: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Merge one document's analysis into the claim's stored state. Only the stored
+    per-document summaries are merged - earlier documents are never sent to the
+    LLM again. A re-upload of the same content replaces its earlier entry.
+    """
+    for _ in range(CLAIM_STATE_MAX_RETRIES):
+        state = db.get_claim_analysis_state(claim_id)
+        entry_key = document_entry.get('content_hash') or document_entry['document_id']
+        document_results = [
+            entry for entry in (state['document_results'] if state else [])
+            if (entry.get('content_hash') or entry['document_id']) != entry_key
+        ] + [document_entry]
+
+        merged = merge_analysis_results([entry['analysis'] for entry in document_results])
+        succeeded = bool(merged) and merged.get('overall_status') not in FAILED_STATUSES
+        merged['documents_analyzed'] = len(document_results)
+        version = db.save_claim_analysis_state(
+            claim_id, state['version'] if state else None, merged, document_results,
+            _validation_data(merged) if succeeded else None,
+            _recommendation_data(merged) if succeeded else None
+        )
+        if version is not None:
+            return merged
+    print(f"⚠️  Claim analysis state for {claim_id} kept changing; document analysis not merged")
+    return None
+
+
+def _validation_data(analysis_result: Dict[str, Any]) -> Dict[str, Any]:
+    """GPT-4 validation result row for the validation_results table"""
+    return {
+        'is_valid': analysis_result.get('overall_status') == 'APPROVED',
+        'issues': analysis_result.get('validation_errors', []),
+        'recommendation': analysis_result.get('overall_status'),
+        'total_issues': len(analysis_result.get('validation_errors', []))
+    }
+
+
+def _recommendation_data(analysis_result: Dict[str, Any]) -> Dict[str, Any]:
+    """GPT-4 recommendation with decision reasoning for the recommendations table"""
+    return {
+        'recommendation': analysis_result.get('overall_status'),
+        'confidence': analysis_result.get('confidence_level', 0),
+        'reason': analysis_result.get('decision_reasoning', 'No reasoning provided'),
+        'priority': 'HIGH' if analysis_result.get('overall_status') == 'DENIED' else 'MEDIUM',
+        'suggested_actions': analysis_result.get('key_factors', []) + analysis_result.get('recommendations', []),
+        'overall_score': analysis_result.get('completeness_score', 0)
+    }
+
+
+def iter_analysis_stages(processor: DocumentProcessor, document_text: str, claim_type: str,
+                         analysis_result: Optional[Dict[str, Any]] = None, label: str = "document",
+                         stream_tokens: bool = False):
+    """
+    Analysis, suggestions and comparison stages shared by the upload and text pipelines.
+    Yields (event, data) pairs and returns (analysis_result, suggestions, comparison).
+    With stream_tokens, LLM output is streamed and ("partial", {...}) events are
+    yielded as extracted_data fields finish parsing.
+    """
+    # Analyze with GPT-4 (with timeout handling)
+    yield 'stage_started', {'stage': 'analyze'}
+    try:
+        if analysis_result is None:
+            print(f"Starting analysis for {label}")
+            if stream_tokens:
+                for event, data in processor.stream_claim_analysis(document_text, claim_type):
+                    if event == 'partial':
+                        yield 'partial', data
+                    else:
+                        analysis_result = data
+            else:
+                analysis_result = processor.analyze_claim_document(document_text, claim_type)
+            print(f"Analysis completed for {label}")
+    except Exception as analysis_error:
+        print(f"Analysis failed for {label}, Error: {str(analysis_error)}")
+        # Return partial result with error info
+        analysis_result = analysis_failure_result(analysis_error)
+    yield 'analyzed', {'document_analysis': analysis_result}
+
+    # Get improvement suggestions
+    yield 'stage_started', {'stage': 'suggestions'}
+    suggestions = processor.get_improvement_suggestions(analysis_result)
+    yield 'suggestions', {'improvement_suggestions': suggestions}
+
+    # Skip detailed comparison if analysis failed
+    yield 'stage_started', {'stage': 'comparison'}
+    if analysis_result.get("overall_status") != "ERROR":
+        try:
+            comparison = processor.compare_with_approved_claims(document_text)
+        except Exception as comp_error:
+            print(f"Comparison failed: {str(comp_error)}")
+            comparison = {"error": "Comparison analysis failed", "details": str(comp_error)}
+    else:
+        comparison = {"error": "Skipped due to analysis failure"}
+    yield 'comparison', {'comparison_with_approved': comparison}
+
+    return analysis_result, suggestions, comparison
+
+
+def _iter_single_flight(key: str, events: Iterator[Tuple[str, Dict[str, Any]]]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Run a pipeline only if no identical one is in flight in this process. A
+    duplicate yields ("deduplicated", {...}) and then the running pipeline's
+    complete event, without starting its own extraction, LLM calls or claim.
+    """
+    while True:
+        call, leader = document_flights.begin(key)
+        if leader:
+            break
+        yield 'deduplicated', {'message': 'Identical document is already being analyzed - sharing its result'}
+        try:
+            response = document_flights.wait(call)
+        except LeaderAbandonedError:
+            continue  # the first request went away before finishing - run it here instead
+        events.close()
+        yield 'complete', dict(response, deduplicated=True)
+        return
+
+    try:
+        for event, data in events:
+            if event == 'complete':
+                document_flights.finish(key, call, result=data)
+            yield event, data
+    except Exception as e:
+        document_flights.finish(key, call, error=e)
+        raise
+    finally:
+        # No-op after a result or error; covers a client disconnect closing the generator
+        document_flights.finish(key, call, error=LeaderAbandonedError("Pipeline stopped before completing"))
+
+
+def iter_document_pipeline(upload: Dict[str, Any], claim_type: str,
+                           processor: Optional[DocumentProcessor] = None,
+                           stream_tokens: bool = False,
+                           run_id: Optional[str] = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Run the full upload pipeline (extract, analyze, suggestions, comparison, save),
+    yielding (event, data) as each stage starts and completes.
+    The last event is ("complete", response). Concurrent uploads of the same
+    content and claim type share one run (and one DOC_* claim).
+
+    Without token streaming the pipeline runs as a checkpointed LangGraph graph
+    (see claim_graph); calling again with the same run_id after a failure resumes
+    from the last completed node.
+    """
+    content_hash = upload.get('content_hash') or file_sha256(upload['file_path'])
+    if CLAIM_GRAPH_AVAILABLE and not stream_tokens:
+        stages = ClaimPipelineGraph(processor).iter_run(upload, claim_type, thread_id=run_id)
+    else:
+        stages = _iter_document_stages(upload, claim_type, processor, stream_tokens)
+    return _iter_single_flight(f"document:{content_hash}:{claim_type}", stages)
+
+
+def _iter_document_stages(upload: Dict[str, Any], claim_type: str, processor: Optional[DocumentProcessor],
+                          stream_tokens: bool) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    processor = processor or DocumentProcessor()
+    filename = upload['original_filename']
+
+    yield 'stage_started', {'stage': 'extract'}
+    document_text, analysis_result = extract_document_text(processor, upload, claim_type)
+    yield 'extracted', {
+        'characters': len(document_text),
+        'extraction': processor.last_extraction
+    }
+
+    analysis_result, suggestions, comparison = yield from iter_analysis_stages(
+        processor, document_text, claim_type, analysis_result,
+        label=f"document: {filename}", stream_tokens=stream_tokens
+    )
+
+    # Generate claim ID
+    claim_id = f"DOC_{upload['timestamp']}"
+
+    # Save to database with GPT-4 analysis results
+    yield 'stage_started', {'stage': 'save'}
+    try:
+        persist_document_analysis(DatabaseManager(), claim_id, upload, document_text, analysis_result, claim_type=claim_type)
+    except Exception as db_error:
+        print(f"Database save error: {db_error}")
+    yield 'saved', {'claim_id': claim_id}
+
+    yield 'complete', {
+        'claim_id': claim_id,
+        'status': 'analyzed',
+        'document_analysis': analysis_result,
+        'improvement_suggestions': suggestions,
+        'comparison_with_approved': comparison,
+        'extracted_text_preview': document_text[:500] + "..." if len(document_text) > 500 else document_text,
+        'file_info': {
+            'original_name': filename,
+            'file_type': upload['file_type'],
+            'size_bytes': upload['file_size'],
+            'processed_at': datetime.now().isoformat(),
+            'extraction': processor.last_extraction
+        }
+    }
+
+
+def iter_text_pipeline(text: str, claim_type: str, processor: Optional[DocumentProcessor] = None,
+                       stream_tokens: bool = False) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Analyze raw claim text (no file, nothing persisted); last event is ("complete", response).
+    Identical concurrent requests share one run.
+    """
+    return _iter_single_flight(
+        f"text:{text_sha256(text)}:{claim_type}",
+        _iter_text_stages(text, claim_type, processor, stream_tokens)
+    )
+
+
+def _iter_text_stages(text: str, claim_type: str, processor: Optional[DocumentProcessor],
+                      stream_tokens: bool) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    processor = processor or DocumentProcessor()
+
+    analysis_result, suggestions, comparison = yield from iter_analysis_stages(
+        processor, text, claim_type, label="text", stream_tokens=stream_tokens
+    )
+
+    yield 'complete', {
+        'status': 'analyzed',
+        'document_analysis': analysis_result,
+        'improvement_suggestions': suggestions,
+        'comparison_with_approved': comparison
+    }
+
+
+def _batch_file_result(index: int, upload: Dict[str, Any], **fields) -> Dict[str, Any]:
+    result = {
+        'index': index,
+        'filename': upload['original_filename'],
+        'file_type': upload['file_type'],
+        'size_bytes': upload['file_size']
+    }
+    result.update(fields)
+    return result
+
+
+def iter_batch_pipeline(uploads: List[Dict[str, Any]], claim_type: str,
+                        max_concurrency: int = BATCH_MAX_CONCURRENCY,
+                        rejected: Optional[List[Dict[str, Any]]] = None,
+                        processor: Optional[DocumentProcessor] = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Extract and analyze many uploads, saving each as its own claim.
+    Extraction runs on the PDF/OCR worker pools; analyses go through LangChain
+    batch with at most max_concurrency in flight. Yields ("file_result", {...})
+    per file as it finishes and finally ("complete", summary).
+    rejected holds files that failed validation on upload ({"filename", "error"}).
+    Suggestions and the approved-claim comparison are not run for batches.
+    Identical files in one batch are extracted and analyzed once and share a claim.
+    """
+    processor = processor or DocumentProcessor()
+    start = time.perf_counter()
+    summaries = []
+
+    def record(event_data):
+        summaries.append({key: event_data.get(key) for key in ('index', 'filename', 'status', 'claim_id', 'overall_status', 'error')})
+        return 'file_result', event_data
+
+    # Identical files (same content) are analyzed once; the copies report the same outcome
+    unique = {}
+    copies = defaultdict(list)
+    for index, upload in enumerate(uploads):
+        content_hash = upload.get('content_hash') or file_sha256(upload['file_path'])
+        if content_hash in unique:
+            copies[unique[content_hash]].append(index)
+        else:
+            unique[content_hash] = index
+
+    def record_with_copies(index, **fields):
+        yield record(_batch_file_result(index, uploads[index], **fields))
+        for copy in copies.get(index, []):
+            yield record(_batch_file_result(copy, uploads[copy], deduplicated=True, **fields))
+
+    for item in rejected or []:
+        yield record({'index': None, 'filename': item['filename'], 'status': 'rejected', 'error': item['error']})
+
+    # Extract every file; the heavy lifting happens in the shared process pools
+    extracted = []
+    with ThreadPoolExecutor(max_workers=max(1, BATCH_EXTRACT_WORKERS)) as executor:
+        futures = {
+            executor.submit(_extract_upload, processor, uploads[index]): index
+            for index in unique.values()
+        }
+        for future in as_completed(futures):
+            index = futures[future]
+            upload = uploads[index]
+            try:
+                document_text, extraction = future.result()
+                if not document_text.strip():
+                    raise PipelineError('No text could be extracted from the document')
+                extracted.append((index, document_text, extraction))
+            except Exception as e:
+                print(f"Batch extraction failed for {upload['original_filename']}: {e}")
+                yield from record_with_copies(index, status='failed', error=str(e))
+
+    yield 'extracted', {
+        'extracted': len(extracted),
+        'failed': len(unique) - len(extracted),
+        'duplicates': len(uploads) - len(unique)
+    }
+
+    # Analyze through LangChain batch and save each claim as soon as its analysis returns
+    texts = [document_text for _, document_text, _ in extracted]
+    for position, analysis_result in processor.analyze_claim_documents_batch(texts, claim_type, max_concurrency, priority=BATCH):
+        index, document_text, extraction = extracted[position]
+        upload = uploads[index]
+        claim_id = f"DOC_{upload['timestamp']}"
+        try:
+            persist_document_analysis(DatabaseManager(), claim_id, upload, document_text, analysis_result, claim_type=claim_type)
+        except Exception as db_error:
+            print(f"Database save error: {db_error}")
+        yield from record_with_copies(
+            index,
+            status='analyzed',
+            claim_id=claim_id,
+            overall_status=analysis_result.get('overall_status'),
+            document_analysis=analysis_result,
+            extraction=extraction
+        )
+
+    summaries.sort(key=lambda item: -1 if item['index'] is None else item['index'])
+    yield 'complete', {
+        'status': 'completed',
+        'total': len(summaries),
+        'analyzed': sum(1 for item in summaries if item['status'] == 'analyzed'),
+        'failed': sum(1 for item in summaries if item['status'] != 'analyzed'),
+        'max_concurrency': max_concurrency,
+        'elapsed_seconds': round(time.perf_counter() - start, 2),
+        'results': summaries
+    }
+
+
+def run_pipeline(events: Iterator[Tuple[str, Dict[str, Any]]]) -> Dict[str, Any]:
+    """Drain a pipeline generator and return its final response"""
+    for event, data in events:
+        if event == 'complete':
+            return data
+    raise Exception("Pipeline ended without a result")
+
+
+def run_document_analysis_job(payload: Dict[str, Any], context) -> Dict[str, Any]:
+    """Job handler: run the upload pipeline in a background worker, reporting progress"""
+    context.progress('started', 5)
+    # An upload the user is polling for stays interactive; re-analysis jobs pass "background"
+    with llm_priority(payload.get('priority', 'interactive')), sampling_scope(f"job:{DOCUMENT_ANALYSIS_JOB}"):
+        # Keyed by job id, so a retried attempt resumes from the failed attempt's checkpoint
+        events = iter_document_pipeline(payload['upload'], payload['claim_type'], run_id=f"job-{context.job_id}")
+        for event, data in events:
+            if event in STAGE_PROGRESS:
+                context.progress(event, STAGE_PROGRESS[event])
+            if event == 'complete':
+                return data
+    raise Exception("Document pipeline ended without a result")
+
+
+JobQueue.register_handler(DOCUMENT_ANALYSIS_JOB, run_document_analysis_job)
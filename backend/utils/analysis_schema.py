@@ -0,0 +1,210 @@
+import re
+import json
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from pydantic import BaseModel, ConfigDict, Field, ValidationError, field_validator
+
+from .metrics import registry
+
+ANALYSIS_STATUSES = ("APPROVED", "DENIED", "NEEDS_REVIEW")
+
+# Used for fields still invalid after the re-ask, so one bad field never discards the analysis
+FIELD_FALLBACKS = {
+    "overall_status": "NEEDS_REVIEW",
+    "decision_reasoning": "Decision reasoning could not be read from the model output.",
+    "completeness_score": 0,
+    "extracted_data": {},
+    "confidence_level": 0
+}
+
+PARSE_OUTCOMES = registry.counter(
+    "claimsai_analysis_parse_total",
+    "Analysis responses by parse outcome (valid, repaired, reasked, defaulted, failed)",
+    ("outcome",)
+)
+
+
+class ValidationIssue(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+    field: str = "general"
+    error: str
+    expected_format: str = ""
+
+
+class ClaimAnalysis(BaseModel):
+    """Output contract of CLAIMS_ANALYSIS_PROMPT_TEMPLATE; unknown keys are kept as-is"""
+    model_config = ConfigDict(extra="allow")
+
+    overall_status: str = Field(description='"APPROVED", "DENIED", or "NEEDS_REVIEW"')
+    decision_reasoning: str = Field(description="Detailed explanation (4-6 sentences) of the decision")
+    key_factors: List[str] = Field(default_factory=list, description="3-5 factors that most influenced the decision")
+    completeness_score: int = Field(ge=0, le=100, description="0-100, percentage of required information present")
+    missing_sections: List[str] = Field(default_factory=list, description="Missing required sections/information")
+    found_sections: List[str] = Field(default_factory=list, description="Sections/information found and complete")
+    validation_errors: List[ValidationIssue] = Field(
+        default_factory=list, description='Issues found, each {"field", "error", "expected_format"}'
+    )
+    recommendations: List[Union[str, Dict[str, Any]]] = Field(
+        default_factory=list, description="Specific actionable recommendations"
+    )
+    extracted_data: Dict[str, Any] = Field(description="Object with all extracted claim information")
+    confidence_level: int = Field(ge=0, le=100, description="0-100, confidence in the decision")
+    processing_notes: str = Field(default="", description="Summary of the analysis process")
+
+    @field_validator("overall_status", mode="before")
+    @classmethod
+    def _normalize_status(cls, value):
+        if isinstance(value, str):
+            value = re.sub(r"[\s-]+", "_", value.strip().upper())
+            if value not in ANALYSIS_STATUSES:
+                raise ValueError(f"must be one of {', '.join(ANALYSIS_STATUSES)}")
+        return value
+
+    @field_validator("completeness_score", "confidence_level", mode="before")
+    @classmethod
+    def _parse_percent(cls, value):
+        if isinstance(value, str):
+            value = value.strip().rstrip("%").strip()
+        if isinstance(value, (str, float)):
+            try:
+                return round(float(value))
+            except ValueError:
+                return value
+        return value
+
+    @field_validator("key_factors", "missing_sections", "found_sections", mode="before")
+    @classmethod
+    def _string_list(cls, value):
+        if isinstance(value, str):
+            return [value] if value.strip() else []
+        if isinstance(value, list):
+            return [
+                "; ".join(str(v) for v in item.values()) if isinstance(item, dict) else str(item)
+                for item in value
+            ]
+        return value
+
+    @field_validator("recommendations", mode="before")
+    @classmethod
+    def _recommendation_list(cls, value):
+        if isinstance(value, str):
+            return [value] if value.strip() else []
+        return value
+
+    @field_validator("validation_errors", mode="before")
+    @classmethod
+    def _issue_list(cls, value):
+        if isinstance(value, (str, dict)):
+            value = [value]
+        if isinstance(value, list):
+            return [{"field": "general", "error": item} if isinstance(item, str) else item for item in value]
+        return value
+
+    @field_validator("extracted_data", mode="before")
+    @classmethod
+    def _empty_extraction(cls, value):
+        return {} if value is None else value
+
+
+def field_descriptions(fields: List[str]) -> str:
+    """One "- name: description" line per field, for the re-ask prompt"""
+    lines = []
+    for name in fields:
+        info = ClaimAnalysis.model_fields.get(name)
+        lines.append(f"- {name}: {info.description if info else 'value'}")
+    return "\n".join(lines)
+
+
+def repair_json(content: str) -> str:
+    """
+    Fix common near-misses in model JSON: code fences, prose around the object,
+    smart quotes, trailing commas, Python literals and truncated output
+    """
+    text = content.strip()
+    fence = re.match(r"^```[a-zA-Z]*\s*\n?(.*?)(?:\n?```\s*)?$", text, re.DOTALL)
+    if fence:
+        text = fence.group(1).strip()
+    start = text.find("{")
+    if start > 0:
+        text = text[start:]
+    end = text.rfind("}")
+    if end != -1 and text[end + 1:].strip() and "{" not in text[end + 1:]:
+        text = text[:end + 1]
+    # Smart quotes only where they delimit keys/values, so quoted prose inside strings survives
+    text = re.sub(r'([{\[,:]\s*)[“”]', r'\1"', text)
+    text = re.sub(r'[“”](\s*[,:}\]])', r'"\1', text)
+    text = re.sub(r",\s*([}\]])", r"\1", text)
+    text = re.sub(r"(?<=[:\[,\s])(True|False|None)(?=\s*[,}\]])",
+                  lambda m: {"True": "true", "False": "false", "None": "null"}[m.group(1)], text)
+    return _close_truncated(text)
+
+
+def _close_truncated(text: str) -> str:
+    """Close an unterminated string and any open brackets left by a cut-off response"""
+    stack = []
+    in_string = escaped = False
+    for char in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+        elif char in "}]" and stack:
+            stack.pop()
+    if in_string:
+        text += '"'
+    if stack:
+        text = re.sub(r",\s*$", "", text.rstrip())
+        text = re.sub(r',\s*"[^"]*"\s*:?\s*$', "", text)  # drop a dangling key with no value
+        text += "".join(reversed(stack))
+    return text
+
+
+def load_analysis_json(content: str, repair: bool = True) -> Tuple[Optional[Dict[str, Any]], bool]:
+    """Parse the model output as a JSON object; returns (data or None, repaired)"""
+    try:
+        data = json.loads(content)
+        if isinstance(data, dict):
+            return data, False
+    except ValueError:
+        pass
+    if not repair:
+        return None, False
+    try:
+        data = json.loads(repair_json(content))
+    except ValueError:
+        return None, True
+    return (data, True) if isinstance(data, dict) else (None, True)
+
+
+def validate_analysis(data: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """
+    Validate against ClaimAnalysis. Returns (normalized data, {}) when valid, or
+    (data unchanged, {field: error}) naming only the top-level fields that failed
+    """
+    try:
+        return ClaimAnalysis.model_validate(data).model_dump(), {}
+    except ValidationError as e:
+        invalid = {}
+        for error in e.errors():
+            field = str(error["loc"][0]) if error["loc"] else "overall_status"
+            invalid.setdefault(field, error["msg"])
+        return data, invalid
+
+
+def apply_fallbacks(data: Dict[str, Any], fields: List[str]) -> Dict[str, Any]:
+    """Replace still-invalid fields with safe defaults (NEEDS_REVIEW for the status)"""
+    data = dict(data)
+    for name in fields:
+        if name in FIELD_FALLBACKS:
+            data[name] = FIELD_FALLBACKS[name]
+        else:
+            data.pop(name, None)  # optional field - the model default applies
+    return data
@@ -0,0 +1,123 @@
+import os
+import shutil
+import hashlib
+import tempfile
+from typing import Any, Dict, Optional
+
+from flask import Request
+
+# Content-addressed upload store (overridable from .env)
+BLOB_STORE_DIR = os.getenv('BLOB_STORE_DIR', os.path.join(os.path.dirname(__file__), '..', 'uploads', 'blobs'))
+BLOB_CHUNK_SIZE = int(os.getenv('BLOB_CHUNK_SIZE', str(1024 * 1024)))
+
+
+class HashingUpload:
+    """
+    Temp file in the blob store that computes SHA-256 and size as it is written,
+    so an upload is hashed in the same pass that puts it on disk. The temp name
+    is removed on close; commit() first links it into the store.
+    """
+
+    def __init__(self, tmp_dir: str):
+        os.makedirs(tmp_dir, exist_ok=True)
+        self._file = tempfile.NamedTemporaryFile(dir=tmp_dir, prefix='upload-', delete=True)
+        self._digest = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data) -> int:
+        self._digest.update(data)
+        self.size += len(data)
+        return self._file.write(data)
+
+    def hexdigest(self) -> str:
+        return self._digest.hexdigest()
+
+    def __getattr__(self, name):
+        # read/seek/tell/flush/close/name... go to the underlying temp file
+        return getattr(self._file, name)
+
+    def __iter__(self):
+        return iter(self._file)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._file.close()
+
+
+class BlobStore:
+    """
+    Uploads stored once per content hash under <root>/<h[:2]>/<h[2:4]>/<h>.
+    Peak memory per upload is one chunk regardless of file size.
+    """
+
+    def __init__(self, root: str = BLOB_STORE_DIR):
+        self.root = root
+        self.tmp_dir = os.path.join(root, 'tmp')
+
+    def path_for(self, content_hash: str) -> str:
+        return os.path.join(self.root, content_hash[:2], content_hash[2:4], content_hash)
+
+    def open_upload(self) -> HashingUpload:
+        return HashingUpload(self.tmp_dir)
+
+    def put(self, stream) -> Dict[str, Any]:
+        """
+        Store an upload stream; returns {"content_hash", "size", "path", "stored_name", "deduplicated"}.
+        A HashingUpload (from BlobUploadRequest) is committed without copying; any
+        other stream is copied chunk by chunk through one.
+        """
+        if isinstance(stream, HashingUpload):
+            return self.commit(stream)
+        with self.open_upload() as upload:
+            for block in iter(lambda: stream.read(BLOB_CHUNK_SIZE), b''):
+                upload.write(block)
+            return self.commit(upload)
+
+    def commit(self, upload: HashingUpload) -> Dict[str, Any]:
+        """Atomically publish a fully written upload under its content hash"""
+        upload.flush()
+        os.fsync(upload.fileno())
+        content_hash = upload.hexdigest()
+        final_path = self.path_for(content_hash)
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        deduplicated = False
+        try:
+            # A hard link is atomic and leaves the temp name to be cleaned up on close
+            os.link(upload.name, final_path)
+        except FileExistsError:
+            deduplicated = True
+        except OSError:
+            # Filesystem without hard links: copy beside the target, then rename into place
+            if os.path.exists(final_path):
+                deduplicated = True
+            else:
+                partial = f"{final_path}.{os.getpid()}.part"
+                shutil.copyfile(upload.name, partial)
+                os.replace(partial, final_path)
+        return {
+            'content_hash': content_hash,
+            'size': upload.size,
+            'path': final_path,
+            'stored_name': os.path.relpath(final_path, self.root),
+            'deduplicated': deduplicated
+        }
+
+    def exists(self, content_hash: str) -> bool:
+        return os.path.exists(self.path_for(content_hash))
+
+
+class BlobUploadRequest(Request):
+    """
+    Request class whose multipart parser writes file parts straight into the
+    blob store's temp dir (hashing as chunks arrive) instead of Werkzeug's
+    default spooled buffer, so save_uploaded_file only has to link the blob.
+    """
+
+    def _get_file_stream(self, total_content_length: Optional[int], content_type: Optional[str],
+                         filename: Optional[str] = None, content_length: Optional[int] = None):
+        return blob_store.open_upload()
+
+
+blob_store = BlobStore()
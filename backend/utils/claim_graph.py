@@ -0,0 +1,282 @@
+import os
+import sqlite3
+import threading
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from typing import TypedDict
+
+try:
+    from langgraph.graph import StateGraph, START, END
+    from langgraph.checkpoint.memory import MemorySaver
+    CLAIM_GRAPH_AVAILABLE = True
+except ImportError:
+    CLAIM_GRAPH_AVAILABLE = False
+
+try:
+    from langgraph.checkpoint.sqlite import SqliteSaver
+    SQLITE_CHECKPOINT_AVAILABLE = True
+except ImportError:
+    SQLITE_CHECKPOINT_AVAILABLE = False
+    if CLAIM_GRAPH_AVAILABLE:
+        print("⚠️  langgraph-checkpoint-sqlite not available - pipeline checkpoints kept in memory only. "
+              "Install with: pip install langgraph-checkpoint-sqlite")
+
+from .database import DatabaseManager
+from .document_processor import DocumentProcessor
+
+# Checkpoints of in-progress pipeline runs (overridable from .env)
+PIPELINE_CHECKPOINT_DB = os.getenv(
+    'PIPELINE_CHECKPOINT_DB', os.path.join(os.path.dirname(__file__), '..', 'database', 'pipeline_checkpoints.db')
+)
+
+# Event emitted when each node finishes (the same events the generator pipeline yields)
+NODE_EVENTS = {
+    'extract': 'extracted',
+    'analyze': 'analyzed',
+    'validate': 'validated',
+    'suggestions': 'suggestions',
+    'comparison': 'comparison',
+    'save': 'saved'
+}
+# Independent nodes that run in parallel once analysis is done
+FAN_OUT_NODES = ('validate', 'suggestions', 'comparison')
+
+
+class ClaimPipelineState(TypedDict, total=False):
+    """State of one upload pipeline run; every value is JSON-serializable so it can be checkpointed"""
+    upload: Dict[str, Any]
+    claim_type: str
+    document_text: str
+    extraction: Optional[Dict[str, Any]]
+    analysis_result: Optional[Dict[str, Any]]
+    field_validation: Dict[str, Any]
+    suggestions: Dict[str, Any]
+    comparison: Dict[str, Any]
+    claim_id: str
+    claim_analysis: Optional[Dict[str, Any]]
+
+
+_checkpointer = None
+_checkpointer_lock = threading.Lock()
+
+
+def get_checkpointer():
+    """
+    Process-wide checkpointer: SQLite, so runs resume across restarts, or an
+    in-memory saver (resume within this process only) without langgraph-checkpoint-sqlite
+    """
+    global _checkpointer
+    with _checkpointer_lock:
+        if _checkpointer is None and not SQLITE_CHECKPOINT_AVAILABLE:
+            _checkpointer = MemorySaver()
+        elif _checkpointer is None:
+            os.makedirs(os.path.dirname(PIPELINE_CHECKPOINT_DB) or '.', exist_ok=True)
+            # Shared across worker threads; SqliteSaver serializes access with its own lock
+            conn = sqlite3.connect(PIPELINE_CHECKPOINT_DB, check_same_thread=False)
+            _checkpointer = SqliteSaver(conn)
+        return _checkpointer
+
+
+class ClaimPipelineGraph:
+    """
+    The upload pipeline as one LangGraph graph:
+
+        extract -> analyze -> (validate | suggestions | comparison) -> save
+
+    The three nodes after analyze are independent and run in parallel. With the
+    SQLite checkpointer, every completed node is saved under the run's thread id,
+    so running the same thread again after a failure or timeout resumes at the
+    first unfinished node - LLM steps that already succeeded are not repeated.
+    """
+
+    def __init__(self, processor: Optional[DocumentProcessor] = None):
+        self.processor = processor or DocumentProcessor()
+        self.checkpointer = get_checkpointer()
+        self.graph = self._build()
+
+    def _build(self):
+        workflow = StateGraph(ClaimPipelineState)
+        workflow.add_node('extract', self._extract)
+        workflow.add_node('analyze', self._analyze)
+        workflow.add_node('validate', self._validate)
+        workflow.add_node('suggestions', self._suggestions)
+        workflow.add_node('comparison', self._comparison)
+        workflow.add_node('save', self._save)
+
+        workflow.add_edge(START, 'extract')
+        workflow.add_edge('extract', 'analyze')
+        for node in FAN_OUT_NODES:
+            workflow.add_edge('analyze', node)
+        # save waits for all three branches
+        workflow.add_edge(list(FAN_OUT_NODES), 'save')
+        workflow.add_edge('save', END)
+        return workflow.compile(checkpointer=self.checkpointer)
+
+    # Nodes return only the keys they change, so parallel branches never write the same key
+
+    def _extract(self, state: ClaimPipelineState) -> Dict[str, Any]:
+        from .analysis_pipeline import extract_document_text
+        document_text, analysis_result = extract_document_text(self.processor, state['upload'], state['claim_type'])
+        return {
+            'document_text': document_text,
+            'extraction': self.processor.last_extraction,
+            # PDFs start analysis while their pages extract
+            'analysis_result': analysis_result
+        }
+
+    def _analyze(self, state: ClaimPipelineState) -> Dict[str, Any]:
+        from .analysis_pipeline import analysis_failure_result
+        if state.get('analysis_result') is not None:
+            return {}
+        filename = state['upload']['original_filename']
+        try:
+            print(f"Starting analysis for document: {filename}")
+            analysis_result = self.processor.analyze_claim_document(state['document_text'], state['claim_type'])
+            print(f"Analysis completed for document: {filename}")
+        except Exception as analysis_error:
+            print(f"Analysis failed for document: {filename}, Error: {str(analysis_error)}")
+            analysis_result = analysis_failure_result(analysis_error)
+        return {'analysis_result': analysis_result}
+
+    def _validate(self, state: ClaimPipelineState) -> Dict[str, Any]:
+        """Rule checks (formats, required fields) on the fields the analysis extracted"""
+        extracted_data = state['analysis_result'].get('extracted_data') or {}
+        claim_data = dict(extracted_data, amount_billed=extracted_data.get('billed_amount'))
+        return {'field_validation': self.processor.claim_validator.validate_claim(claim_data)}
+
+    def _suggestions(self, state: ClaimPipelineState) -> Dict[str, Any]:
+        return {'suggestions': self.processor.get_improvement_suggestions(state['analysis_result'])}
+
+    def _comparison(self, state: ClaimPipelineState) -> Dict[str, Any]:
+        if state['analysis_result'].get('overall_status') == 'ERROR':
+            return {'comparison': {'error': 'Skipped due to analysis failure'}}
+        try:
+            comparison = self.processor.compare_with_approved_claims(state['document_text'])
+        except Exception as comp_error:
+            print(f"Comparison failed: {str(comp_error)}")
+            comparison = {'error': 'Comparison analysis failed', 'details': str(comp_error)}
+        return {'comparison': comparison}
+
+    def _save(self, state: ClaimPipelineState) -> Dict[str, Any]:
+        """Persist the claim; a database error fails the run so a retry resumes here, not with a lost claim"""
+        from .analysis_pipeline import persist_document_analysis
+        upload = state['upload']
+        claim_id = f"DOC_{upload['timestamp']}"
+        try:
+            claim_analysis = persist_document_analysis(
+                DatabaseManager(), claim_id, upload, state['document_text'], state['analysis_result'],
+                claim_type=state['claim_type']
+            )
+        except Exception as db_error:
+            print(f"Database save error: {db_error}")
+            raise
+        return {'claim_id': claim_id, 'claim_analysis': claim_analysis}
+
+    def iter_run(self, upload: Dict[str, Any], claim_type: str,
+                 thread_id: Optional[str] = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Run (or resume) the pipeline for thread_id, yielding (event, data) as nodes
+        finish; the last event is ("complete", response). A thread that already
+        completed returns its stored response without running anything. Checkpoints
+        are kept after a failure only when a retry can resume them: the caller passed
+        a thread_id and the input itself was not rejected (PipelineError).
+        """
+        from .analysis_pipeline import PipelineError
+        resumable = thread_id is not None
+        thread_id = thread_id or f"run-{uuid.uuid4()}"
+        config = {'configurable': {'thread_id': thread_id}}
+
+        graph_input = {'upload': upload, 'claim_type': claim_type}
+        resumed = False
+        snapshot = self.graph.get_state(config)
+        if snapshot.values and snapshot.next:
+            resumed = True
+            graph_input = None  # continue from the last checkpoint
+            print(f"🔁 Resuming pipeline {thread_id} at {', '.join(snapshot.next)}")
+        elif snapshot.values.get('claim_id'):
+            yield 'complete', self._response(snapshot.values, resumed=True)
+            self._forget(thread_id)
+            return
+
+        done = set()
+        if graph_input is not None:
+            yield 'stage_started', {'stage': 'extract'}
+        try:
+            for update in self.graph.stream(graph_input, config, stream_mode='updates'):
+                for node, values in update.items():
+                    if node not in NODE_EVENTS:
+                        continue
+                    done.add(node)
+                    values = values or {}
+                    yield NODE_EVENTS[node], self._event_data(node, values)
+                    if node == 'extract':
+                        yield 'stage_started', {'stage': 'analyze'}
+                    elif node == 'analyze':
+                        for branch in FAN_OUT_NODES:
+                            yield 'stage_started', {'stage': branch}
+                    elif node in FAN_OUT_NODES and done.issuperset(FAN_OUT_NODES):
+                        yield 'stage_started', {'stage': 'save'}
+        except PipelineError:
+            # Unreadable or unsupported upload - running it again would fail the same way
+            self._forget(thread_id)
+            raise
+        except Exception:
+            if not resumable:
+                self._forget(thread_id)
+            raise
+
+        final_state = self.graph.get_state(config).values
+        if not final_state.get('claim_id'):
+            raise Exception("Pipeline graph ended without saving the claim")
+        yield 'complete', self._response(final_state, resumed=resumed)
+        self._forget(thread_id)
+
+    @staticmethod
+    def _event_data(node: str, values: Dict[str, Any]) -> Dict[str, Any]:
+        if node == 'extract':
+            return {'characters': len(values.get('document_text', '')), 'extraction': values.get('extraction')}
+        if node == 'analyze':
+            return {'document_analysis': values.get('analysis_result')}
+        if node == 'validate':
+            return {'field_validation': values.get('field_validation')}
+        if node == 'suggestions':
+            return {'improvement_suggestions': values.get('suggestions')}
+        if node == 'comparison':
+            return {'comparison_with_approved': values.get('comparison')}
+        return {'claim_id': values.get('claim_id')}
+
+    @staticmethod
+    def _response(state: Dict[str, Any], resumed: bool = False) -> Dict[str, Any]:
+        upload = state['upload']
+        document_text = state['document_text']
+        response = {
+            'claim_id': state['claim_id'],
+            'status': 'analyzed',
+            'document_analysis': state['analysis_result'],
+            'field_validation': state.get('field_validation'),
+            'improvement_suggestions': state.get('suggestions'),
+            'comparison_with_approved': state.get('comparison'),
+            'extracted_text_preview': document_text[:500] + "..." if len(document_text) > 500 else document_text,
+            'file_info': {
+                'original_name': upload['original_filename'],
+                'file_type': upload['file_type'],
+                'size_bytes': upload['file_size'],
+                'processed_at': datetime.now().isoformat(),
+                'extraction': state.get('extraction')
+            }
+        }
+        if resumed:
+            response['resumed_from_checkpoint'] = True
+        return response
+
+    def _forget(self, thread_id: str):
+        """Drop a finished run's checkpoints; only failed runs need them"""
+        delete_thread = getattr(self.checkpointer, 'delete_thread', None)
+        if delete_thread is None:
+            return
+        try:
+            delete_thread(thread_id)
+        except Exception as e:
+            print(f"⚠️  Could not delete checkpoints for {thread_id}: {e}")
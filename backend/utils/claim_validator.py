@@ -17,7 +17,7 @@ class ClaimValidator:
         
         self.date_pattern = r'^\d{4}-\d{2}-\d{2}$'
         self.policy_pattern = r'^[A-Z0-9]{8,12}$'
-        self.diagnosis_pattern = r'^[A-Z]\d{2}\.\d$'  # ICD-10 format
+        self.diagnosis_pattern = r'^[A-Z]\d{2}(\.[A-Z0-9]{1,4})?$'  # ICD-10-CM format
     
     def validate_claim(self, claim_data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -0,0 +1,286 @@
+import re
+from datetime import datetime
+from typing import Dict, List, Any, Optional
+
+import PyPDF2
+
+# Markers that identify a CMS-1500 (HCFA) professional claim form
+CMS1500_MARKERS = [
+    r"CMS[-\s]?1500",
+    r"HCFA[-\s]?1500",
+    r"HEALTH INSURANCE CLAIM FORM",
+]
+
+DATE_VALUE = r"\d{1,2}[/-]\d{1,2}[/-]\d{2,4}|\d{4}-\d{2}-\d{2}"
+ICD10_VALUE = r"[A-TV-Z]\d{2}(?:\.[A-Z0-9]{1,4})?"
+CPT_VALUE = r"\d{5}|[A-Z]\d{4}"
+# The whole amount or nothing: "$1500.00" must not match as "$150"
+MONEY_VALUE = r"\$?\s?(?:\d{1,3}(?:,\d{3})+|\d+)(?:\.\d{2})?(?!,?\d|\.\d)"
+
+# Separators between values on one line
+BULLETS = "•·\x7f"
+
+# Per-field rules. "label" is matched at the start of a line (optionally after the
+# CMS-1500 item number in "item"); the value is read from the rest of that line or,
+# when the label stands alone, from the next line. "value" both extracts and
+# validates - a label whose value doesn't fit the format is a low-confidence match.
+# "row" patterns read the Item 24 service-line table directly.
+CMS1500_FIELD_RULES = {
+    "patient_name": {
+        "item": r"2",
+        "label": r"Patient(?:'s)? Name",
+        "value": r"[A-Za-z][A-Za-z.'\-]*(?:,? [A-Za-z][A-Za-z.'\-]*)+",
+        "fallback_label": r"Patient",
+    },
+    "patient_id": {
+        "item": r"1a",
+        "label": r"Insured(?:'s)? I\.?D\.?(?: Number| #)?",
+        "value": r"[A-Z0-9][A-Z0-9\-]{4,19}",
+        "fallback_label": r"(?:Insured|Member|Patient) I\.?D\.?",
+    },
+    "date_of_birth": {
+        "item": r"3",
+        "label": r"(?:Patient(?:'s)? )?(?:DOB|Birth Date|Date of Birth)(?:\s*/\s*Sex)?",
+        "value": DATE_VALUE,
+        "fallback_label": r"DOB",
+    },
+    "policy_number": {
+        "item": r"11",
+        "label": r"(?:Insured(?:'s)? )?Policy(?:\s*/\s*Group| Group)?(?: or FECA)?(?: Number| #| No\.?)?",
+        "value": r"[A-Z0-9][A-Z0-9\-]{3,19}",
+    },
+    "diagnosis_code": {
+        "item": r"21",
+        "label": r"Diagnosis(?: Codes?)?(?:\s*\(ICD-?10\))?",
+        "value": ICD10_VALUE,
+        "fallback_label": r"ICD-?10",
+    },
+    "service_date": {
+        "row": rf"^\s*(?P<value>{DATE_VALUE})\s*\|",
+        "label": r"Date of Service",
+        "value": DATE_VALUE,
+        "fallback_label": r"(?:Procedure|Service) Date",
+    },
+    "procedure_code": {
+        "row": rf"^\s*(?:{DATE_VALUE})\s*\|\s*\d{{2}}\s*\|\s*(?P<value>{CPT_VALUE})\b",
+        "label": r"(?:CPT|Procedure Code)",
+        "value": CPT_VALUE,
+        "fallback_label": r"Procedure",
+    },
+    "billed_amount": {
+        "item": r"28",
+        "label": r"Total Charges?",
+        "value": MONEY_VALUE,
+    },
+    "provider_name": {
+        "item": r"33",
+        "label": r"Billing Provider(?: Info(?:rmation)?)?(?: & Ph #)?",
+        "value": r"[A-Za-z][^/\n|]{2,}",
+    },
+    "provider_id": {
+        "item": r"33a",
+        "label": r"(?:Billing Provider )?NPI",
+        "value": r"\d{10}",
+    },
+    "prior_authorization": {
+        "item": r"23",
+        "label": r"Prior Authorization(?: Number| #)?",
+        # An authorization number has a digit: "Prior Authorization Confirmation" is a heading
+        "value": r"(?=[A-Z\-]*\d)[A-Z0-9][A-Z0-9\-]{3,29}",
+    },
+    "referring_provider": {
+        "item": r"17",
+        "label": r"(?:Name of )?Referring Provider(?! Signature)",
+        # The name ends before a bullet separator (PyPDF2 may render it as \x7f) or the NPI
+        "value": rf"[A-Za-z][^(\n|{BULLETS}]{{2,}}?(?=\s*(?:[(|{BULLETS}]|\bNPI\b|$))",
+    },
+    "service_facility": {
+        "item": r"32",
+        "label": r"Service Facility(?: Location)?(?: Information)?",
+        "value": r"[A-Za-z][^/\n|]{2,}",
+    },
+    "federal_tax_id": {
+        "item": r"25",
+        "label": r"Federal Tax I\.?D\.?(?: Number)?(?:\s*\(EIN\))?",
+        "value": r"\d{2}-\d{7}|\d{3}-\d{2}-\d{4}",
+    },
+}
+
+# Common AcroForm field names used by fillable CMS-1500 PDFs (compared after
+# lower-casing and dropping non-alphanumerics)
+ACROFORM_FIELD_NAMES = {
+    "patient_name": ["ptname", "patientname"],
+    "patient_id": ["insuranceid", "insuredid", "insidnumber"],
+    "date_of_birth": ["ptdob", "patientdob", "birthdate", "dateofbirth"],
+    "policy_number": ["inspolicy", "policynumber", "insuredpolicy", "groupnumber"],
+    "diagnosis_code": ["diagnosis1", "dx1", "diagnosisa"],
+    "service_date": ["sv1from", "dateofservice", "sv1dos"],
+    "procedure_code": ["cpt1", "sv1cpt", "procedure1"],
+    "billed_amount": ["tcharge", "totalcharge", "totalcharges"],
+    "provider_name": ["docname", "billingname", "billingprovider"],
+    "provider_id": ["pin1", "billingnpi", "npi33a"],
+    "prior_authorization": ["priorauth", "priorauthorization"],
+}
+
+# Confidence assigned to each kind of match
+CONFIDENCE = {
+    "acroform": 0.99,
+    "service_row": 0.95,
+    "item_label": 0.95,
+    "label": 0.85,
+    "fallback_label": 0.7,
+    "invalid_format": 0.4,
+}
+CONFLICT_CONFIDENCE_CAP = 0.6
+
+# A line that is itself a form label ("4. Insured's Name:") is never a value
+LABEL_LINE = re.compile(r"^(?:\d{1,2}[a-z]?\.\s|[^:]{2,40}:$)", re.IGNORECASE)
+
+
+def is_cms1500(text: str) -> bool:
+    """True when the text looks like a CMS-1500 form (header or enough item labels)"""
+    if any(re.search(marker, text, re.IGNORECASE) for marker in CMS1500_MARKERS):
+        return True
+    numbered_items = re.findall(r"^\s*(?:1a|2|3|11|21|24|28|33)\.\s+[A-Z]", text, re.MULTILINE | re.IGNORECASE)
+    return len(set(item.strip()[:3] for item in numbered_items)) >= 5
+
+
+def normalize_date(value: str) -> Optional[str]:
+    """MM/DD/YYYY (or MM-DD-YY) -> YYYY-MM-DD, the format ClaimValidator expects"""
+    for fmt in ("%m/%d/%Y", "%m-%d-%Y", "%m/%d/%y", "%m-%d-%y", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(value.strip(), fmt).strftime("%Y-%m-%d")
+        except ValueError:
+            continue
+    return None
+
+
+def normalize_amount(value: str) -> Optional[float]:
+    try:
+        return float(value.replace("$", "").replace(",", "").strip())
+    except ValueError:
+        return None
+
+
+class CMS1500Extractor:
+    """
+    Rule-based field extraction for CMS-1500 claim forms
+
+    Uses AcroForm field values when the PDF is fillable, otherwise anchored
+    label regexes over the extracted text (value on the same line as its label,
+    or on the next line when the layout puts it there). Every field carries a
+    confidence score so callers can send only missing or doubtful fields to the LLM.
+    """
+
+    def __init__(self, field_rules: Optional[Dict[str, Dict[str, str]]] = None):
+        self.field_rules = field_rules or CMS1500_FIELD_RULES
+
+    def read_form_fields(self, file_path: str) -> Dict[str, str]:
+        """Filled-in AcroForm text fields of a PDF ({} when the PDF has no form)"""
+        try:
+            with open(file_path, 'rb') as file:
+                fields = PyPDF2.PdfReader(file).get_form_text_fields() or {}
+        except Exception as e:
+            print(f"⚠️  Could not read AcroForm fields: {e}")
+            return {}
+        return {name: str(value) for name, value in fields.items() if value}
+
+    def extract(self, text: str, form_fields: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """
+        Extract claim fields from form text (and AcroForm values when given)
+        Returns {"is_cms1500", "fields": {name: {"value", "confidence", "source"}}}
+        """
+        fields = {}
+        if form_fields:
+            fields.update(self._from_form_fields(form_fields))
+
+        lines = [line.strip() for line in text.splitlines()]
+        for name, rule in self.field_rules.items():
+            if name in fields and fields[name]["confidence"] >= CONFIDENCE["acroform"]:
+                continue
+            match = self._from_text(name, rule, lines)
+            if match and (name not in fields or match["confidence"] > fields[name]["confidence"]):
+                fields[name] = match
+
+        return {
+            "is_cms1500": bool(form_fields) or is_cms1500(text),
+            "fields": fields
+        }
+
+    def _from_form_fields(self, form_fields: Dict[str, str]) -> Dict[str, Dict[str, Any]]:
+        normalized = {re.sub(r"[^a-z0-9]", "", name.lower()): value for name, value in form_fields.items()}
+        fields = {}
+        for name, candidates in ACROFORM_FIELD_NAMES.items():
+            for candidate in candidates:
+                value = normalized.get(candidate, "").strip()
+                if not value:
+                    continue
+                value_pattern = self.field_rules.get(name, {}).get("value")
+                valid = not value_pattern or re.fullmatch(value_pattern, value, re.IGNORECASE)
+                fields[name] = self._field(name, value, CONFIDENCE["acroform"] if valid else CONFIDENCE["invalid_format"], "acroform")
+                break
+        return fields
+
+    def _from_text(self, name: str, rule: Dict[str, str], lines: List[str]) -> Optional[Dict[str, Any]]:
+        """Collect every candidate value for a field and keep the most trustworthy one"""
+        candidates = []
+
+        if "row" in rule:
+            for line in lines:
+                match = re.match(rule["row"], line)
+                if match:
+                    candidates.append((match.group("value"), CONFIDENCE["service_row"], "service_line"))
+
+        label_patterns = []
+        if "item" in rule:
+            label_patterns.append((rf"{rule['item']}\.\s*{rule['label']}", CONFIDENCE["item_label"], "item_label"))
+        label_patterns.append((rule["label"], CONFIDENCE["label"], "label"))
+        if "fallback_label" in rule:
+            label_patterns.append((rule["fallback_label"], CONFIDENCE["fallback_label"], "fallback_label"))
+
+        for label, confidence, source in label_patterns:
+            anchored = re.compile(rf"^{label}\s*[:#\-]?\s*(?P<rest>.*)$", re.IGNORECASE)
+            for index, line in enumerate(lines):
+                match = anchored.match(line) if source != "fallback_label" else re.search(
+                    rf"\b{label}\s*[:#]\s*(?P<rest>.*)$", line, re.IGNORECASE)
+                if not match:
+                    continue
+                rest = match.group("rest").strip()
+                if not rest and index + 1 < len(lines) and not LABEL_LINE.match(lines[index + 1]):
+                    rest = lines[index + 1]  # value laid out below its label
+                value = re.match(rf"(?:{rule['value']})", rest, re.IGNORECASE) if rest else None
+                if value:
+                    candidates.append((value.group(0).strip(), confidence, source))
+                elif rest:
+                    candidates.append((rest, CONFIDENCE["invalid_format"], f"{source}_invalid"))
+            if any(c[1] >= confidence for c in candidates):
+                break  # stronger anchors win; weaker labels are only a fallback
+
+        if not candidates:
+            return None
+
+        value, confidence, source = max(candidates, key=lambda c: c[1])
+        distinct = {self._comparable(name, c[0]) for c in candidates if c[1] > CONFIDENCE["invalid_format"]}
+        if len(distinct) > 1:
+            # The form disagrees with itself (e.g. two different IDs) - let the LLM look
+            confidence = min(confidence, CONFLICT_CONFIDENCE_CAP)
+        return self._field(name, value, confidence, source)
+
+    def _field(self, name: str, raw_value: str, confidence: float, source: str) -> Dict[str, Any]:
+        value: Any = raw_value.strip().rstrip(",;")
+        if name in ("date_of_birth", "service_date"):
+            normalized = normalize_date(value)
+            if normalized is None:
+                confidence = min(confidence, CONFIDENCE["invalid_format"])
+            value = normalized or value
+        elif name == "billed_amount":
+            amount = normalize_amount(value)
+            if amount is None:
+                confidence = min(confidence, CONFIDENCE["invalid_format"])
+            value = amount if amount is not None else value
+        elif name in ("diagnosis_code", "procedure_code", "patient_id", "policy_number"):
+            value = value.upper()
+        return {"value": value, "confidence": round(confidence, 2), "source": source}
+
+    def _comparable(self, name: str, value: str) -> str:
+        return str(self._field(name, value, 1.0, "")["value"]).lower()
@@ -1,7 +1,16 @@
 import sqlite3
 import os
+import json
+import time
+import uuid
+import threading
 from datetime import datetime
 
+# Databases whose schema, migrations and pragmas already ran in this process.
+# A DatabaseManager is built per request/job, so init_database runs once per path.
+_initialized_paths = set()
+_init_lock = threading.Lock()
+
 class DatabaseManager:
     """
     SQLite Database manager for Claims AI system
@@ -9,7 +18,11 @@ class DatabaseManager:
     
     def __init__(self, db_path='database/claims_ai.db'):
         self.db_path = db_path
-        self.init_database()
+        path = os.path.abspath(db_path)
+        with _init_lock:
+            if path not in _initialized_paths:
+                self.init_database()
+                _initialized_paths.add(path)
     
     def init_database(self):
         """
@@ -137,10 +150,19 @@ class DatabaseManager:
                     file_size INTEGER,
                     file_path TEXT NOT NULL,
                     extracted_text TEXT,
+                    content_hash TEXT, -- sha256 of the stored blob
                     upload_timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     FOREIGN KEY (claim_id) REFERENCES claims (claim_id)
                 )
             ''')
+            # Databases created before content-addressed uploads lack the hash column
+            document_columns = [row[1] for row in cursor.execute('PRAGMA table_info(documents)')]
+            if 'content_hash' not in document_columns:
+                cursor.execute('ALTER TABLE documents ADD COLUMN content_hash TEXT')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_documents_content_hash
+                ON documents (content_hash)
+            ''')
             
             # Create status_transitions table for tracking status changes
             cursor.execute('''
@@ -157,6 +179,72 @@ class DatabaseManager:
                 )
             ''')
             
+            # Create analysis_jobs table for the background document-analysis queue
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS analysis_jobs (
+                    id TEXT PRIMARY KEY,
+                    job_type TEXT NOT NULL,
+                    status TEXT DEFAULT 'queued' CHECK (status IN ('queued', 'running', 'succeeded', 'failed')),
+                    payload TEXT, -- JSON string
+                    result TEXT, -- JSON string
+                    error TEXT,
+                    stage TEXT,
+                    progress INTEGER DEFAULT 0,
+                    attempts INTEGER DEFAULT 0,
+                    max_attempts INTEGER DEFAULT 3,
+                    lease_owner TEXT,
+                    lease_expires_at REAL, -- epoch seconds
+                    heartbeat_at REAL, -- epoch seconds
+                    available_at REAL NOT NULL, -- epoch seconds, used for retry backoff
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_analysis_jobs_status
+                ON analysis_jobs (status, available_at)
+            ''')
+            
+            # Create idempotency_keys table so client retries replay the first response
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS idempotency_keys (
+                    idempotency_key TEXT NOT NULL,
+                    endpoint TEXT NOT NULL,
+                    fingerprint TEXT NOT NULL, -- sha256 of the request the key was first used with
+                    status TEXT DEFAULT 'in_progress' CHECK (status IN ('in_progress', 'completed')),
+                    response_status INTEGER,
+                    response_body TEXT,
+                    response_headers TEXT, -- JSON string
+                    created_at REAL NOT NULL, -- epoch seconds
+                    expires_at REAL NOT NULL, -- epoch seconds
+                    PRIMARY KEY (idempotency_key, endpoint)
+                )
+            ''')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_idempotency_keys_expires
+                ON idempotency_keys (expires_at)
+            ''')
+            
+            # Create claim_analysis_state table: merged analysis of all documents of a claim,
+            # updated per document so earlier documents are never re-analyzed
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS claim_analysis_state (
+                    claim_id TEXT PRIMARY KEY,
+                    version INTEGER NOT NULL DEFAULT 1, -- optimistic lock for concurrent uploads
+                    analysis TEXT NOT NULL, -- JSON string, merged analysis result
+                    document_results TEXT NOT NULL, -- JSON string, per-document analysis summaries
+                    validation_result_id INTEGER,
+                    recommendation_id INTEGER,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (claim_id) REFERENCES claims (claim_id),
+                    FOREIGN KEY (recommendation_id) REFERENCES recommendations (id)
+                )
+            ''')
+            
+            # WAL lets background workers write while web requests read
+            # (result fetched so the conversion statement does not keep the file locked)
+            cursor.execute('PRAGMA journal_mode=WAL').fetchone()
+            
             conn.commit()
             self.insert_sample_data()
     
@@ -404,8 +492,8 @@ class DatabaseManager:
             cursor.execute('''
                 INSERT INTO documents 
                 (claim_id, original_filename, stored_filename, file_type, 
-                 file_size, file_path, extracted_text)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
+                 file_size, file_path, extracted_text, content_hash)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
             ''', (
                 claim_id,
                 document_info['original_filename'],
@@ -413,12 +501,104 @@ class DatabaseManager:
                 document_info['file_type'],
                 document_info['file_size'],
                 document_info['file_path'],
-                document_info.get('extracted_text', '')
+                document_info.get('extracted_text', ''),
+                document_info.get('content_hash')
             ))
             
             conn.commit()
             return cursor.lastrowid
 
+    def get_cached_extraction(self, content_hash):
+        """
+        Extracted text of an earlier upload with the same content hash, or None
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT extracted_text FROM documents
+                WHERE content_hash = ? AND extracted_text IS NOT NULL AND extracted_text != ''
+                ORDER BY id DESC LIMIT 1
+            ''', (content_hash,))
+            row = cursor.fetchone()
+            return row[0] if row else None
+
+    def get_documents_for_indexing(self, after_id=0, limit=500):
+        """
+        Documents with their claim's structured fields, in id order, for (re)building the similarity index
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT d.id, d.claim_id, d.extracted_text, c.provider_name, c.provider_id,
+                       c.procedure_code, c.diagnosis_code, c.policy_number, c.service_type
+                FROM documents d LEFT JOIN claims c ON c.claim_id = d.claim_id
+                WHERE d.id > ? ORDER BY d.id LIMIT ?
+            ''', (after_id, limit))
+            return [dict(row) for row in cursor.fetchall()]
+
+    def get_approved_reference_claims(self, limit=5000):
+        """
+        Most recently approved claims with their first document's text and merged analysis
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT c.claim_id, c.service_type, c.provider_name, c.provider_id, c.service_date,
+                       c.diagnosis_code, c.procedure_code, c.policy_number, c.amount_billed, s.analysis,
+                       (SELECT d.extracted_text FROM documents d WHERE d.claim_id = c.claim_id
+                        ORDER BY d.id LIMIT 1) AS extracted_text
+                FROM claims c LEFT JOIN claim_analysis_state s ON s.claim_id = c.claim_id
+                WHERE c.status = 'approved'
+                ORDER BY c.updated_at DESC LIMIT ?
+            ''', (limit,))
+            claims = []
+            for row in cursor.fetchall():
+                claim = dict(row)
+                claim['analysis'] = json.loads(claim['analysis']) if claim['analysis'] else {}
+                claims.append(claim)
+            return claims
+
+    def get_claim_document_ids(self, claim_id):
+        """
+        Ids of a claim's documents
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT id FROM documents WHERE claim_id = ? ORDER BY id', (claim_id,))
+            return [row[0] for row in cursor.fetchall()]
+
+    def get_claim(self, claim_id):
+        """
+        Claim row without its history, or None
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            cursor.execute('SELECT * FROM claims WHERE claim_id = ?', (claim_id,))
+            row = cursor.fetchone()
+            return dict(row) if row else None
+
+    def get_document_claims(self, document_ids):
+        """
+        Claim summary per document id (documents whose claim no longer exists are skipped)
+        """
+        if not document_ids:
+            return {}
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            placeholders = ','.join('?' * len(document_ids))
+            cursor.execute(f'''
+                SELECT d.id AS document_id, d.original_filename, c.claim_id, c.patient_name, c.provider_name,
+                       c.provider_id, c.procedure_code, c.diagnosis_code, c.service_type, c.amount_billed,
+                       c.status, c.ai_suggested_status, c.service_date
+                FROM documents d JOIN claims c ON c.claim_id = d.claim_id
+                WHERE d.id IN ({placeholders})
+            ''', list(document_ids))
+            return {row['document_id']: dict(row) for row in cursor.fetchall()}
+
     def get_documents_for_claim(self, claim_id):
         """
         Get all documents for a specific claim
@@ -428,6 +608,20 @@ class DatabaseManager:
             cursor.execute('SELECT * FROM documents WHERE claim_id = ? ORDER BY upload_timestamp', (claim_id,))
             return [dict(row) for row in cursor.fetchall()]
     
+    def get_document_file(self, document_id):
+        """
+        File metadata for serving a document download (skips the large extracted_text column)
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT id, claim_id, original_filename, file_type, file_size, file_path, content_hash
+                FROM documents WHERE id = ?
+            ''', (document_id,))
+            row = cursor.fetchone()
+            return dict(row) if row else None
+    
     def update_claim_status(self, claim_id, new_status, changed_by, change_reason=None, ai_suggested=False):
         """
         Update claim status and log the transition
@@ -523,6 +717,312 @@ class DatabaseManager:
             
             return [dict(row) for row in cursor.fetchall()]
 
+    def get_claim_analysis_state(self, claim_id):
+        """
+        Merged analysis state of a claim with its JSON columns decoded, or None
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            
+            cursor.execute('SELECT * FROM claim_analysis_state WHERE claim_id = ?', (claim_id,))
+            row = cursor.fetchone()
+            
+            if not row:
+                return None
+            state = dict(row)
+            state['analysis'] = json.loads(state['analysis'])
+            state['document_results'] = json.loads(state['document_results'])
+            return state
+    
+    def save_claim_analysis_state(self, claim_id, expected_version, analysis, document_results,
+                                  validation_result, recommendation):
+        """
+        Store a claim's merged analysis and update its single validation/recommendation
+        rows in one transaction. expected_version is the version that was read (None
+        for a claim without state). Returns the new version, or None when another
+        request updated the state first (the caller re-reads and merges again).
+        """
+        with sqlite3.connect(self.db_path, timeout=30) as conn:
+            cursor = conn.cursor()
+            
+            if expected_version is None:
+                cursor.execute('''
+                    INSERT OR IGNORE INTO claim_analysis_state (claim_id, version, analysis, document_results)
+                    VALUES (?, 1, ?, ?)
+                ''', (claim_id, json.dumps(analysis), json.dumps(document_results)))
+            else:
+                cursor.execute('''
+                    UPDATE claim_analysis_state
+                    SET version = version + 1, analysis = ?, document_results = ?, updated_at = CURRENT_TIMESTAMP
+                    WHERE claim_id = ? AND version = ?
+                ''', (json.dumps(analysis), json.dumps(document_results), claim_id, expected_version))
+            if cursor.rowcount != 1:
+                conn.rollback()
+                return None
+            
+            cursor.execute(
+                'SELECT version, validation_result_id, recommendation_id FROM claim_analysis_state WHERE claim_id = ?',
+                (claim_id,)
+            )
+            version, validation_result_id, recommendation_id = cursor.fetchone()
+            
+            validation_values = (
+                validation_result.get('is_valid', False),
+                json.dumps(validation_result.get('issues', [])),
+                validation_result.get('recommendation'),
+                validation_result.get('total_issues', 0)
+            ) if validation_result else None
+            if validation_values and validation_result_id:
+                cursor.execute('''
+                    UPDATE validation_results SET is_valid = ?, issues = ?, recommendation = ?, total_issues = ?
+                    WHERE id = ?
+                ''', validation_values + (validation_result_id,))
+            elif validation_values:
+                cursor.execute('''
+                    INSERT INTO validation_results (claim_id, is_valid, issues, recommendation, total_issues)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', (claim_id,) + validation_values)
+                validation_result_id = cursor.lastrowid
+            
+            recommendation_values = (
+                recommendation.get('recommendation'),
+                recommendation.get('confidence'),
+                recommendation.get('reason'),
+                recommendation.get('priority'),
+                json.dumps(recommendation.get('suggested_actions', [])),
+                recommendation.get('overall_score')
+            ) if recommendation else None
+            if recommendation_values and recommendation_id:
+                cursor.execute('''
+                    UPDATE recommendations
+                    SET recommendation = ?, confidence = ?, reason = ?, priority = ?, suggested_actions = ?, overall_score = ?
+                    WHERE id = ?
+                ''', recommendation_values + (recommendation_id,))
+            elif recommendation_values:
+                cursor.execute('''
+                    INSERT INTO recommendations
+                    (claim_id, recommendation, confidence, reason, priority, suggested_actions, overall_score)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                ''', (claim_id,) + recommendation_values)
+                recommendation_id = cursor.lastrowid
+            
+            cursor.execute('''
+                UPDATE claim_analysis_state SET validation_result_id = ?, recommendation_id = ? WHERE claim_id = ?
+            ''', (validation_result_id, recommendation_id, claim_id))
+            conn.commit()
+            return version
+    
+    def create_job(self, job_type, payload, max_attempts=3):
+        """
+        Queue a background job and return its id
+        """
+        job_id = uuid.uuid4().hex
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+                INSERT INTO analysis_jobs (id, job_type, status, payload, max_attempts, available_at)
+                VALUES (?, ?, 'queued', ?, ?, ?)
+            ''', (job_id, job_type, json.dumps(payload), max_attempts, time.time()))
+            
+            conn.commit()
+        return job_id
+    
+    def claim_next_job(self, worker_id, lease_seconds):
+        """
+        Atomically lease the oldest runnable job (queued, or running with an expired lease)
+        """
+        now = time.time()
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            cursor = conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            
+            cursor.execute('''
+                SELECT * FROM analysis_jobs
+                WHERE (status = 'queued' AND available_at <= ?)
+                   OR (status = 'running' AND lease_expires_at < ?)
+                ORDER BY created_at
+                LIMIT 1
+            ''', (now, now))
+            job = cursor.fetchone()
+            
+            if not job:
+                cursor.execute('COMMIT')
+                return None
+            
+            if job['attempts'] >= job['max_attempts']:
+                # Worker died holding the last attempt - give up on the job
+                cursor.execute('''
+                    UPDATE analysis_jobs
+                    SET status = 'failed', error = ?, lease_owner = NULL, updated_at = CURRENT_TIMESTAMP
+                    WHERE id = ?
+                ''', (job['error'] or 'Job lease expired too many times', job['id']))
+                cursor.execute('COMMIT')
+                return None
+            
+            cursor.execute('''
+                UPDATE analysis_jobs
+                SET status = 'running', lease_owner = ?, lease_expires_at = ?, heartbeat_at = ?,
+                    attempts = attempts + 1, updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', (worker_id, now + lease_seconds, now, job['id']))
+            cursor.execute('COMMIT')
+            
+            claimed = dict(job)
+            claimed['attempts'] += 1
+            claimed['payload'] = json.loads(claimed['payload'] or '{}')
+            return claimed
+        except Exception:
+            cursor.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+    
+    def heartbeat_job(self, job_id, worker_id, lease_seconds, stage=None, progress=None):
+        """
+        Extend a job lease (and optionally record progress); returns False if the lease was lost
+        """
+        now = time.time()
+        with sqlite3.connect(self.db_path, timeout=30) as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+                UPDATE analysis_jobs
+                SET heartbeat_at = ?, lease_expires_at = ?,
+                    stage = COALESCE(?, stage), progress = COALESCE(?, progress),
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE id = ? AND lease_owner = ? AND status = 'running'
+            ''', (now, now + lease_seconds, stage, progress, job_id, worker_id))
+            
+            conn.commit()
+            return cursor.rowcount == 1
+    
+    def complete_job(self, job_id, worker_id, result):
+        """
+        Mark a leased job as succeeded and store its result
+        """
+        with sqlite3.connect(self.db_path, timeout=30) as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+                UPDATE analysis_jobs
+                SET status = 'succeeded', result = ?, stage = 'complete', progress = 100,
+                    lease_owner = NULL, lease_expires_at = NULL, updated_at = CURRENT_TIMESTAMP
+                WHERE id = ? AND lease_owner = ?
+            ''', (json.dumps(result), job_id, worker_id))
+            
+            conn.commit()
+            return cursor.rowcount == 1
+    
+    def fail_job(self, job_id, worker_id, error, retry_delay=None):
+        """
+        Record a job failure; the job is re-queued after retry_delay seconds
+        while attempts remain, otherwise it is marked failed
+        """
+        with sqlite3.connect(self.db_path, timeout=30) as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+                UPDATE analysis_jobs
+                SET status = CASE WHEN ? IS NOT NULL AND attempts < max_attempts THEN 'queued' ELSE 'failed' END,
+                    available_at = ?, error = ?,
+                    lease_owner = NULL, lease_expires_at = NULL, updated_at = CURRENT_TIMESTAMP
+                WHERE id = ? AND lease_owner = ?
+            ''', (retry_delay, time.time() + (retry_delay or 0), error, job_id, worker_id))
+            
+            conn.commit()
+            return cursor.rowcount == 1
+    
+    def get_job(self, job_id):
+        """
+        Get a job with its payload and result decoded
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            
+            cursor.execute('SELECT * FROM analysis_jobs WHERE id = ?', (job_id,))
+            row = cursor.fetchone()
+            
+            if not row:
+                return None
+            job = dict(row)
+            job['payload'] = json.loads(job['payload'] or '{}')
+            job['result'] = json.loads(job['result']) if job['result'] else None
+            return job
+
+    def begin_idempotent_request(self, key, endpoint, fingerprint, ttl_seconds, lock_seconds):
+        """
+        Reserve an idempotency key for this request. Returns None when the key was
+        free (the caller runs the request), otherwise the stored row as a dict.
+        An in-progress reservation older than lock_seconds is treated as abandoned.
+        """
+        now = time.time()
+        with sqlite3.connect(self.db_path, timeout=30) as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+                DELETE FROM idempotency_keys
+                WHERE idempotency_key = ? AND endpoint = ?
+                  AND (expires_at < ? OR (status = 'in_progress' AND created_at < ?))
+            ''', (key, endpoint, now, now - lock_seconds))
+            cursor.execute('''
+                INSERT OR IGNORE INTO idempotency_keys
+                (idempotency_key, endpoint, fingerprint, status, created_at, expires_at)
+                VALUES (?, ?, ?, 'in_progress', ?, ?)
+            ''', (key, endpoint, fingerprint, now, now + ttl_seconds))
+            if cursor.rowcount == 1:
+                conn.commit()
+                return None
+            
+            cursor.execute('''
+                SELECT * FROM idempotency_keys WHERE idempotency_key = ? AND endpoint = ?
+            ''', (key, endpoint))
+            row = dict(cursor.fetchone())
+            conn.commit()
+        row['response_headers'] = json.loads(row['response_headers'] or '{}')
+        return row
+    
+    def complete_idempotent_request(self, key, endpoint, response_status, response_body, response_headers):
+        """
+        Store the response of a request made with an idempotency key
+        """
+        with sqlite3.connect(self.db_path, timeout=30) as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+                UPDATE idempotency_keys
+                SET status = 'completed', response_status = ?, response_body = ?, response_headers = ?
+                WHERE idempotency_key = ? AND endpoint = ?
+            ''', (response_status, response_body, json.dumps(response_headers), key, endpoint))
+            
+            conn.commit()
+    
+    def release_idempotent_request(self, key, endpoint):
+        """
+        Forget a key whose request failed, so a retry runs it again
+        """
+        with sqlite3.connect(self.db_path, timeout=30) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                DELETE FROM idempotency_keys WHERE idempotency_key = ? AND endpoint = ? AND status = 'in_progress'
+            ''', (key, endpoint))
+            conn.commit()
+    
+    def purge_expired_idempotency_keys(self):
+        """
+        Delete idempotency keys past their TTL; returns the number removed
+        """
+        with sqlite3.connect(self.db_path, timeout=30) as conn:
+            cursor = conn.cursor()
+            cursor.execute('DELETE FROM idempotency_keys WHERE expires_at < ?', (time.time(),))
+            conn.commit()
+            return cursor.rowcount
+
 # Initialize database when module is imported
 if __name__ == '__main__':
     db = DatabaseManager()
@@ -0,0 +1,126 @@
+import re
+from typing import Dict, List, Any, Iterable, Iterator
+
+from .token_budget import count_tokens
+
+# Page separator emitted by the PDF extractor between pages
+PAGE_BREAK = "\f"
+
+# Lines that look like the start of a new section in a claim document
+SECTION_HEADER_PATTERN = re.compile(
+    r'^\s*(?:[A-Z][A-Z0-9 ,&/\'().-]{3,}:?|\d{1,2}[.)]\s+\S.*|[A-Z][A-Za-z ]{2,40}:)\s*$'
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """Token count used for chunk budgets (tiktoken when installed, ~4 chars/token otherwise)"""
+    return count_tokens(text)
+
+
+class DocumentChunker:
+    """
+    Split long claim documents into analysis-sized chunks
+
+    Chunks are built on page boundaries first, then on section headers,
+    and only fall back to line splits when a single section exceeds the
+    per-chunk token budget.
+    """
+
+    def __init__(self, max_chunk_tokens: int = 1500):
+        self.max_chunk_tokens = max_chunk_tokens
+
+    def split(self, document_text: str) -> List[Dict[str, Any]]:
+        """
+        Split document text into chunks that fit the token budget
+        """
+        pages = document_text.split(PAGE_BREAK)
+        return list(self.chunk_pages(enumerate(pages, start=1)))
+
+    def chunk_pages(self, pages: Iterable) -> Iterator[Dict[str, Any]]:
+        """
+        Pack (page_number, page_text) pairs into chunks, yielding each chunk
+        as soon as it is full so callers can start work before all pages exist
+        """
+        index = 0
+        buffer = []
+        buffer_tokens = 0
+        start_page = end_page = None
+
+        for page_number, page_text in pages:
+            if not page_text or not page_text.strip():
+                continue
+
+            for piece in self._split_oversized(page_text):
+                piece_tokens = estimate_tokens(piece)
+                if buffer and buffer_tokens + piece_tokens > self.max_chunk_tokens:
+                    yield self._make_chunk(index, buffer, start_page, end_page)
+                    index += 1
+                    buffer, buffer_tokens = [], 0
+                    start_page = None
+
+                if start_page is None:
+                    start_page = page_number
+                end_page = page_number
+                buffer.append(piece)
+                buffer_tokens += piece_tokens
+
+        if buffer:
+            yield self._make_chunk(index, buffer, start_page, end_page)
+
+    def _split_oversized(self, page_text: str) -> List[str]:
+        """Split a page on section boundaries, then lines, to fit the budget"""
+        if estimate_tokens(page_text) <= self.max_chunk_tokens:
+            return [page_text.strip()]
+
+        sections = self._split_sections(page_text)
+        pieces = []
+        for section in sections:
+            if estimate_tokens(section) <= self.max_chunk_tokens:
+                pieces.append(section)
+            else:
+                pieces.extend(self._split_lines(section))
+        return pieces
+
+    def _split_sections(self, text: str) -> List[str]:
+        """Split text at lines that look like section headers"""
+        sections = []
+        current = []
+        for line in text.splitlines():
+            if current and SECTION_HEADER_PATTERN.match(line):
+                sections.append("\n".join(current).strip())
+                current = []
+            current.append(line)
+        if current:
+            sections.append("\n".join(current).strip())
+        return [s for s in sections if s]
+
+    def _split_lines(self, text: str) -> List[str]:
+        """Hard split on line boundaries (and characters for very long lines)"""
+        max_chars = self.max_chunk_tokens * 4
+        pieces = []
+        current = ""
+        for line in text.splitlines():
+            while len(line) > max_chars:
+                if current:
+                    pieces.append(current)
+                    current = ""
+                pieces.append(line[:max_chars])
+                line = line[max_chars:]
+            if len(current) + len(line) + 1 > max_chars and current:
+                pieces.append(current)
+                current = ""
+            current = f"{current}\n{line}" if current else line
+        if current.strip():
+            pieces.append(current)
+        return pieces
+
+    @staticmethod
+    def _make_chunk(index: int, pieces: List[str], start_page: int, end_page: int) -> Dict[str, Any]:
+        text = "\n\n".join(pieces)
+        return {
+            "index": index,
+            "text": text,
+            "start_page": start_page,
+            "end_page": end_page,
+            "estimated_tokens": estimate_tokens(text)
+        }
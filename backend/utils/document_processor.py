@@ -2,21 +2,26 @@ import os
 import json
 import time
 import uuid
-from typing import Dict, List, Any, Optional
+import itertools
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional, Iterable, Iterator, Tuple
 import base64
-from PIL import Image
-import pytesseract
 import PyPDF2
 import io
 from dotenv import load_dotenv
 
+# Load environment variables from .env file before the LLM client modules read their settings
+load_dotenv()
+
 # LangGraph and LangChain imports
 try:
     from langgraph.graph import StateGraph, END
     from langchain_openai import ChatOpenAI
     from langchain_core.prompts import PromptTemplate
     from langchain_core.output_parsers import JsonOutputParser
-    from langchain_core.runnables import RunnablePassthrough
+    from langchain_core.runnables import RunnablePassthrough, RunnableLambda
+    from langchain_core.utils.json import parse_partial_json
     from typing_extensions import TypedDict
     import functools
     LANGGRAPH_AVAILABLE = True
@@ -29,7 +34,8 @@ except ImportError as e:
         from langchain_openai import ChatOpenAI
         from langchain_core.prompts import PromptTemplate
         from langchain_core.output_parsers import JsonOutputParser
-        from langchain_core.runnables import RunnablePassthrough
+        from langchain_core.runnables import RunnablePassthrough, RunnableLambda
+        from langchain_core.utils.json import parse_partial_json
         print("✅ LangChain fallback available")
     except ImportError:
         print("❌ No LangChain available")
@@ -67,14 +73,10 @@ except ImportError:
 
 # Create safe decorator for Opik tracing
 def safe_opik_track(name):
-    """Decorator that safely applies Opik tracking when available"""
+    """Decorator that records sampled calls through the buffered telemetry exporter when Opik is available"""
     def decorator(func):
         if OPIK_AVAILABLE:
-            try:
-                return track(name=name)(func)
-            except Exception as e:
-                print(f"⚠️  Opik decorator failed for {name}: {e}")
-                return func
+            return traced(name)(func)
         else:
             return func
     return decorator
@@ -88,9 +90,47 @@ from .prompt import (
     OCR_NOT_AVAILABLE_MESSAGE,
     ERROR_RESPONSE_TEMPLATES,
     LANGFLOW_CONFIG,
-    OPIK_TRACE_CONFIG
+    OPIK_TRACE_CONFIG,
+    CHUNK_CONTEXT_NOTE,
+    CHUNKED_ANALYSIS_CONFIG,
+    PACKET_SEGMENTATION_CONFIG,
+    SUPPORTING_DOCUMENT_NOTE,
+    SUPPORTING_DOCUMENT_FOCUS,
+    FIELD_EXTRACTION_PROMPT,
+    ANALYSIS_REASK_PROMPT,
+    REFERENCE_SELECTION_CONFIG,
+    RULE_EXTRACTION_CONFIG,
+    STRUCTURED_OUTPUT_CONFIG,
+    TOKEN_BUDGET_CONFIG
+)
+from .document_chunker import DocumentChunker, PAGE_BREAK
+from .analysis_merge import FAILED_STATUSES, merge_analysis_results
+from .packet_segmenter import PACKET_SEGMENTS, PacketSegmenter
+from .pdf_extractor import PDFTextExtractor
+from .ocr_engine import OCREngine
+from .cms1500_extractor import CMS1500Extractor, is_cms1500, normalize_amount, normalize_date
+from .claim_validator import ClaimValidator
+from .adjudication_cascade import AdjudicationCascade, cascade_stats
+from .reference_index import approved_claim_index
+from .token_budget import compact_json, compact_text, prompt_token_log, truncate_to_tokens
+from .llm_client import (
+    LLM_PROVIDER,
+    OFFLINE_API_KEY,
+    OFFLINE_PROVIDERS,
+    create_chat_model,
+    is_circuit_open_error,
+    llm_circuit
+)
+from .llm_scheduler import BATCH, llm_priority, llm_scheduler
+from .telemetry import is_sampled, telemetry_exporter, trace_handler, traced
+from .metrics import STAGE_ERRORS, observe_stage, stage_timer, timed_stage
+from .analysis_schema import (
+    ClaimAnalysis, PARSE_OUTCOMES, apply_fallbacks, field_descriptions, load_analysis_json, validate_analysis
 )
 
+# Traces are buffered in memory and exported in the background through the global Opik client
+telemetry_exporter.set_client(OPIK_CLIENT if OPIK_CALLBACK_AVAILABLE else None)
+
 # LangGraph State Definition
 if LANGGRAPH_AVAILABLE:
     class ClaimsAnalysisState(TypedDict):
@@ -102,9 +142,6 @@ if LANGGRAPH_AVAILABLE:
         error_message: Optional[str]
         processing_method: str
 
-# Load environment variables from .env file
-load_dotenv()
-
 class DocumentProcessor:
     """
     Process claim documents using LangGraph workflows and OpenAI GPT-4o-mini with Opik telemetry
@@ -119,6 +156,8 @@ class DocumentProcessor:
     def __init__(self):
         # Load configuration from environment
         self.api_key = os.getenv('openai.api_key') or os.getenv('OPENAI_API_KEY')
+        if not self.api_key and LLM_PROVIDER in OFFLINE_PROVIDERS:
+            self.api_key = OFFLINE_API_KEY  # stub server / cassette replay never reach OpenAI
         if not self.api_key:
             raise ValueError("OpenAI API key not found. Please set 'openai.api_key' in your .env file")
         
@@ -137,13 +176,10 @@ class DocumentProcessor:
             self.opik_client = None
         
         # Initialize LangChain components for fallback
-        self.llm = ChatOpenAI(
-            api_key=self.api_key,
-            model="gpt-4o-mini",
-            temperature=0.1,
-            max_tokens=2000,
-            timeout=60
-        )
+        # Shared pooled HTTP client with jittered retries and a circuit breaker
+        self.llm = create_chat_model(self.api_key, temperature=0.1, max_tokens=2000)
+        # Analysis calls run in JSON mode; the ClaimAnalysis schema is enforced when parsing
+        self.analysis_llm = self.llm.bind(response_format=STRUCTURED_OUTPUT_CONFIG["response_format"])
         
         # Setup JSON output parser
         self.output_parser = JsonOutputParser()
@@ -154,6 +190,16 @@ class DocumentProcessor:
             input_variables=["document_text", "claim_type", "reference_document"]
         )
         
+        # Page-parallel PDF extraction; timings of the last extraction are kept for callers
+        self.ocr_engine = OCREngine()
+        self.pdf_extractor = PDFTextExtractor(ocr_engine=self.ocr_engine)
+        self.last_extraction = None
+        
+        # Rule-based CMS-1500 extraction and validation (LLM only for doubtful fields)
+        self.cms1500_extractor = CMS1500Extractor()
+        self.claim_validator = ClaimValidator()
+        self.cascade = AdjudicationCascade(self)
+        
         # Initialize LangGraph workflow
         if self.use_langgraph:
             self.analysis_workflow = self._create_langgraph_workflow()
@@ -261,47 +307,78 @@ CLINICAL INFORMATION:
         """
         Extract text from uploaded document (PDF, image, etc.)
         """
+        document_text, self.last_extraction = self.extract_document(file_path, file_type)
+        return document_text
+    
+    def extract_document(self, file_path: str, file_type: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """
+        Extract text and return (text, extraction metadata) without touching
+        last_extraction, so several files can be extracted concurrently
+        """
         try:
-            if file_type.lower() in ['pdf']:
-                return self._extract_from_pdf(file_path)
-            elif file_type.lower() in ['png', 'jpg', 'jpeg', 'tiff', 'bmp']:
-                extracted_text = self._extract_from_image(file_path)
-                # Check if this is an OCR unavailable message
-                if "[IMAGE UPLOAD DETECTED - OCR NOT AVAILABLE]" in extracted_text:
-                    return extracted_text  # Return the helpful message as-is
-                return extracted_text
-            elif file_type.lower() == 'txt':
-                return self._extract_from_text(file_path)
-            else:
-                raise ValueError(f"Unsupported file type: {file_type}")
+            with stage_timer("text_extraction"):
+                if file_type.lower() in ['pdf']:
+                    return self._extract_from_pdf(file_path)
+                elif file_type.lower() in ['png', 'jpg', 'jpeg', 'tiff', 'bmp']:
+                    # An OCR unavailable message is returned as-is with no metadata
+                    return self._extract_from_image(file_path)
+                elif file_type.lower() == 'txt':
+                    return self._extract_from_text(file_path), None
+                else:
+                    raise ValueError(f"Unsupported file type: {file_type}")
         except Exception as e:
             raise Exception(f"Text extraction failed: {str(e)}")
     
-    def _extract_from_pdf(self, file_path: str) -> str:
-        """Extract text from PDF file"""
-        text = ""
+    def _extract_from_pdf(self, file_path: str) -> Tuple[str, Dict[str, Any]]:
+        """
+        Extract text from PDF file (pages extracted in parallel, joined once).
+        Only pages without a text layer are OCR'd.
+        """
         try:
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                for page in pdf_reader.pages:
-                    text += page.extract_text() + "\n"
+            # Keep page boundaries so long documents can be chunked per page
+            extraction = self.pdf_extractor.extract(file_path, page_separator="\n" + PAGE_BREAK)
         except Exception as e:
             raise Exception(f"PDF extraction failed: {str(e)}")
-        return text
+        summary = self._extraction_summary(extraction["pages"], extraction["total_seconds"])
+        
+        if not extraction["text"].strip():
+            ocr_errors = [page["error"] for page in extraction["pages"] if page["source"] == "ocr_failed"]
+            if ocr_errors:
+                return OCR_NOT_AVAILABLE_MESSAGE.format(file_path=file_path, error_message=ocr_errors[0]), summary
+        return extraction["text"], summary
+    
+    @staticmethod
+    def _extraction_summary(pages: List[Dict[str, Any]], total_seconds: float) -> Dict[str, Any]:
+        """Per-page timings and provenance for a PDF extraction"""
+        ocr_pages = [page["page_number"] for page in pages if page["source"] in ("ocr", "ocr_failed")]
+        return {
+            "method": "pdf_hybrid" if ocr_pages else "pdf_text_layer",
+            "ocr_pages": ocr_pages,
+            "pages": pages,
+            "total_seconds": total_seconds
+        }
+    
+    def iter_pdf_pages(self, file_path: str):
+        """Stream per-page PDF text ({"page_number", "text", "seconds", "source"}) in page order"""
+        return self.pdf_extractor.iter_pages(file_path)
     
-    def _extract_from_image(self, file_path: str) -> str:
+    def _extract_from_image(self, file_path: str) -> Tuple[str, Optional[Dict[str, Any]]]:
         """Extract text from image using OCR (with fallback if Tesseract not available)"""
         try:
-            image = Image.open(file_path)
-            text = pytesseract.image_to_string(image)
-            return text
+            # Preprocessed, page-parallel OCR in the shared pool, cached by content hash
+            ocr_result = self.ocr_engine.ocr_file(file_path)
+            return ocr_result["text"], {
+                "method": "ocr",
+                "pages": ocr_result["pages"],
+                "total_seconds": ocr_result["total_seconds"]
+            }
         except Exception as e:
             # If Tesseract is not installed, return a helpful message instead of failing
             if "tesseract" in str(e).lower() or "not installed" in str(e).lower():
                 return OCR_NOT_AVAILABLE_MESSAGE.format(
                     file_path=file_path,
                     error_message=str(e)
-                )
+                ), None
             else:
                 raise Exception(f"Image processing failed: {str(e)}")
     
@@ -329,16 +406,12 @@ CLINICAL INFORMATION:
                         "reference_document": lambda x: state["reference_document"]
                     }
                     | self.prompt_template
-                    | self.llm
-                    | self.output_parser
+                    | self.analysis_llm
                 )
                 
-                # Run the analysis
-                result = chain.invoke({})
-                
-                # Ensure result is a dictionary
-                if isinstance(result, str):
-                    result = self._parse_analysis_result(result)
+                # Run the analysis and validate it against the schema
+                message = chain.invoke({})
+                result = self._parse_analysis_result(message.content, state["document_text"])
                 
                 result["processing_method"] = "langgraph"
                 
@@ -395,9 +468,21 @@ CLINICAL INFORMATION:
         # Compile the workflow
         return workflow.compile()
     
-    def analyze_claim_document(self, document_text: str, claim_type: str = "medical_claim") -> Dict[str, Any]:
+    def analyze_claim_document(self, document_text: str, claim_type: str = "medical_claim",
+                               chunked: Optional[bool] = None,
+                               form_fields: Optional[Dict[str, str]] = None,
+                               segment_packets: bool = True) -> Dict[str, Any]:
         """
         Analyze claim document using LangFlow
+
+        Multi-page packets (claim form plus supporting records) are split into their
+        documents and analyzed per document in parallel, unless segment_packets=False.
+        Documents longer than CHUNKED_ANALYSIS_CONFIG["threshold_chars"] are split on
+        page/section boundaries and analyzed chunk by chunk in parallel (map-reduce),
+        unless chunked=False, in which case they are truncated to the threshold.
+        Single claims go through the adjudication cascade: CMS-1500 rules (form_fields
+        are the PDF's AcroForm values, if any), then a short field-extraction call, and
+        the full analysis only for claims that are ambiguous, high-value or fail a tier.
         """
         trace_id = str(uuid.uuid4())
         start_time = time.time()
@@ -410,23 +495,23 @@ CLINICAL INFORMATION:
                 result["ocr_required"] = True
                 return result
             
-            # Truncate very large documents to prevent timeout
-            max_length = 4000  # Limit document length
-            if len(document_text) > max_length:
-                document_text = document_text[:max_length] + "\n[DOCUMENT TRUNCATED - SHOWING FIRST 4000 CHARACTERS]"
-            
-            reference_doc = self.reference_documents.get(claim_type, self.reference_documents["medical_claim"])
+            reference_doc = self._select_reference(document_text, claim_type)
             
-            # Use LangGraph workflow if available, otherwise fallback to LangChain
-            if self.use_langgraph and self.analysis_workflow:
-                result = self._analyze_with_langgraph(document_text, claim_type, reference_doc, trace_id)
-            else:
-                print("Using direct LangChain approach...")
-                result = self._analyze_with_langchain(document_text, claim_type, reference_doc, trace_id)
+            if segment_packets:
+                segments = self._segment_packet(document_text)
+                if len(segments) > 1:
+                    return self._analyze_packet(segments, claim_type, reference_doc, trace_id, form_fields)
             
-            return result
+            # Rules and a short extraction call first; full analysis only if they escalate
+            return self.cascade.adjudicate(
+                document_text, claim_type, trace_id,
+                lambda: self._full_analysis(document_text, claim_type, reference_doc, trace_id, chunked, form_fields),
+                form_fields
+            )
                 
         except Exception as e:
+            if is_circuit_open_error(e):
+                return self._llm_unavailable_result(document_text, trace_id, form_fields)
             error_msg = str(e).lower()
             if "timeout" in error_msg or "timed out" in error_msg:
                 result = ERROR_RESPONSE_TEMPLATES["timeout"].copy()
@@ -437,6 +522,647 @@ CLINICAL INFORMATION:
             
             return result
     
+    def _full_analysis(self, document_text: str, claim_type: str, reference_doc: str, trace_id: str,
+                       chunked: Optional[bool] = None,
+                       form_fields: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """Full reasoning analysis (last cascade tier), chunked or truncated for long documents"""
+        use_chunks = CHUNKED_ANALYSIS_CONFIG["enabled"] if chunked is None else chunked
+        max_length = CHUNKED_ANALYSIS_CONFIG["threshold_chars"]
+        if llm_circuit.is_open():
+            return self._llm_unavailable_result(document_text, trace_id, form_fields)
+        
+        if len(document_text) > max_length and use_chunks:
+            result = self._analyze_chunked(document_text, claim_type, reference_doc, trace_id)
+        else:
+            if len(document_text) > max_length:
+                # Truncate very large documents to the prompt's document token budget
+                document_text = truncate_to_tokens(document_text, TOKEN_BUDGET_CONFIG["max_document_tokens"])
+            result = self._run_analysis(document_text, claim_type, reference_doc, trace_id)
+        
+        if result.get("overall_status") == "ERROR" and llm_circuit.is_open():
+            # The provider degraded during this call - don't persist an ERROR result
+            return self._llm_unavailable_result(document_text, trace_id, form_fields)
+        return result
+    
+    def _select_reference(self, document_text: str, claim_type: str) -> str:
+        """
+        Reference block for the analysis prompt: field summary of the most similar
+        approved claim of this type, or the static example until one is indexed
+        """
+        if REFERENCE_SELECTION_CONFIG["enabled"]:
+            approved_claim_index.ensure_started()
+            match = approved_claim_index.select(document_text, claim_type)
+            if match is not None:
+                return match["summary"]
+        return self.reference_documents.get(claim_type, self.reference_documents["medical_claim"])
+    
+    def _use_rule_extraction(self, document_text: str, claim_type: str) -> bool:
+        """Rule-based extraction applies to single CMS-1500 forms (not long packets)"""
+        return (RULE_EXTRACTION_CONFIG["enabled"]
+                and claim_type == "medical_claim"
+                and len(document_text) <= CHUNKED_ANALYSIS_CONFIG["threshold_chars"]
+                and is_cms1500(document_text))
+    
+    @timed_stage("rule_extraction")
+    def _analyze_with_rules(self, document_text: str, trace_id: str,
+                            form_fields: Optional[Dict[str, str]] = None,
+                            allow_llm: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        Read CMS-1500 fields with rules, ask the LLM only for missing or low-confidence
+        required fields, then validate deterministically. Returns None when too few
+        fields could be read and the full LLM analysis should run instead.
+        With allow_llm=False (provider degraded) the rule result is always returned,
+        and doubtful fields send the claim to review.
+        """
+        start = time.perf_counter()
+        extraction = self.cms1500_extractor.extract(document_text, form_fields)
+        fields = extraction["fields"]
+        
+        min_confidence = RULE_EXTRACTION_CONFIG["min_field_confidence"]
+        doubtful = [
+            name for name in RULE_EXTRACTION_CONFIG["required_fields"]
+            if name not in fields or fields[name]["confidence"] < min_confidence
+        ]
+        if not allow_llm:
+            result = self._build_rule_result(fields, [])
+            if doubtful and result["overall_status"] == "APPROVED":
+                result["overall_status"] = "NEEDS_REVIEW"
+            result["trace_id"] = trace_id
+            return result
+        if len(doubtful) > RULE_EXTRACTION_CONFIG["max_llm_fields"]:
+            print(f"📋 CMS-1500 rules read too few fields ({len(doubtful)} doubtful) - using full analysis")
+            return None
+        
+        llm_fields = []
+        if doubtful:
+            for name, value in self._extract_fields_with_llm(document_text, doubtful).items():
+                fields[name] = {
+                    "value": value,
+                    "confidence": RULE_EXTRACTION_CONFIG["llm_field_confidence"],
+                    "source": "llm"
+                }
+                llm_fields.append(name)
+        
+        result = self._build_rule_result(fields, llm_fields)
+        result["trace_id"] = trace_id
+        print(f"📋 CMS-1500 rule extraction in {time.perf_counter() - start:.2f}s "
+              f"(LLM fields: {', '.join(llm_fields) or 'none'})")
+        return result
+    
+    def _llm_unavailable_result(self, document_text: str, trace_id: str,
+                                form_fields: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """
+        Fail-fast result while the LLM circuit is open: CMS-1500 forms are decided by
+        the rules alone, anything else is queued for manual review instead of ERROR
+        """
+        print(f"⚡ LLM circuit open - skipping LLM analysis (trace_id: {trace_id})")
+        if RULE_EXTRACTION_CONFIG["enabled"] and is_cms1500(document_text):
+            result = self._analyze_with_rules(document_text, trace_id, form_fields, allow_llm=False)
+            result["processing_method"] = "rules_fallback"
+            result["processing_notes"] = "LLM provider degraded (circuit open); rule-based CMS-1500 extraction only."
+            return result
+        result = ERROR_RESPONSE_TEMPLATES["llm_unavailable"].copy()
+        result["trace_id"] = trace_id
+        return result
+    
+    def _extract_fields_with_llm(self, document_text: str, field_names: List[str], llm=None,
+                                 document_description: str = "CMS-1500 claim form") -> Dict[str, Any]:
+        """Targeted LLM call returning only the requested fields (normalized, empty ones dropped)"""
+        prompt = PromptTemplate(
+            template=FIELD_EXTRACTION_PROMPT, input_variables=["document_description", "fields", "document_text"]
+        )
+        chain = prompt | (llm or self.llm) | self.output_parser
+        inputs = {
+            "document_description": document_description,
+            "fields": "\n".join(f"- {name}" for name in field_names),
+            "document_text": compact_text(document_text)
+        }
+        prompt_token_log.record("field_extraction", FIELD_EXTRACTION_PROMPT, inputs)
+        try:
+            response = chain.invoke(inputs)
+        except Exception as e:
+            print(f"⚠️  Targeted field extraction failed: {e}")
+            return {}
+        if not isinstance(response, dict):
+            return {}
+        
+        values = {}
+        for name in field_names:
+            value = response.get(name)
+            if value in (None, "", "null", "N/A"):
+                continue
+            if name in ("date_of_birth", "service_date"):
+                value = normalize_date(str(value)) or str(value)
+            elif name == "billed_amount":
+                amount = normalize_amount(str(value))
+                value = amount if amount is not None else value
+            values[name] = value
+        return values
+    
+    def _build_rule_result(self, fields: Dict[str, Dict[str, Any]], llm_fields: List[str]) -> Dict[str, Any]:
+        """Deterministic analysis result (same shape as the LLM's) from extracted form fields"""
+        required = RULE_EXTRACTION_CONFIG["required_fields"]
+        extracted_data = {name: field["value"] for name, field in fields.items()}
+        extracted_data["service_type"] = "medical_claim"
+        
+        claim_data = dict(extracted_data, amount_billed=extracted_data.get("billed_amount"))
+        validation = self.claim_validator.validate_claim(claim_data)
+        recommendation = validation["recommendation"]
+        if recommendation.startswith("REJECT"):
+            overall_status = "DENIED"
+        elif recommendation.startswith("FLAG"):
+            overall_status = "NEEDS_REVIEW"
+        else:
+            overall_status = "APPROVED"
+        
+        validation_errors = [
+            {
+                "field": issue.get("field") or ", ".join(issue.get("fields", [])) or issue["type"],
+                "error": issue["message"],
+                "expected_format": issue["type"]
+            }
+            for issue in validation["issues"]
+        ]
+        found = [name for name in required if name in extracted_data]
+        missing = [name for name in required if name not in extracted_data]
+        required_confidences = [fields[name]["confidence"] for name in found]
+        
+        key_factors = [f"{len(found)} of {len(required)} required CMS-1500 fields present"]
+        if "diagnosis_code" in extracted_data and "procedure_code" in extracted_data:
+            key_factors.append(f"Diagnosis {extracted_data['diagnosis_code']} billed with procedure {extracted_data['procedure_code']}")
+        if "prior_authorization" in extracted_data:
+            key_factors.append(f"Prior authorization {extracted_data['prior_authorization']} on file")
+        if isinstance(extracted_data.get("billed_amount"), float):
+            key_factors.append(f"Total charge ${extracted_data['billed_amount']:,.2f}")
+        
+        return {
+            "overall_status": overall_status,
+            "decision_reasoning": (
+                f"Fields were read directly from the CMS-1500 form. {recommendation} "
+                f"{len(validation['issues'])} validation issue(s) found."
+                + (f" Missing: {', '.join(missing)}." if missing else "")
+            ),
+            "key_factors": key_factors,
+            "completeness_score": round(100 * len(found) / len(required)),
+            "missing_sections": missing,
+            "found_sections": found,
+            "data_quality_issues": [issue["message"] for issue in validation["issues"] if issue["severity"] == "low"],
+            "validation_errors": validation_errors,
+            "recommendations": [f"Correct {error['field']}: {error['error']}" for error in validation_errors],
+            "extracted_data": extracted_data,
+            "confidence_level": round(100 * min(required_confidences)) if required_confidences else 0,
+            "processing_notes": (
+                "Rule-based CMS-1500 extraction; "
+                + (f"LLM used only for: {', '.join(llm_fields)}." if llm_fields else "no LLM call needed.")
+            ),
+            "processing_method": "rules_cms1500_llm_fields" if llm_fields else "rules_cms1500",
+            "field_confidence": {name: field["confidence"] for name, field in fields.items()},
+            "field_sources": {name: field["source"] for name, field in fields.items()}
+        }
+    
+    def _budget_analysis_inputs(self, document_text: str, claim_type: str, reference_doc: str,
+                                call: str = "analysis") -> Tuple[str, str]:
+        """Compact the per-call sections of the analysis prompt and log their token counts"""
+        document_text = compact_text(document_text)
+        reference_doc = compact_text(reference_doc)
+        prompt_token_log.record(call, CLAIMS_ANALYSIS_PROMPT_TEMPLATE, {
+            "reference_document": reference_doc,
+            "claim_type": claim_type,
+            "document_text": document_text
+        })
+        return document_text, reference_doc
+    
+    @timed_stage("llm_analysis")
+    def _run_analysis(self, document_text: str, claim_type: str, reference_doc: str, trace_id: str) -> Dict[str, Any]:
+        """Run a single analysis call through LangGraph, falling back to direct LangChain"""
+        document_text, reference_doc = self._budget_analysis_inputs(document_text, claim_type, reference_doc)
+        result = None
+        if self.use_langgraph and self.analysis_workflow:
+            result = self._analyze_with_langgraph(document_text, claim_type, reference_doc, trace_id)
+        if result is None:
+            print("Using direct LangChain approach...")
+            result = self._analyze_with_langchain(document_text, claim_type, reference_doc, trace_id)
+        return result
+    
+    def _analyze_chunked(self, document_text: str, claim_type: str, reference_doc: str, trace_id: str) -> Dict[str, Any]:
+        """Split a long document into page/section chunks and analyze them in parallel"""
+        chunker = DocumentChunker(max_chunk_tokens=CHUNKED_ANALYSIS_CONFIG["max_chunk_tokens"])
+        chunks = chunker.split(document_text)
+        if len(chunks) <= 1:
+            text = chunks[0]["text"] if chunks else document_text
+            return self._run_analysis(text, claim_type, reference_doc, trace_id)
+        return self._analyze_chunks(chunks, claim_type, reference_doc, trace_id)
+    
+    def _analyze_chunks(self, chunks: Iterable[Dict[str, Any]], claim_type: str, reference_doc: str, trace_id: str) -> Dict[str, Any]:
+        """
+        Map step: analyze each chunk in a bounded thread pool as chunks arrive.
+        Reduce step: merge extracted_data and validation_errors across chunks.
+        """
+        max_chunks = CHUNKED_ANALYSIS_CONFIG["max_chunks"]
+        submitted = []
+        skipped_pages = []
+        
+        with ThreadPoolExecutor(max_workers=CHUNKED_ANALYSIS_CONFIG["max_parallel_chunks"]) as executor:
+            for chunk in chunks:
+                if len(submitted) >= max_chunks:
+                    skipped_pages.append(f"{chunk['start_page']}-{chunk['end_page']}")
+                    continue
+                # Copy the caller's context so chunk calls keep its LLM priority class
+                future = executor.submit(contextvars.copy_context().run, self._analyze_chunk,
+                                         chunk, claim_type, reference_doc, trace_id)
+                submitted.append((chunk, future))
+            
+            results = []
+            for chunk, future in submitted:
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = ERROR_RESPONSE_TEMPLATES["system_error"].copy()
+                    result["processing_notes"] = f"Chunk {chunk['index'] + 1} failed: {str(e)}"
+                results.append(result)
+        
+        print(f"🧩 Chunked analysis: {len(results)} chunks analyzed (trace_id: {trace_id})")
+        
+        merged = merge_analysis_results(results)
+        merged.pop("chunk_index", None)
+        merged["trace_id"] = trace_id
+        merged["processing_method"] = f"chunked_{merged.get('processing_method', 'langchain')}"
+        merged["chunked_analysis"] = {
+            "total_chunks": len(results),
+            "chunks": [
+                {
+                    "index": chunk["index"],
+                    "pages": f"{chunk['start_page']}-{chunk['end_page']}",
+                    "estimated_tokens": chunk["estimated_tokens"],
+                    "status": result.get("overall_status", "UNKNOWN")
+                }
+                for (chunk, _), result in zip(submitted, results)
+            ],
+            "skipped_pages": skipped_pages
+        }
+        if skipped_pages:
+            merged["processing_notes"] = (
+                f"{merged.get('processing_notes', '')} Pages {', '.join(skipped_pages)} were not analyzed "
+                f"(chunk limit of {max_chunks} reached)."
+            ).strip()
+        return merged
+    
+    def _analyze_chunk(self, chunk: Dict[str, Any], claim_type: str, reference_doc: str, trace_id: str) -> Dict[str, Any]:
+        """Analyze a single chunk with a note telling the model it sees only part of the document"""
+        chunk_text = CHUNK_CONTEXT_NOTE.format(
+            part=chunk["index"] + 1,
+            start_page=chunk["start_page"],
+            end_page=chunk["end_page"]
+        ) + chunk["text"]
+        result = self._run_analysis(chunk_text, claim_type, reference_doc, trace_id)
+        result["chunk_index"] = chunk["index"]
+        return result
+    
+    def _segment_packet(self, document_text: str) -> List[Dict[str, Any]]:
+        """Documents of a multi-page packet ([] when segmentation is off or there are too few pages)"""
+        if not PACKET_SEGMENTATION_CONFIG["enabled"]:
+            return []
+        pages = document_text.split(PAGE_BREAK)
+        if sum(1 for page in pages if page.strip()) < PACKET_SEGMENTATION_CONFIG["min_pages"]:
+            return []
+        segmenter = PacketSegmenter(header_lines=PACKET_SEGMENTATION_CONFIG["header_lines"])
+        return segmenter.segment(enumerate(pages, start=1))
+    
+    def _analyze_packet(self, segments: Iterable[Dict[str, Any]], claim_type: str, reference_doc: str,
+                        trace_id: str, form_fields: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """
+        Analyze each document of a claim packet in a bounded thread pool as documents
+        arrive: the claim form through the normal path, supporting records with a
+        prompt for their type. The claim form decides the claim; supporting records
+        add evidence (extracted data, found sections) to the same result.
+        """
+        max_segments = PACKET_SEGMENTATION_CONFIG["max_segments"]
+        submitted = []
+        skipped_pages = []
+        
+        with ThreadPoolExecutor(max_workers=PACKET_SEGMENTATION_CONFIG["max_parallel_segments"]) as executor:
+            for segment in segments:
+                if len(submitted) >= max_segments:
+                    skipped_pages.append(f"{segment['start_page']}-{segment['end_page']}")
+                    continue
+                # Copy the caller's context so segment calls keep its LLM priority class
+                future = executor.submit(contextvars.copy_context().run, self._analyze_segment,
+                                         segment, claim_type, reference_doc, trace_id, form_fields)
+                submitted.append((segment, future))
+                PACKET_SEGMENTS.inc(document_type=segment["document_type"])
+            
+            results = []
+            for segment, future in submitted:
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = ERROR_RESPONSE_TEMPLATES["system_error"].copy()
+                    result["processing_notes"] = f"{segment['label']} (pages {segment['start_page']}-{segment['end_page']}) failed: {str(e)}"
+                results.append(result)
+        
+        print(f"📑 Claim packet: {len(results)} documents analyzed "
+              f"({', '.join(segment['document_type'] for segment, _ in submitted)}) (trace_id: {trace_id})")
+        
+        pairs = [(segment, result) for (segment, _), result in zip(submitted, results)]
+        claim_forms = [
+            result for segment, result in pairs
+            if segment["document_type"] == "claim_form" and result.get("overall_status") not in FAILED_STATUSES
+        ]
+        # Claim form first, so its header fields win ties when extracted data is merged
+        form_first = sorted(pairs, key=lambda pair: pair[0]["document_type"] != "claim_form")
+        merged = merge_analysis_results(
+            [result for _, result in form_first], primary=claim_forms[0] if claim_forms else None
+        )
+        
+        if claim_forms:
+            claim_form = claim_forms[0]
+            merged["overall_status"] = claim_form.get("overall_status")
+            merged["decision_reasoning"] = claim_form.get("decision_reasoning", "")
+            merged["confidence_level"] = claim_form.get("confidence_level", 0)
+            contradicting = [
+                segment["label"] for segment, result in pairs
+                if segment["document_type"] != "claim_form" and result.get("overall_status") == "DENIED"
+            ]
+            if contradicting and merged["overall_status"] != "DENIED":
+                merged["overall_status"] = "NEEDS_REVIEW"
+                merged["decision_reasoning"] = (
+                    f"{merged['decision_reasoning']} Supporting records do not support the claim "
+                    f"({', '.join(contradicting)}), so it is flagged for manual review."
+                ).strip()
+        elif not any(segment["document_type"] == "claim_form" for segment, _ in pairs):
+            merged["missing_sections"] = list(merged.get("missing_sections", [])) + ["Claim form (not found in packet)"]
+        
+        merged.pop("chunk_index", None)
+        merged["trace_id"] = trace_id
+        merged["processing_method"] = f"packet_{merged.get('processing_method', 'langchain')}"
+        merged["packet_segments"] = [
+            {
+                "index": segment["index"],
+                "document_type": segment["document_type"],
+                "label": segment["label"],
+                "pages": f"{segment['start_page']}-{segment['end_page']}",
+                "boundary": segment["boundary"],
+                "status": result.get("overall_status", "UNKNOWN"),
+                "confidence_level": result.get("confidence_level", 0)
+            }
+            for segment, result in pairs
+        ]
+        if skipped_pages:
+            merged["processing_notes"] = (
+                f"{merged.get('processing_notes', '')} Pages {', '.join(skipped_pages)} were not analyzed "
+                f"(document limit of {max_segments} reached)."
+            ).strip()
+        return merged
+    
+    def _analyze_segment(self, segment: Dict[str, Any], claim_type: str, reference_doc: str,
+                         trace_id: str, form_fields: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """Analyze one document of a packet; supporting records get a note naming their type"""
+        if segment["document_type"] == "claim_form":
+            # AcroForm values belong to the claim form; rules and chunking apply as for a single document
+            result = self.analyze_claim_document(segment["text"], claim_type, form_fields=form_fields, segment_packets=False)
+        else:
+            note = SUPPORTING_DOCUMENT_NOTE.format(
+                part=segment["index"] + 1,
+                label=segment["label"],
+                start_page=segment["start_page"],
+                end_page=segment["end_page"],
+                focus=SUPPORTING_DOCUMENT_FOCUS.get(segment["document_type"], SUPPORTING_DOCUMENT_FOCUS["other"])
+            )
+            chunker = DocumentChunker(max_chunk_tokens=CHUNKED_ANALYSIS_CONFIG["max_chunk_tokens"])
+            chunks = list(chunker.chunk_pages(segment["pages"]))
+            if len(chunks) > 1 and CHUNKED_ANALYSIS_CONFIG["enabled"]:
+                result = self._analyze_chunks(
+                    [dict(chunk, text=note + chunk["text"]) for chunk in chunks], claim_type, reference_doc, trace_id
+                )
+            else:
+                text = truncate_to_tokens(segment["text"], TOKEN_BUDGET_CONFIG["max_document_tokens"])
+                result = self._run_analysis(note + text, claim_type, reference_doc, trace_id)
+        result["chunk_index"] = segment["index"]
+        return result
+    
+    def analyze_pdf_streaming(self, file_path: str, claim_type: str = "medical_claim") -> Tuple[str, Optional[Dict[str, Any]]]:
+        """
+        Extract a PDF page by page and start chunk analysis as soon as the first
+        chunk of pages is available, instead of waiting for the whole document.
+        When a document boundary appears within the first lookahead_pages pages
+        (PACKET_SEGMENTATION_CONFIG), the PDF is a packet and is analyzed document
+        by document instead; later boundaries do not hold up chunk analysis.
+        Returns (document_text, analysis_result); analysis_result is None when no
+        text could be extracted.
+        """
+        if not CHUNKED_ANALYSIS_CONFIG["enabled"]:
+            with stage_timer("text_extraction"):
+                document_text, self.last_extraction = self._extract_from_pdf(file_path)
+            if not document_text.strip():
+                return document_text, None
+            return document_text, self.analyze_claim_document(
+                document_text, claim_type, form_fields=self._pdf_form_fields(file_path)
+            )
+        
+        trace_id = str(uuid.uuid4())
+        start = time.perf_counter()
+        pages = []
+        
+        def page_stream():
+            for page in self.iter_pdf_pages(file_path):
+                pages.append(page)
+                yield page["page_number"], page["text"]
+            # Extraction overlaps chunk analysis, so time it up to the last page only
+            observe_stage("text_extraction", time.perf_counter() - start)
+        
+        packet = None
+        leading_text = ""
+        lookahead_pages = PACKET_SEGMENTATION_CONFIG["lookahead_pages"]
+        try:
+            page_source = page_stream()
+            if PACKET_SEGMENTATION_CONFIG["enabled"]:
+                # Decide packet vs single document from the first few pages only, so a
+                # long single document starts chunk analysis after at most lookahead_pages
+                lookahead = list(itertools.islice(page_source, lookahead_pages))
+                segmenter = PacketSegmenter(header_lines=PACKET_SEGMENTATION_CONFIG["header_lines"])
+                leading = segmenter.segment(lookahead)
+                if len(leading) > 1:
+                    # A document is closed when the next one starts, so a packet's first
+                    # documents are analyzed while later pages still extract
+                    packet = segmenter.iter_segments(itertools.chain(lookahead, page_source))
+                    leading_text = leading[0]["text"]
+                else:
+                    page_source = itertools.chain(lookahead, page_source)
+            if packet is None:
+                chunker = DocumentChunker(max_chunk_tokens=CHUNKED_ANALYSIS_CONFIG["max_chunk_tokens"])
+                chunks = chunker.chunk_pages(page_source)
+                first = next(chunks, None)
+                second = next(chunks, None) if first else None
+                leading_text = first["text"] if first else ""
+        except Exception as e:
+            raise Exception(f"PDF extraction failed: {str(e)}")
+        
+        # Chosen from the first pages, which carry the claim form
+        reference_doc = self._select_reference(leading_text, claim_type)
+        
+        analysis_result = None
+        if packet is not None:
+            analysis_result = self._analyze_packet(packet, claim_type, reference_doc, trace_id,
+                                                   form_fields=self._pdf_form_fields(file_path))
+        elif second is not None:
+            # Chunks after the first two are submitted as their pages finish extracting
+            analysis_result = self._analyze_chunks(itertools.chain([first, second], chunks), claim_type, reference_doc, trace_id)
+        
+        document_text = ("\n" + PAGE_BREAK).join(page["text"] for page in pages)
+        self.last_extraction = self._extraction_summary(
+            [PDFTextExtractor.page_timing(page) for page in pages],
+            round(time.perf_counter() - start, 4)
+        )
+        
+        if not document_text.strip():
+            ocr_errors = [page["error"] for page in self.last_extraction["pages"] if page["source"] == "ocr_failed"]
+            if ocr_errors:
+                # Scanned PDF but Tesseract is unavailable - surface the OCR_REQUIRED result
+                document_text = OCR_NOT_AVAILABLE_MESSAGE.format(file_path=file_path, error_message=ocr_errors[0])
+                return document_text, self.analyze_claim_document(document_text, claim_type)
+        
+        if analysis_result is None and packet is None and first is not None:
+            # Whole document fits in one chunk - use the normal single-call path
+            # Pages past the lookahead were never checked for a document boundary
+            analysis_result = self.analyze_claim_document(
+                document_text, claim_type, form_fields=self._pdf_form_fields(file_path),
+                segment_packets=PACKET_SEGMENTATION_CONFIG["enabled"] and len(pages) > lookahead_pages
+            )
+        return document_text, analysis_result
+    
+    def _pdf_form_fields(self, file_path: str) -> Optional[Dict[str, str]]:
+        """AcroForm values of a fillable PDF, read only when rule extraction is on"""
+        if not RULE_EXTRACTION_CONFIG["enabled"]:
+            return None
+        return self.cms1500_extractor.read_form_fields(file_path) or None
+
+    def analyze_claim_documents_batch(self, document_texts: List[str], claim_type: str = "medical_claim",
+                                      max_concurrency: int = 4,
+                                      priority: int = BATCH) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """
+        Analyze many documents through LangChain's batch API with at most
+        max_concurrency analyses in flight. Yields (index, analysis_result)
+        in completion order, so callers can report each file as it finishes.
+        The LLM calls are scheduled at the given priority class (batch by default),
+        behind interactive requests.
+        """
+        def analyze_at_priority(document_text):
+            with llm_priority(priority):
+                return self.analyze_claim_document(document_text, claim_type)
+        
+        analyze = RunnableLambda(analyze_at_priority)
+        results = analyze.batch_as_completed(
+            document_texts,
+            config={"max_concurrency": max(1, max_concurrency)},
+            return_exceptions=True
+        )
+        for index, result in results:
+            if isinstance(result, Exception):
+                error_result = ERROR_RESPONSE_TEMPLATES["system_error"].copy()
+                error_result["validation_errors"] = [{"field": "system", "error": str(result), "expected_format": "valid_document"}]
+                error_result["processing_notes"] = f"Batch analysis failed: {str(result)}"
+                result = error_result
+            yield index, result
+
+    def stream_claim_analysis(self, document_text: str, claim_type: str = "medical_claim") -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Stream the analysis LLM output token by token.
+        Yields ("partial", {...}) whenever more extracted_data fields have been fully
+        parsed, and finally ("result", analysis_result). Documents that need OCR,
+        chunked or packet analysis, or CMS-1500 rule extraction are not token-streamed
+        and only produce the final result.
+        """
+        if ("[IMAGE UPLOAD DETECTED - OCR NOT AVAILABLE]" in document_text
+                or (CHUNKED_ANALYSIS_CONFIG["enabled"] and len(document_text) > CHUNKED_ANALYSIS_CONFIG["threshold_chars"])
+                or len(self._segment_packet(document_text)) > 1
+                or self._use_rule_extraction(document_text, claim_type)
+                or llm_circuit.is_open()):
+            yield "result", self.analyze_claim_document(document_text, claim_type)
+            return
+        
+        trace_id = str(uuid.uuid4())
+        reference_doc = self._select_reference(document_text, claim_type)
+        document_text, reference_doc = self._budget_analysis_inputs(document_text, claim_type, reference_doc, call="analysis_stream")
+        chain = self.prompt_template | self.analysis_llm
+        inputs = {
+            "document_text": document_text,
+            "claim_type": claim_type,
+            "reference_document": reference_doc
+        }
+        
+        content = ""
+        emitted = {}
+        overall_status = None
+        start = time.perf_counter()
+        try:
+            opik_callbacks = self._get_opik_callbacks()
+            config = {"callbacks": opik_callbacks} if opik_callbacks else None
+            for message_chunk in chain.stream(inputs, config=config):
+                content += message_chunk.content or ""
+                partial = parse_partial_json(self._strip_code_fence(content))
+                if not isinstance(partial, dict):
+                    continue
+                
+                fields, status = self._completed_partial_fields(partial)
+                new_fields = {k: v for k, v in fields.items() if emitted.get(k) != v}
+                if new_fields or status != overall_status:
+                    emitted.update(new_fields)
+                    overall_status = status
+                    update = {"extracted_data": dict(emitted)}
+                    if overall_status:
+                        update["overall_status"] = overall_status
+                    yield "partial", update
+            
+            result = self._parse_analysis_result(content, document_text)
+            result["processing_method"] = "langchain_stream"
+        except Exception as e:
+            print(f"Streaming analysis failed: {e}")
+            STAGE_ERRORS.inc(stage="llm_analysis")
+            observe_stage("llm_analysis", time.perf_counter() - start)
+            if is_circuit_open_error(e) or llm_circuit.is_open():
+                yield "result", self._llm_unavailable_result(document_text, trace_id)
+                return
+            result = ERROR_RESPONSE_TEMPLATES["system_error"].copy()
+            result["validation_errors"] = [{"field": "system", "error": str(e), "expected_format": "valid_document"}]
+            result["processing_notes"] = f"Streaming analysis failed: {str(e)}"
+        else:
+            observe_stage("llm_analysis", time.perf_counter() - start)
+        
+        result["trace_id"] = trace_id
+        yield "result", result
+    
+    @staticmethod
+    def _strip_code_fence(content: str) -> str:
+        """Drop a leading ```json fence (and trailing fence) from streamed output"""
+        content = content.strip()
+        if content.startswith("```"):
+            content = content.split("\n", 1)[1] if "\n" in content else ""
+        if content.endswith("```"):
+            content = content[:-3]
+        return content
+    
+    @staticmethod
+    def _completed_partial_fields(partial: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[str]]:
+        """
+        From a partially parsed response, return the extracted_data fields (and
+        overall_status) whose values are final - i.e. the parser has moved past them
+        """
+        top_keys = list(partial.keys())
+        
+        status = partial.get("overall_status")
+        if "overall_status" in top_keys and top_keys[-1] == "overall_status":
+            status = None  # value may still be streaming
+        
+        extracted = partial.get("extracted_data")
+        if not isinstance(extracted, dict):
+            return {}, status
+        
+        fields = dict(extracted)
+        if top_keys[-1] == "extracted_data" and fields:
+            # Still inside extracted_data: the last field may be incomplete
+            fields.pop(list(fields.keys())[-1])
+        return fields, status
+    
     def _analyze_with_langgraph(self, document_text: str, claim_type: str, reference_doc: str, trace_id: str) -> Dict[str, Any]:
         """
         Analyze document using LangGraph workflow
@@ -491,8 +1217,7 @@ CLINICAL INFORMATION:
                     "reference_document": lambda x: reference_doc
                 }
                 | self.prompt_template
-                | self.llm
-                | self.output_parser
+                | self.analysis_llm
             )
             
             # Get Opik callbacks following notebook pattern
@@ -500,15 +1225,13 @@ CLINICAL INFORMATION:
             
             # Run the chain with Opik tracing (matching notebook pattern)
             if opik_callbacks:
-                result = chain.invoke(document_text, config={"callbacks": opik_callbacks})
+                message = chain.invoke(document_text, config={"callbacks": opik_callbacks})
                 print(f"🔍 LangChain invoked with Opik tracing (trace_id: {trace_id})")
             else:
-                result = chain.invoke(document_text)
+                message = chain.invoke(document_text)
                 print(f"🔍 LangChain invoked without tracing (trace_id: {trace_id})")
             
-            # Ensure result is a dictionary
-            if isinstance(result, str):
-                result = self._parse_analysis_result(result)
+            result = self._parse_analysis_result(message.content, document_text)
             
             result["processing_method"] = "langchain_fallback"
             result["trace_id"] = trace_id
@@ -522,34 +1245,80 @@ CLINICAL INFORMATION:
             result["processing_notes"] = f"Both LangFlow and LangChain failed: {str(e)}"
             return result
     
-    def _parse_analysis_result(self, content: str) -> Dict[str, Any]:
+    def _parse_analysis_result(self, content: str, document_text: Optional[str] = None) -> Dict[str, Any]:
         """
-        Parse and clean the analysis result from LLM response
+        Parse the analysis JSON and validate it against the ClaimAnalysis schema.
+        Near-miss JSON is repaired locally; fields that still fail validation are
+        re-asked on their own (given document_text) instead of re-running the whole
+        analysis, and fall back to safe defaults (NEEDS_REVIEW) if that fails too.
         """
-        try:
-            # Handle markdown code blocks (remove ```json and ```)
-            if content.strip().startswith('```json'):
-                content = content.strip()[7:]  # Remove ```json
-            if content.strip().endswith('```'):
-                content = content.strip()[:-3]  # Remove ```
-            elif content.strip().startswith('```'):
-                # Handle just ``` without json
-                content = content.strip()[3:]
-                if content.endswith('```'):
-                    content = content[:-3]
-            
-            content = content.strip()
-            analysis_result = json.loads(content)
-            analysis_result["raw_llm_response"] = content
-            return analysis_result
-            
-        except json.JSONDecodeError as e:
-            # If JSON parsing fails, return structured error response
+        data, repaired = load_analysis_json(content, repair=STRUCTURED_OUTPUT_CONFIG["repair_json"])
+        if data is not None:
+            data, invalid = validate_analysis(data)
+        else:
+            data = {}
+            invalid = {name: "missing - response was not a JSON object"
+                       for name, info in ClaimAnalysis.model_fields.items() if info.is_required()}
+        
+        reasked = []
+        for _ in range(STRUCTURED_OUTPUT_CONFIG["max_reask_attempts"] if document_text else 0):
+            if not invalid:
+                break
+            reasked.extend(name for name in invalid if name not in reasked)
+            data = dict(data, **self._reask_analysis_fields(document_text, data, invalid))
+            data, invalid = validate_analysis(data)
+        
+        defaulted = list(invalid)
+        if invalid and any(name in data for name in ClaimAnalysis.model_fields):
+            data, invalid = validate_analysis(apply_fallbacks(data, defaulted))
+        if invalid:
+            PARSE_OUTCOMES.inc(outcome="failed")
             result = ERROR_RESPONSE_TEMPLATES["system_error"].copy()
-            result["validation_errors"][0]["error"] = f"JSON parsing failed: {str(e)}"
+            result["validation_errors"] = [{
+                "field": "system",
+                "error": f"Analysis output failed schema validation: {', '.join(sorted(invalid))}",
+                "expected_format": "valid_document"
+            }]
             result["processing_notes"] = f"Raw LLM response: {content[:500]}..."
             result["raw_llm_response"] = content
             return result
+        
+        outcome = "defaulted" if defaulted else "reasked" if reasked else "repaired" if repaired else "valid"
+        PARSE_OUTCOMES.inc(outcome=outcome)
+        if outcome != "valid":
+            data["output_repairs"] = {"json_repaired": repaired, "reasked_fields": reasked, "defaulted_fields": defaulted}
+        if defaulted:
+            print(f"⚠️  Analysis fields defaulted after re-ask: {', '.join(defaulted)}")
+            data["processing_notes"] = (
+                f"{data.get('processing_notes', '')} Model output for {', '.join(defaulted)} was invalid; "
+                f"defaults were used."
+            ).strip()
+        data["raw_llm_response"] = content
+        return data
+    
+    def _reask_analysis_fields(self, document_text: str, data: Dict[str, Any], invalid: Dict[str, str]) -> Dict[str, Any]:
+        """Targeted LLM call for only the analysis fields that failed validation"""
+        prompt = PromptTemplate(template=ANALYSIS_REASK_PROMPT,
+                                input_variables=["fields", "previous_analysis", "document_text"])
+        chain = prompt | self.analysis_llm | self.output_parser
+        inputs = {
+            "fields": "\n".join(
+                f"{line} (previous value invalid: {invalid[name]})"
+                for name, line in zip(invalid, field_descriptions(list(invalid)).splitlines())
+            ),
+            "previous_analysis": compact_json({k: v for k, v in data.items() if k not in invalid}),
+            "document_text": compact_text(document_text)
+        }
+        prompt_token_log.record("analysis_reask", ANALYSIS_REASK_PROMPT, inputs)
+        print(f"🔁 Re-asking invalid analysis fields: {', '.join(invalid)}")
+        try:
+            response = chain.invoke(inputs)
+        except Exception as e:
+            print(f"⚠️  Analysis field re-ask failed: {e}")
+            return {}
+        if not isinstance(response, dict):
+            return {}
+        return {name: response[name] for name in invalid if name in response}
     
     def _log_opik_start(self, trace_id: str, document_text: str, claim_type: str):
         """Log analysis start to Opik"""
@@ -643,30 +1412,29 @@ CLINICAL INFORMATION:
             print(f"⚠️  Opik error logging failed: {e}")
     
     def _get_opik_callbacks(self):
-        """Get Opik callback handlers for LangChain/LangGraph invoke calls - following LangGraph notebook pattern"""
-        if not OPIK_CALLBACK_AVAILABLE or not OPIK_CLIENT:
-            print("🔍 Opik callbacks not available - client not initialized")
+        """
+        Callback handlers for LangChain/LangGraph invoke calls. One shared handler
+        buffers spans in memory for the background exporter; unsampled requests
+        get no callbacks at all.
+        """
+        if trace_handler is None or not telemetry_exporter.active or not is_sampled():
             return []
         
-        try:
-            # Create OpikTracer following the notebook pattern
-            # For LangGraph: OpikTracer(graph=graph.get_graph(xray=True))
-            # For general LangChain: OpikTracer()
-            if self.analysis_workflow and hasattr(self.analysis_workflow, 'get_graph'):
-                # LangGraph workflow - include graph structure
-                tracer = OpikTracer(graph=self.analysis_workflow.get_graph(xray=True))
-                print(f"✅ OpikTracer created with LangGraph structure - traces will be logged")
-            else:
-                # LangChain chain - basic tracer
-                tracer = OpikTracer()
-                print(f"✅ OpikTracer created for LangChain - traces will be logged")
-            
-            return [tracer]
-        except Exception as e:
-            print(f"⚠️  Opik tracer creation failed: {e}")
-            return []
+        if telemetry_exporter.graph_definition is None and self.analysis_workflow and hasattr(self.analysis_workflow, 'get_graph'):
+            # LangGraph structure is the same for every processor - render it once per process
+            try:
+                telemetry_exporter.graph_definition = {
+                    "format": "mermaid",
+                    "data": self.analysis_workflow.get_graph(xray=True).draw_mermaid()
+                }
+            except Exception as e:
+                print(f"⚠️  LangGraph structure rendering failed: {e}")
+                telemetry_exporter.graph_definition = {}
+        
+        return [trace_handler]
     
     @safe_opik_track("get_improvement_suggestions")
+    @timed_stage("suggestions")
     def get_improvement_suggestions(self, analysis_result: Dict[str, Any]) -> Dict[str, Any]:
         """
         Generate detailed improvement suggestions based on analysis using LangFlow/LangChain
@@ -738,17 +1506,19 @@ CLINICAL INFORMATION:
             
             chain = suggestion_prompt | self.llm | JsonOutputParser()
             
+            # Only the fields the suggestions depend on, as compact JSON
+            relevant = {key: analysis_result.get(key) for key in TOKEN_BUDGET_CONFIG["suggestion_input_fields"]}
+            inputs = {"analysis_results": compact_json(relevant)}
+            prompt_token_log.record("suggestions", IMPROVEMENT_SUGGESTIONS_PROMPT, inputs)
+            
             # Get Opik callbacks for chain tracing
             opik_callbacks = self._get_opik_callbacks()
             
             # Run the chain with Opik callbacks
             if opik_callbacks:
-                ai_suggestions = chain.invoke(
-                    {"analysis_results": json.dumps(analysis_result, indent=2)},
-                    config={"callbacks": opik_callbacks}
-                )
+                ai_suggestions = chain.invoke(inputs, config={"callbacks": opik_callbacks})
             else:
-                ai_suggestions = chain.invoke({"analysis_results": json.dumps(analysis_result, indent=2)})
+                ai_suggestions = chain.invoke(inputs)
             
             return ai_suggestions.get("suggestions", [])
             
@@ -757,15 +1527,18 @@ CLINICAL INFORMATION:
             return []
 
     @safe_opik_track("compare_with_approved_claims")
+    @timed_stage("comparison")
     def compare_with_approved_claims(self, document_text: str) -> Dict[str, Any]:
         """
         Compare document with multiple approved claim examples using LangFlow/LangChain
         """
         try:
             comparison_results = {}
+            analyses = {}
             
             for claim_type, reference in self.reference_documents.items():
-                result = self.analyze_claim_document(document_text, claim_type)
+                result = self.analyze_claim_document(document_text, claim_type, chunked=False)
+                analyses[claim_type] = result
                 comparison_results[claim_type] = {
                     "match_score": result.get("completeness_score", 0),
                     "recommended": result.get("completeness_score", 0) > 70,
@@ -787,7 +1560,8 @@ CLINICAL INFORMATION:
                 "best_match_type": best_match[0],
                 "best_match_score": best_match[1]["match_score"],
                 "all_comparisons": comparison_results,
-                "detailed_analysis": self.analyze_claim_document(document_text, best_match[0])
+                # Reuse the analysis already run for the best match instead of repeating the call
+                "detailed_analysis": analyses[best_match[0]]
             }
             
             if detailed_comparison:
@@ -813,7 +1587,15 @@ CLINICAL INFORMATION:
                 input_variables=["document_text", "reference_claims"]
             )
             
-            reference_claims_str = json.dumps(self.reference_documents, indent=2)
+            reference_claims_str = compact_json({
+                claim_type: compact_text(self._select_reference(document_text, claim_type))
+                for claim_type in self.reference_documents
+            })
+            inputs = {
+                "reference_claims": reference_claims_str,
+                "document_text": truncate_to_tokens(compact_text(document_text), TOKEN_BUDGET_CONFIG["max_document_tokens"])
+            }
+            prompt_token_log.record("comparison", DOCUMENT_COMPARISON_PROMPT, inputs)
             
             chain = comparison_prompt | self.llm | JsonOutputParser()
             
@@ -822,15 +1604,9 @@ CLINICAL INFORMATION:
             
             # Run the chain with Opik callbacks
             if opik_callbacks:
-                comparison_analysis = chain.invoke({
-                    "document_text": document_text,
-                    "reference_claims": reference_claims_str
-                }, config={"callbacks": opik_callbacks})
+                comparison_analysis = chain.invoke(inputs, config={"callbacks": opik_callbacks})
             else:
-                comparison_analysis = chain.invoke({
-                    "document_text": document_text,
-                    "reference_claims": reference_claims_str
-                })
+                comparison_analysis = chain.invoke(inputs)
             
             return comparison_analysis
             
@@ -846,11 +1622,28 @@ CLINICAL INFORMATION:
             "processing_method": "langgraph" if self.use_langgraph else "langchain_direct"
         }
     
+    def get_llm_status(self) -> Dict[str, Any]:
+        """LLM provider setting and circuit breaker status"""
+        return dict(llm_circuit.status(), provider=LLM_PROVIDER)
+    
+    def get_scheduler_status(self) -> Dict[str, Any]:
+        """LLM rate-limit scheduler queue depths and wait times per priority class"""
+        return llm_scheduler.status()
+    
+    def get_cascade_status(self) -> Dict[str, Any]:
+        """Adjudication cascade hit rates and latency per tier"""
+        return cascade_stats.status()
+    
+    def get_reference_status(self) -> Dict[str, Any]:
+        """Approved claims available as prompt references, per claim type"""
+        return dict(approved_claim_index.status(), enabled=REFERENCE_SELECTION_CONFIG["enabled"])
+    
     def get_opik_status(self) -> Dict[str, Any]:
         """Get Opik telemetry status"""
         return {
             "available": OPIK_AVAILABLE,
             "callback_available": OPIK_CALLBACK_AVAILABLE,
             "client_initialized": self.opik_client is not None,
-            "project_name": OPIK_TRACE_CONFIG["project_name"] if OPIK_AVAILABLE else None
+            "project_name": OPIK_TRACE_CONFIG["project_name"] if OPIK_AVAILABLE else None,
+            "telemetry": telemetry_exporter.status()
         }
\ No newline at end of file
@@ -0,0 +1,122 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from functools import wraps
+
+from flask import Response, jsonify, make_response, request
+
+from .database import DatabaseManager
+from .metrics import registry
+
+# Idempotency-Key settings (overridable from .env)
+IDEMPOTENCY_TTL_SECONDS = float(os.getenv('IDEMPOTENCY_TTL_SECONDS', str(24 * 3600)))
+# A reservation still in progress after this long is assumed to belong to a crashed request
+IDEMPOTENCY_LOCK_SECONDS = float(os.getenv('IDEMPOTENCY_LOCK_SECONDS', '300'))
+IDEMPOTENCY_PURGE_INTERVAL = float(os.getenv('IDEMPOTENCY_PURGE_INTERVAL', '600'))
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+IDEMPOTENCY_MAX_KEY_LENGTH = 255
+# Response headers worth replaying with the stored body
+REPLAYED_HEADERS = ('Content-Type', 'Location')
+
+IDEMPOTENT_REQUESTS = registry.counter(
+    "claimsai_idempotent_requests_total",
+    "Requests carrying an Idempotency-Key by outcome (executed, replayed, in_progress, mismatch)",
+    ("endpoint", "outcome")
+)
+
+_last_purge = 0.0
+_purge_lock = threading.Lock()
+
+
+def request_fingerprint() -> str:
+    """
+    sha256 of what the request asks for: method, path, JSON body or form fields
+    plus uploaded file contents. Multipart boundaries differ between retries of
+    the same upload, so the raw body is not hashed for forms.
+    """
+    digest = hashlib.sha256()
+    digest.update(f"{request.method} {request.path}\n".encode())
+    if request.files or request.form:
+        for name, value in sorted(request.form.items(multi=True)):
+            digest.update(f"form:{name}={value}\n".encode())
+        for name, file in sorted(request.files.items(multi=True), key=lambda item: (item[0], item[1].filename or '')):
+            digest.update(f"file:{name}={file.filename}\n".encode())
+            for block in iter(lambda: file.stream.read(1024 * 1024), b''):
+                digest.update(block)
+            file.stream.seek(0)
+    else:
+        body = request.get_json(silent=True)
+        if body is not None:
+            digest.update(json.dumps(body, sort_keys=True, separators=(',', ':')).encode())
+        else:
+            digest.update(request.get_data())
+    return digest.hexdigest()
+
+
+def _purge_expired(db: DatabaseManager):
+    global _last_purge
+    now = time.monotonic()
+    with _purge_lock:
+        if now - _last_purge < IDEMPOTENCY_PURGE_INTERVAL:
+            return
+        _last_purge = now
+    try:
+        db.purge_expired_idempotency_keys()
+    except Exception as e:
+        print(f"⚠️  Idempotency key purge failed: {e}")
+
+
+def idempotent(view):
+    """
+    Honor an Idempotency-Key header on a JSON endpoint: the first request runs
+    and its response is stored; retries with the same key get the stored
+    response back (Idempotent-Replayed: true) without running the view again.
+    Same key with a different request -> 422; while the first is running -> 409.
+    Server errors (5xx) are not stored, so a retry runs the request again.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return view(*args, **kwargs)
+        if len(key) > IDEMPOTENCY_MAX_KEY_LENGTH:
+            return jsonify({'error': f'{IDEMPOTENCY_HEADER} must be at most {IDEMPOTENCY_MAX_KEY_LENGTH} characters'}), 400
+
+        endpoint = request.endpoint or request.path
+        fingerprint = request_fingerprint()
+        db = DatabaseManager()
+        _purge_expired(db)
+        stored = db.begin_idempotent_request(key, endpoint, fingerprint, IDEMPOTENCY_TTL_SECONDS, IDEMPOTENCY_LOCK_SECONDS)
+
+        if stored is not None:
+            if stored['fingerprint'] != fingerprint:
+                IDEMPOTENT_REQUESTS.inc(endpoint=endpoint, outcome='mismatch')
+                return jsonify({'error': f'{IDEMPOTENCY_HEADER} was already used with a different request'}), 422
+            if stored['status'] != 'completed':
+                IDEMPOTENT_REQUESTS.inc(endpoint=endpoint, outcome='in_progress')
+                response = jsonify({'error': 'A request with this Idempotency-Key is still being processed'})
+                response.headers['Retry-After'] = '1'
+                return response, 409
+            IDEMPOTENT_REQUESTS.inc(endpoint=endpoint, outcome='replayed')
+            response = Response(stored['response_body'], status=stored['response_status'])
+            for name, value in stored['response_headers'].items():
+                response.headers[name] = value
+            response.headers['Idempotent-Replayed'] = 'true'
+            return response
+
+        try:
+            response = make_response(view(*args, **kwargs))
+        except Exception:
+            db.release_idempotent_request(key, endpoint)
+            raise
+        if response.status_code >= 500 or response.is_streamed:
+            db.release_idempotent_request(key, endpoint)
+            return response
+
+        IDEMPOTENT_REQUESTS.inc(endpoint=endpoint, outcome='executed')
+        headers = {name: response.headers[name] for name in REPLAYED_HEADERS if name in response.headers}
+        db.complete_idempotent_request(key, endpoint, response.status_code, response.get_data(as_text=True), headers)
+        return response
+    return wrapper
@@ -0,0 +1,160 @@
+import os
+import socket
+import threading
+import traceback
+from typing import Dict, Any, Callable, Optional
+
+from .database import DatabaseManager
+
+# Background worker configuration (overridable from .env)
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '2'))
+JOB_LEASE_SECONDS = float(os.getenv('JOB_LEASE_SECONDS', '120'))
+JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', '1.0'))
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', '3'))
+JOB_RETRY_BASE_DELAY = float(os.getenv('JOB_RETRY_BASE_DELAY', '5'))
+
+
+class JobContext:
+    """
+    Handed to job handlers so they can report progress; every progress
+    update also renews the worker's lease on the job
+    """
+
+    def __init__(self, db: DatabaseManager, job: Dict[str, Any], worker_id: str, lease_seconds: float):
+        self.db = db
+        self.job = job
+        self.job_id = job['id']
+        self.attempt = job['attempts']
+        self.worker_id = worker_id
+        self.lease_seconds = lease_seconds
+
+    def progress(self, stage: str, percent: int) -> bool:
+        return self.db.heartbeat_job(self.job_id, self.worker_id, self.lease_seconds, stage, percent)
+
+
+class JobQueue:
+    """
+    SQLite-backed job queue with leases, heartbeats and retries
+
+    Handlers are registered per job type and called as handler(payload, context);
+    whatever they return is stored as the job result. Exceptions with
+    retryable = False fail the job immediately, anything else is retried with
+    exponential backoff until max_attempts is reached.
+    """
+
+    handlers: Dict[str, Callable[[Dict[str, Any], JobContext], Any]] = {}
+
+    def __init__(self, db: Optional[DatabaseManager] = None, lease_seconds: float = JOB_LEASE_SECONDS):
+        self.db = db or DatabaseManager()
+        self.lease_seconds = lease_seconds
+
+    @classmethod
+    def register_handler(cls, job_type: str, handler: Callable[[Dict[str, Any], JobContext], Any]):
+        cls.handlers[job_type] = handler
+
+    def enqueue(self, job_type: str, payload: Dict[str, Any], max_attempts: int = JOB_MAX_ATTEMPTS) -> str:
+        if job_type not in self.handlers:
+            raise ValueError(f"No handler registered for job type: {job_type}")
+        return self.db.create_job(job_type, payload, max_attempts)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self.db.get_job(job_id)
+
+    def run_next(self, worker_id: str) -> bool:
+        """
+        Lease and run one job; returns False when nothing was runnable
+        """
+        job = self.db.claim_next_job(worker_id, self.lease_seconds)
+        if not job:
+            return False
+
+        handler = self.handlers.get(job['job_type'])
+        if handler is None:
+            self.db.fail_job(job['id'], worker_id, f"No handler for job type {job['job_type']}")
+            return True
+
+        context = JobContext(self.db, job, worker_id, self.lease_seconds)
+        stop_heartbeat = threading.Event()
+        heartbeat = threading.Thread(
+            target=self._heartbeat_loop, args=(context, stop_heartbeat), daemon=True
+        )
+        heartbeat.start()
+
+        try:
+            print(f"⚙️  Job {job['id']} ({job['job_type']}) started by {worker_id}, attempt {job['attempts']}")
+            result = handler(job['payload'], context)
+            stop_heartbeat.set()
+            if not self.db.complete_job(job['id'], worker_id, result):
+                print(f"⚠️  Job {job['id']} finished after its lease was taken over - result discarded")
+            else:
+                print(f"✅ Job {job['id']} completed")
+        except Exception as e:
+            stop_heartbeat.set()
+            retryable = getattr(e, 'retryable', True)
+            retry_delay = JOB_RETRY_BASE_DELAY * (2 ** (job['attempts'] - 1)) if retryable else None
+            print(f"❌ Job {job['id']} failed (attempt {job['attempts']}): {e}")
+            traceback.print_exc()
+            self.db.fail_job(job['id'], worker_id, str(e), retry_delay)
+        finally:
+            stop_heartbeat.set()
+            heartbeat.join(timeout=1)
+        return True
+
+    def _heartbeat_loop(self, context: JobContext, stop: threading.Event):
+        """Renew the lease while the handler runs so other workers don't steal the job"""
+        interval = max(1.0, self.lease_seconds / 3)
+        while not stop.wait(interval):
+            if not context.db.heartbeat_job(context.job_id, context.worker_id, self.lease_seconds):
+                print(f"⚠️  Lost lease on job {context.job_id}")
+                return
+
+
+class JobWorkerPool:
+    """
+    Background threads that drain the job queue, leaving web workers free
+    """
+
+    def __init__(self, queue: Optional[JobQueue] = None, num_workers: int = JOB_WORKERS):
+        self.queue = queue
+        self.num_workers = num_workers
+        self.threads = []
+        self.stop_event = threading.Event()
+        self.wake_event = threading.Event()
+        self._lock = threading.Lock()
+
+    def ensure_started(self):
+        """Start the worker threads once per process (idempotent)"""
+        with self._lock:
+            if self.threads or self.num_workers <= 0:
+                return
+            if self.queue is None:
+                self.queue = JobQueue()
+            host = socket.gethostname()
+            for index in range(self.num_workers):
+                worker_id = f"{host}:{os.getpid()}:{index}"
+                thread = threading.Thread(target=self._worker_loop, args=(worker_id,), name=f"job-worker-{index}", daemon=True)
+                thread.start()
+                self.threads.append(thread)
+            print(f"✅ Started {self.num_workers} background job workers")
+
+    def notify(self):
+        """Wake idle workers right away after a job is enqueued"""
+        self.wake_event.set()
+
+    def stop(self):
+        self.stop_event.set()
+        self.wake_event.set()
+
+    def _worker_loop(self, worker_id: str):
+        while not self.stop_event.is_set():
+            try:
+                if self.queue.run_next(worker_id):
+                    continue
+            except Exception as e:
+                print(f"⚠️  Job worker {worker_id} error: {e}")
+            self.wake_event.wait(JOB_POLL_INTERVAL)
+            self.wake_event.clear()
+
+
+# Process-wide worker pool, started lazily by the first request
+job_workers = JobWorkerPool()
@@ -0,0 +1,123 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from typing import Dict, Any, Optional
+
+import httpx
+
+# Request fields that vary between otherwise identical calls and must not affect the key
+CASSETTE_IGNORED_FIELDS = ("user", "stream_options")
+# Response headers worth replaying (content-encoding/length no longer apply to the stored body)
+CASSETTE_KEPT_HEADERS = ("content-type", "retry-after", "x-request-id", "openai-processing-ms")
+
+
+class CassetteMissError(Exception):
+    """Replay mode got a request that was never recorded"""
+
+
+def request_key(request: httpx.Request) -> str:
+    """Stable hash of method, path and the canonical JSON body of an LLM request"""
+    try:
+        body = json.loads(request.content or b"{}")
+        for field in CASSETTE_IGNORED_FIELDS:
+            body.pop(field, None)
+        canonical = json.dumps(body, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    except ValueError:
+        canonical = request.content.decode("utf-8", errors="replace")
+    digest = hashlib.sha256()
+    digest.update(f"{request.method} {request.url.path}\n".encode())
+    digest.update(canonical.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class LLMCassette:
+    """
+    Request-hash to response store for LLM calls, kept as JSON lines so
+    recordings can be appended from many threads and diffed in review
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._interactions: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        interaction = json.loads(line)
+                        self._interactions[interaction["key"]] = interaction
+
+    def __len__(self):
+        return len(self._interactions)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self._interactions.get(key)
+
+    def record(self, interaction: Dict[str, Any]):
+        with self._lock:
+            if interaction["key"] in self._interactions:
+                return
+            self._interactions[interaction["key"]] = interaction
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(interaction, ensure_ascii=False) + "\n")
+
+
+class CassetteTransport(httpx.BaseTransport):
+    """
+    record - forward to the real transport and store every successful response
+    replay - answer from the cassette without touching the network, optionally
+             waiting as long as the recorded call took
+    """
+
+    def __init__(self, cassette: LLMCassette, mode: str,
+                 transport: Optional[httpx.BaseTransport] = None, replay_timing: bool = True):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.cassette = cassette
+        self.mode = mode
+        self.replay_timing = replay_timing
+        self._transport = transport or (httpx.HTTPTransport() if mode == "record" else None)
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        key = request_key(request)
+        if self.mode == "replay":
+            interaction = self.cassette.get(key)
+            if interaction is None:
+                raise CassetteMissError(
+                    f"No recorded LLM response for {request.url.path} (key {key[:12]}) in {self.cassette.path}"
+                )
+            if self.replay_timing:
+                time.sleep(interaction["elapsed_seconds"])
+            return httpx.Response(
+                interaction["status_code"],
+                headers=interaction["headers"],
+                content=interaction["body"].encode("utf-8"),
+                request=request
+            )
+
+        start = time.perf_counter()
+        response = self._transport.handle_request(request)
+        try:
+            body = response.read()
+        finally:
+            response.close()
+        elapsed = time.perf_counter() - start
+        headers = {name: value for name, value in response.headers.items() if name.lower() in CASSETTE_KEPT_HEADERS}
+        if response.status_code == 200:
+            # Errors are not recorded so a replay never reproduces a transient failure
+            self.cassette.record({
+                "key": key,
+                "path": request.url.path,
+                "status_code": response.status_code,
+                "headers": headers,
+                "body": body.decode("utf-8"),
+                "elapsed_seconds": round(elapsed, 4)
+            })
+        return httpx.Response(response.status_code, headers=headers, content=body, request=request)
+
+    def close(self):
+        if self._transport:
+            self._transport.close()
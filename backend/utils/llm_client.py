@@ -0,0 +1,277 @@
+import os
+import time
+import random
+import threading
+from typing import Optional
+
+import httpx
+
+from .llm_cassette import CassetteTransport, LLMCassette
+from .metrics import LLM_REQUEST_DURATION, registry
+from .llm_scheduler import LLMScheduler, SchedulerTimeoutError, estimate_request_tokens, llm_scheduler
+
+# LLM transport configuration (overridable from .env)
+# LLM_PROVIDER: openai - real API (or OPENAI_BASE_URL)
+#               stub   - local OpenAI-compatible stub server at LLM_STUB_URL (fake_openai_server.py)
+#               record - real API, storing every response in the cassette at LLM_CASSETTE_PATH
+#               replay - answers only from the cassette, no network
+LLM_PROVIDER = os.getenv('LLM_PROVIDER', 'openai').lower()
+LLM_STUB_URL = os.getenv('LLM_STUB_URL', 'http://127.0.0.1:8100/v1')
+LLM_CASSETTE_PATH = os.getenv(
+    'LLM_CASSETTE_PATH', os.path.join(os.path.dirname(__file__), '..', 'cassettes', 'llm_cassette.jsonl')
+)
+LLM_REPLAY_TIMING = os.getenv('LLM_REPLAY_TIMING', 'recorded').lower()  # recorded | none
+OPENAI_BASE_URL = os.getenv('OPENAI_BASE_URL') or None
+LLM_MODEL = os.getenv('LLM_MODEL', 'gpt-4o-mini')
+LLM_CONNECT_TIMEOUT = float(os.getenv('LLM_CONNECT_TIMEOUT', '5'))
+LLM_READ_TIMEOUT = float(os.getenv('LLM_READ_TIMEOUT', '30'))
+LLM_MAX_CONNECTIONS = int(os.getenv('LLM_MAX_CONNECTIONS', '20'))
+LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', '3'))
+LLM_RETRY_BASE_DELAY = float(os.getenv('LLM_RETRY_BASE_DELAY', '0.5'))
+LLM_RETRY_MAX_DELAY = float(os.getenv('LLM_RETRY_MAX_DELAY', '8'))
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('LLM_CIRCUIT_FAILURE_THRESHOLD', '5'))
+CIRCUIT_RESET_SECONDS = float(os.getenv('LLM_CIRCUIT_RESET_SECONDS', '30'))
+
+LLM_PROVIDERS = ("openai", "stub", "record", "replay")
+OFFLINE_PROVIDERS = ("stub", "replay")   # no real API key needed
+OFFLINE_API_KEY = "sk-offline"
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+RETRYABLE_EXCEPTIONS = (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError)
+
+
+class CircuitOpenError(Exception):
+    """Raised without touching the network while the LLM circuit is open"""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker
+
+    closed    -> requests flow; CIRCUIT_FAILURE_THRESHOLD failures in a row open it
+    open      -> requests fail fast until reset_seconds have passed
+    half_open -> one probe request is let through; success closes, failure re-opens
+    """
+
+    def __init__(self, failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+                 reset_seconds: float = CIRCUIT_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self.times_opened = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == "open" and time.monotonic() - self._opened_at >= self.reset_seconds:
+                return "half_open"
+            return self._state
+
+    def is_open(self) -> bool:
+        return self.state == "open"
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            if self._state == "closed":
+                return True
+            if self._state == "open":
+                if time.monotonic() - self._opened_at < self.reset_seconds:
+                    return False
+                self._state = "half_open"
+                self._probe_in_flight = False
+            # half_open: a single probe at a time
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+
+    def cancel_request(self):
+        """An allowed request was never sent - free the half-open probe slot"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            if self._state != "closed":
+                print("✅ LLM circuit closed - provider recovered")
+            self._state = "closed"
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if self._state == "half_open" or self._failures >= self.failure_threshold:
+                if self._state != "open":
+                    self.times_opened += 1
+                    print(f"⚠️  LLM circuit opened after {self._failures} consecutive failures "
+                          f"- failing fast for {self.reset_seconds:.0f}s")
+                self._state = "open"
+                self._opened_at = time.monotonic()
+
+    def status(self):
+        return {
+            "state": self.state,
+            "consecutive_failures": self._failures,
+            "times_opened": self.times_opened,
+            "failure_threshold": self.failure_threshold,
+            "reset_seconds": self.reset_seconds
+        }
+
+
+def backoff_delay(attempt: int, base: float = LLM_RETRY_BASE_DELAY, cap: float = LLM_RETRY_MAX_DELAY) -> float:
+    """Exponential backoff with full jitter: uniform(0, min(cap, base * 2^attempt))"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class ResilientTransport(httpx.BaseTransport):
+    """
+    httpx transport that retries retryable failures (429, 5xx, timeouts, dropped
+    connections) with jittered exponential backoff and reports the final outcome
+    to a circuit breaker. While the circuit is open requests fail immediately.
+    Every attempt first waits for rate-limit capacity from the scheduler.
+    """
+
+    def __init__(self, breaker: CircuitBreaker, max_retries: int = LLM_MAX_RETRIES,
+                 transport: Optional[httpx.BaseTransport] = None,
+                 scheduler: Optional[LLMScheduler] = None):
+        self.breaker = breaker
+        self.max_retries = max_retries
+        self.scheduler = scheduler
+        self._transport = transport or httpx.HTTPTransport(
+            limits=httpx.Limits(max_connections=LLM_MAX_CONNECTIONS, max_keepalive_connections=LLM_MAX_CONNECTIONS)
+        )
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        if not self.breaker.allow_request():
+            raise CircuitOpenError("LLM provider circuit is open - failing fast")
+
+        estimated_tokens = estimate_request_tokens(request.content) if self.scheduler else 0
+        attempt = 0
+        while True:
+            if self.scheduler:
+                try:
+                    self.scheduler.acquire(estimated_tokens)
+                except SchedulerTimeoutError:
+                    self.breaker.cancel_request()
+                    raise
+            sent = time.perf_counter()
+            try:
+                response = self._transport.handle_request(request)
+            except RETRYABLE_EXCEPTIONS as e:
+                LLM_REQUEST_DURATION.observe(time.perf_counter() - sent, outcome=type(e).__name__)
+                if attempt >= self.max_retries:
+                    self.breaker.record_failure()
+                    raise
+                delay = backoff_delay(attempt)
+                print(f"🔁 LLM request failed ({type(e).__name__}), retry {attempt + 1}/{self.max_retries} in {delay:.2f}s")
+            else:
+                LLM_REQUEST_DURATION.observe(time.perf_counter() - sent, outcome=str(response.status_code))
+                if response.status_code == 429 and self.scheduler:
+                    # Our estimate let too much through - hold every caller, not just this one
+                    self.scheduler.throttle(self._retry_after(response) or backoff_delay(attempt))
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    self.breaker.record_success()
+                    return response
+                if attempt >= self.max_retries:
+                    self.breaker.record_failure()
+                    return response
+                delay = self._retry_after(response) or backoff_delay(attempt)
+                print(f"🔁 LLM request got HTTP {response.status_code}, retry {attempt + 1}/{self.max_retries} in {delay:.2f}s")
+                response.close()
+            finally:
+                if self.scheduler:
+                    self.scheduler.release()
+            time.sleep(delay)
+            attempt += 1
+
+    @staticmethod
+    def _retry_after(response: httpx.Response) -> Optional[float]:
+        """Honor a short Retry-After from the provider (seconds form only)"""
+        try:
+            value = float(response.headers.get("retry-after", ""))
+        except ValueError:
+            return None
+        return min(value, LLM_RETRY_MAX_DELAY) if value >= 0 else None
+
+    def close(self):
+        self._transport.close()
+
+
+# One circuit and one connection pool shared by every LLM call in the process
+llm_circuit = CircuitBreaker()
+registry.gauge_callback(
+    "claimsai_llm_circuit_open", "1 while the LLM circuit breaker is failing fast", (),
+    lambda: {(): 1 if llm_circuit.is_open() else 0}
+)
+_http_client = None
+_http_client_lock = threading.Lock()
+
+
+def _provider_transport() -> httpx.BaseTransport:
+    """Innermost transport for LLM_PROVIDER: the pooled network transport, or a cassette"""
+    if LLM_PROVIDER not in LLM_PROVIDERS:
+        raise ValueError(f"Unknown LLM_PROVIDER '{LLM_PROVIDER}'. Use one of: {', '.join(LLM_PROVIDERS)}")
+    network = None
+    if LLM_PROVIDER != "replay":
+        network = httpx.HTTPTransport(
+            limits=httpx.Limits(max_connections=LLM_MAX_CONNECTIONS, max_keepalive_connections=LLM_MAX_CONNECTIONS)
+        )
+    if LLM_PROVIDER in ("record", "replay"):
+        cassette = LLMCassette(LLM_CASSETTE_PATH)
+        print(f"📼 LLM {LLM_PROVIDER} mode: {len(cassette)} recorded responses in {cassette.path}")
+        return CassetteTransport(cassette, LLM_PROVIDER, transport=network,
+                                 replay_timing=LLM_REPLAY_TIMING == "recorded")
+    return network
+
+
+def get_http_client() -> httpx.Client:
+    """Lazily create the shared, connection-pooled HTTP client for LLM calls"""
+    global _http_client
+    with _http_client_lock:
+        if _http_client is None:
+            _http_client = httpx.Client(
+                transport=ResilientTransport(llm_circuit, transport=_provider_transport(), scheduler=llm_scheduler),
+                timeout=httpx.Timeout(LLM_READ_TIMEOUT, connect=LLM_CONNECT_TIMEOUT)
+            )
+        return _http_client
+
+
+def create_chat_model(api_key: str, **overrides):
+    """
+    ChatOpenAI bound to the shared client. The SDK's own retries are disabled -
+    the transport retries with jitter and feeds the circuit breaker.
+    """
+    from langchain_openai import ChatOpenAI
+    
+    settings = {
+        "api_key": api_key,
+        "model": LLM_MODEL,
+        "temperature": 0.1,
+        "max_tokens": 2000,
+        "timeout": LLM_READ_TIMEOUT,
+        "max_retries": 0,
+        "http_client": get_http_client(),
+    }
+    if LLM_PROVIDER == "stub":
+        settings["base_url"] = LLM_STUB_URL
+    elif OPENAI_BASE_URL:
+        settings["base_url"] = OPENAI_BASE_URL
+    settings.update(overrides)
+    return ChatOpenAI(**settings)
+
+
+def is_circuit_open_error(error: BaseException) -> bool:
+    """True if the error (or anything it wraps) came from an open circuit"""
+    seen = set()
+    while error is not None and id(error) not in seen:
+        if isinstance(error, CircuitOpenError):
+            return True
+        seen.add(id(error))
+        error = error.__cause__ or error.__context__
+    return False
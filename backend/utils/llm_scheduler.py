@@ -0,0 +1,247 @@
+import os
+import json
+import time
+import heapq
+import itertools
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, Union
+
+from .token_budget import count_tokens
+from .metrics import registry
+
+# Provider rate limits (overridable from .env)
+LLM_SCHEDULER_ENABLED = os.getenv('LLM_SCHEDULER_ENABLED', 'true').lower() == 'true'
+LLM_REQUESTS_PER_MINUTE = int(os.getenv('LLM_REQUESTS_PER_MINUTE', '500'))
+LLM_TOKENS_PER_MINUTE = int(os.getenv('LLM_TOKENS_PER_MINUTE', '200000'))
+LLM_BURST_SECONDS = float(os.getenv('LLM_BURST_SECONDS', '10'))          # bucket size, in seconds of quota
+LLM_INTERACTIVE_RESERVE = float(os.getenv('LLM_INTERACTIVE_RESERVE', '0.2'))  # bucket share only interactive calls may use
+LLM_SCHEDULER_MAX_WAIT = float(os.getenv('LLM_SCHEDULER_MAX_WAIT', '300'))
+
+# Priority classes - lower value is served first
+INTERACTIVE = 0   # a user is waiting on the response (uploads, SSE, text analysis)
+BATCH = 1         # multi-document batch uploads
+BACKGROUND = 2    # re-analysis / re-scoring jobs nobody is waiting on
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BATCH: "batch", BACKGROUND: "background"}
+
+WAIT_SAMPLES = 500
+
+_current_priority = contextvars.ContextVar("llm_priority", default=INTERACTIVE)
+
+
+def parse_priority(value: Union[int, str, None]) -> int:
+    """Priority class from a name ("batch") or value; unknown values are interactive"""
+    if isinstance(value, int) and value in PRIORITY_NAMES:
+        return value
+    names = {name: priority for priority, name in PRIORITY_NAMES.items()}
+    return names.get(str(value or "").lower(), INTERACTIVE)
+
+
+@contextmanager
+def llm_priority(priority: Union[int, str]):
+    """Run the LLM calls made inside the block at the given priority class"""
+    token = _current_priority.set(parse_priority(priority))
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+def current_priority() -> int:
+    return _current_priority.get()
+
+
+def estimate_request_tokens(body: bytes) -> int:
+    """
+    Tokens a chat completion request counts against the TPM limit: prompt
+    tokens plus the max_tokens the provider reserves for the completion
+    """
+    try:
+        payload = json.loads(body or b"{}")
+    except ValueError:
+        return 0
+    prompt = "".join(
+        message.get("content") if isinstance(message.get("content"), str) else json.dumps(message.get("content"))
+        for message in payload.get("messages", [])
+    )
+    completion = payload.get("max_completion_tokens") or payload.get("max_tokens") or 0
+    return count_tokens(prompt) + int(completion)
+
+
+class SchedulerTimeoutError(Exception):
+    """An LLM call waited longer than LLM_SCHEDULER_MAX_WAIT for rate-limit capacity"""
+
+
+class TokenBucket:
+    """Refills at per_minute / 60 per second up to burst_seconds worth of quota (not thread-safe)"""
+
+    def __init__(self, per_minute: float, burst_seconds: float = LLM_BURST_SECONDS):
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, floor: float = 0.0) -> float:
+        """Seconds until amount can be taken while leaving floor in the bucket"""
+        amount = min(amount, self.capacity - floor)  # oversized requests wait for a full bucket
+        missing = amount + floor - self.level
+        return 0.0 if missing <= 0 else missing / self.rate
+
+    def take(self, amount: float):
+        self.level -= min(amount, self.level)
+
+
+class LLMScheduler:
+    """
+    Central admission control for every LLM request in the process
+
+    Callers block in acquire() until both the request bucket and the token
+    bucket have room. Waiters are served strictly by priority class, then in
+    arrival order. Batch and background calls may not dip into the last
+    interactive_reserve share of either bucket, so interactive calls find
+    capacity even while a batch run saturates the limits.
+    """
+
+    def __init__(self, requests_per_minute: int = LLM_REQUESTS_PER_MINUTE,
+                 tokens_per_minute: int = LLM_TOKENS_PER_MINUTE,
+                 interactive_reserve: float = LLM_INTERACTIVE_RESERVE,
+                 max_wait: float = LLM_SCHEDULER_MAX_WAIT,
+                 enabled: bool = LLM_SCHEDULER_ENABLED):
+        self.enabled = enabled
+        self.interactive_reserve = interactive_reserve
+        self.max_wait = max_wait
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self.limits = {"requests_per_minute": requests_per_minute, "tokens_per_minute": tokens_per_minute}
+        self._cond = threading.Condition()
+        self._queue = []
+        self._sequence = itertools.count()
+        self._paused_until = 0.0
+        self._in_flight = 0
+        self._queued = {priority: 0 for priority in PRIORITY_NAMES}
+        self._max_queued = {priority: 0 for priority in PRIORITY_NAMES}
+        self._granted = {priority: 0 for priority in PRIORITY_NAMES}
+        self._delayed = {priority: 0 for priority in PRIORITY_NAMES}
+        self._timeouts = {priority: 0 for priority in PRIORITY_NAMES}
+        self._waits = {priority: deque(maxlen=WAIT_SAMPLES) for priority in PRIORITY_NAMES}
+        self._upstream_throttles = 0
+
+    def _wait_needed(self, priority: int, estimated_tokens: int, now: float) -> float:
+        self.request_bucket.refill(now)
+        self.token_bucket.refill(now)
+        reserve = 0.0 if priority == INTERACTIVE else self.interactive_reserve
+        return max(
+            self._paused_until - now,
+            self.request_bucket.wait_time(1, reserve * self.request_bucket.capacity),
+            self.token_bucket.wait_time(estimated_tokens, reserve * self.token_bucket.capacity)
+        )
+
+    def acquire(self, estimated_tokens: int = 0, priority: Optional[int] = None) -> float:
+        """Block until the call may be sent; returns the seconds spent waiting"""
+        priority = current_priority() if priority is None else priority
+        start = time.monotonic()
+        entry = (priority, next(self._sequence))
+        with self._cond:
+            heapq.heappush(self._queue, entry)
+            self._queued[priority] += 1
+            self._max_queued[priority] = max(self._max_queued[priority], self._queued[priority])
+            try:
+                while True:
+                    now = time.monotonic()
+                    timeout = None
+                    if not self.enabled:
+                        break
+                    if self._queue[0] == entry:
+                        timeout = self._wait_needed(priority, estimated_tokens, now)
+                        if timeout <= 0:
+                            self.request_bucket.take(1)
+                            self.token_bucket.take(estimated_tokens)
+                            break
+                    remaining = self.max_wait - (now - start)
+                    if remaining <= 0:
+                        self._timeouts[priority] += 1
+                        raise SchedulerTimeoutError(
+                            f"No LLM rate-limit capacity for {PRIORITY_NAMES[priority]} call after {self.max_wait:.0f}s"
+                        )
+                    self._cond.wait(min(timeout, remaining) if timeout is not None else remaining)
+            finally:
+                self._queue.remove(entry)
+                heapq.heapify(self._queue)
+                self._queued[priority] -= 1
+                self._cond.notify_all()
+
+            waited = time.monotonic() - start
+            self._in_flight += 1
+            self._granted[priority] += 1
+            self._waits[priority].append(waited)
+            if waited > 0.001:
+                self._delayed[priority] += 1
+            return waited
+
+    def release(self):
+        """The call has its response (or failed); only tracks in-flight count"""
+        with self._cond:
+            self._in_flight -= 1
+
+    def throttle(self, seconds: float):
+        """The provider answered 429 anyway: hold every caller for seconds"""
+        with self._cond:
+            self._upstream_throttles += 1
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._cond.notify_all()
+
+    @staticmethod
+    def _percentile(samples, fraction: float) -> float:
+        if not samples:
+            return 0.0
+        ordered = sorted(samples)
+        return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))], 4)
+
+    def status(self) -> Dict[str, Any]:
+        """Queue depth, wait-time and bucket metrics per priority class"""
+        with self._cond:
+            now = time.monotonic()
+            self.request_bucket.refill(now)
+            self.token_bucket.refill(now)
+            return {
+                "enabled": self.enabled,
+                "limits": dict(self.limits, interactive_reserve=self.interactive_reserve),
+                "available": {
+                    "requests": round(self.request_bucket.level, 1),
+                    "tokens": round(self.token_bucket.level)
+                },
+                "in_flight": self._in_flight,
+                "paused_seconds": round(max(0.0, self._paused_until - now), 2),
+                "upstream_throttles": self._upstream_throttles,
+                "priorities": {
+                    name: {
+                        "queue_depth": self._queued[priority],
+                        "max_queue_depth": self._max_queued[priority],
+                        "granted": self._granted[priority],
+                        "delayed": self._delayed[priority],
+                        "timeouts": self._timeouts[priority],
+                        "wait_p50_seconds": self._percentile(self._waits[priority], 0.5),
+                        "wait_p95_seconds": self._percentile(self._waits[priority], 0.95)
+                    }
+                    for priority, name in PRIORITY_NAMES.items()
+                }
+            }
+
+
+# One scheduler for every LLM call in the process
+llm_scheduler = LLMScheduler()
+
+registry.gauge_callback(
+    "claimsai_llm_queue_depth", "LLM calls waiting for rate-limit capacity", ("priority",),
+    lambda: {(name,): stats["queue_depth"] for name, stats in llm_scheduler.status()["priorities"].items()}
+)
+registry.gauge_callback(
+    "claimsai_llm_in_flight", "LLM calls holding a scheduler slot", (),
+    lambda: {(): llm_scheduler.status()["in_flight"]}
+)
@@ -0,0 +1,249 @@
+import os
+import io
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Dict, List, Any, Optional, Union
+
+from PIL import Image, ImageOps
+import pytesseract
+
+from .metrics import timed_stage
+
+# OCR configuration (overridable from .env)
+OCR_WORKERS = int(os.getenv('OCR_WORKERS', str(os.cpu_count() or 2)))
+OCR_TARGET_DPI = int(os.getenv('OCR_TARGET_DPI', '300'))
+OCR_MAX_SIDE_PX = int(os.getenv('OCR_MAX_SIDE_PX', '3500'))  # used when the image carries no DPI info
+OCR_LANGUAGE = os.getenv('OCR_LANGUAGE', 'eng')
+OCR_CACHE_DIR = os.getenv('OCR_CACHE_DIR', os.path.join(os.path.dirname(__file__), '..', 'uploads', '.ocr_cache'))
+OCR_MEMORY_CACHE_SIZE = int(os.getenv('OCR_MEMORY_CACHE_SIZE', '256'))
+
+
+def _otsu_threshold(gray: Image.Image) -> int:
+    """Pick a global binarization threshold from the grayscale histogram (Otsu's method)"""
+    histogram = gray.histogram()[:256]
+    total = sum(histogram)
+    sum_all = sum(i * count for i, count in enumerate(histogram))
+    sum_background = weight_background = 0
+    best_threshold, best_variance = 127, 0.0
+    for level, count in enumerate(histogram):
+        weight_background += count
+        if weight_background == 0:
+            continue
+        weight_foreground = total - weight_background
+        if weight_foreground == 0:
+            break
+        sum_background += level * count
+        mean_background = sum_background / weight_background
+        mean_foreground = (sum_all - sum_background) / weight_foreground
+        variance = weight_background * weight_foreground * (mean_background - mean_foreground) ** 2
+        if variance > best_variance:
+            best_variance, best_threshold = variance, level
+    return best_threshold
+
+
+def preprocess_image(image: Image.Image, target_dpi: int = OCR_TARGET_DPI) -> Image.Image:
+    """
+    Prepare a scan for Tesseract: grayscale, downscale to the target DPI, binarize
+    """
+    gray = ImageOps.grayscale(image)
+
+    # Downscale oversampled scans - Tesseract gains nothing above ~300 DPI
+    dpi = image.info.get('dpi')
+    scale = 1.0
+    if dpi and dpi[0] and float(dpi[0]) > target_dpi:
+        scale = target_dpi / float(dpi[0])
+    elif not dpi and max(gray.size) > OCR_MAX_SIDE_PX:
+        scale = OCR_MAX_SIDE_PX / float(max(gray.size))
+    if scale < 1.0:
+        new_size = (max(1, int(gray.width * scale)), max(1, int(gray.height * scale)))
+        gray = gray.resize(new_size, Image.LANCZOS)
+
+    gray = ImageOps.autocontrast(gray)
+    threshold = _otsu_threshold(gray)
+    return gray.point(lambda value: 255 if value > threshold else 0, mode='1')
+
+
+def _ocr_task(source: Union[str, bytes], frame: int, target_dpi: int, language: str) -> Dict[str, Any]:
+    """Worker: OCR one page (frame) of an image file path or encoded image bytes"""
+    start = time.perf_counter()
+    image = Image.open(io.BytesIO(source) if isinstance(source, bytes) else source)
+    if frame:
+        image.seek(frame)
+    prepared = preprocess_image(image, target_dpi)
+    text = pytesseract.image_to_string(prepared, lang=language)
+    return {"text": text, "seconds": time.perf_counter() - start}
+
+
+def _ocr_images_task(images: List[bytes], target_dpi: int, language: str) -> Dict[str, Any]:
+    """Worker: OCR every image embedded in one PDF page and join the text"""
+    start = time.perf_counter()
+    texts = [_ocr_task(data, 0, target_dpi, language)["text"] for data in images]
+    return {"text": "\n".join(texts), "seconds": time.perf_counter() - start, "cached": False}
+
+
+class OCREngine:
+    """
+    OCR subsystem backed by a process pool sized to the CPU count
+
+    Pages are preprocessed before OCR, multi-page TIFFs are OCR'd page by page
+    in parallel, and results are cached by image content hash (in memory and
+    on disk) so re-uploads of the same scan skip Tesseract entirely.
+    """
+
+    _pool = None
+    _pool_lock = threading.Lock()
+    _memory_cache: "OrderedDict[str, str]" = OrderedDict()
+    _cache_lock = threading.Lock()
+
+    def __init__(self, max_workers: int = OCR_WORKERS, target_dpi: int = OCR_TARGET_DPI,
+                 language: str = OCR_LANGUAGE, cache_dir: Optional[str] = OCR_CACHE_DIR):
+        self.max_workers = max_workers
+        self.target_dpi = target_dpi
+        self.language = language
+        self.cache_dir = cache_dir
+
+    @classmethod
+    def _get_pool(cls, max_workers: int) -> ProcessPoolExecutor:
+        with cls._pool_lock:
+            if cls._pool is None:
+                cls._pool = ProcessPoolExecutor(max_workers=max_workers)
+            return cls._pool
+
+    def ocr_file(self, file_path: str) -> Dict[str, Any]:
+        """
+        OCR an image file (all frames of a multi-page TIFF)
+        Returns {"text", "pages": [{"page_number", "chars", "seconds", "cached"}], "total_seconds"}
+        """
+        with open(file_path, 'rb') as file:
+            content = file.read()
+        with Image.open(io.BytesIO(content)) as image:
+            frame_count = getattr(image, 'n_frames', 1)
+        content_hash = hashlib.sha256(content).hexdigest()
+        # Workers re-open the file by path so page bytes are not copied to every process
+        sources = [(file_path, frame, f"{content_hash}:{frame}") for frame in range(frame_count)]
+        return self._run(sources)
+
+    def ocr_images(self, images: List[bytes]) -> Dict[str, Any]:
+        """OCR a list of encoded page images (e.g. scans embedded in a PDF), in order"""
+        sources = [(data, 0, hashlib.sha256(data).hexdigest()) for data in images]
+        return self._run(sources)
+
+    def submit_page_images(self, images: List[bytes]) -> Future:
+        """
+        Queue OCR for the images of one scanned PDF page without blocking
+        Returns a Future of {"text", "seconds", "cached"}
+        """
+        digest = hashlib.sha256()
+        for data in images:
+            digest.update(data)
+        cache_key = self._cache_key(digest.hexdigest())
+
+        cached_text = self._cache_get(cache_key)
+        if cached_text is not None:
+            future = Future()
+            future.set_result({"text": cached_text, "seconds": 0.0, "cached": True})
+            return future
+
+        future = self._get_pool(self.max_workers).submit(_ocr_images_task, images, self.target_dpi, self.language)
+
+        def store(done):
+            if not done.cancelled() and done.exception() is None:
+                self._cache_put(cache_key, done.result()["text"])
+
+        future.add_done_callback(store)
+        return future
+
+    @timed_stage("ocr")
+    def _run(self, sources: List[tuple]) -> Dict[str, Any]:
+        start = time.perf_counter()
+        results: List[Optional[Dict[str, Any]]] = [None] * len(sources)
+        pending = []
+
+        for index, (data, frame, content_key) in enumerate(sources):
+            cache_key = self._cache_key(content_key)
+            cached_text = self._cache_get(cache_key)
+            if cached_text is not None:
+                results[index] = {"text": cached_text, "seconds": 0.0, "cached": True}
+            else:
+                pending.append((index, data, frame, cache_key))
+
+        if len(pending) == 1 or (pending and self.max_workers <= 1):
+            # A single page is cheaper inline than through the pool
+            for index, data, frame, cache_key in pending:
+                result = _ocr_task(data, frame, self.target_dpi, self.language)
+                results[index] = dict(result, cached=False)
+                self._cache_put(cache_key, result["text"])
+        elif pending:
+            pool = self._get_pool(self.max_workers)
+            futures = [
+                (index, cache_key, pool.submit(_ocr_task, data, frame, self.target_dpi, self.language))
+                for index, data, frame, cache_key in pending
+            ]
+            for index, cache_key, future in futures:
+                result = future.result()
+                results[index] = dict(result, cached=False)
+                self._cache_put(cache_key, result["text"])
+
+        return {
+            "text": "\n".join(result["text"] for result in results),
+            "pages": [
+                {
+                    "page_number": number,
+                    "chars": len(result["text"]),
+                    "seconds": round(result["seconds"], 4),
+                    "cached": result["cached"]
+                }
+                for number, result in enumerate(results, start=1)
+            ],
+            "total_seconds": round(time.perf_counter() - start, 4)
+        }
+
+    def _cache_key(self, content_key: str) -> str:
+        # Preprocessing settings change the output, so they are part of the key
+        return hashlib.sha256(f"{content_key}|{self.target_dpi}|{self.language}".encode()).hexdigest()
+
+    def _cache_path(self, cache_key: str) -> Optional[str]:
+        if not self.cache_dir:
+            return None
+        return os.path.join(self.cache_dir, cache_key[:2], f"{cache_key}.txt")
+
+    def _cache_get(self, cache_key: str) -> Optional[str]:
+        with self._cache_lock:
+            if cache_key in self._memory_cache:
+                self._memory_cache.move_to_end(cache_key)
+                return self._memory_cache[cache_key]
+
+        path = self._cache_path(cache_key)
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as file:
+                    text = file.read()
+                self._remember(cache_key, text)
+                return text
+            except OSError:
+                return None
+        return None
+
+    def _cache_put(self, cache_key: str, text: str):
+        self._remember(cache_key, text)
+        path = self._cache_path(cache_key)
+        if not path:
+            return
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as file:
+                file.write(text)
+            os.replace(temp_path, path)
+        except OSError as e:
+            print(f"⚠️  OCR cache write failed: {e}")
+
+    def _remember(self, cache_key: str, text: str):
+        with self._cache_lock:
+            self._memory_cache[cache_key] = text
+            self._memory_cache.move_to_end(cache_key)
+            while len(self._memory_cache) > OCR_MEMORY_CACHE_SIZE:
+                self._memory_cache.popitem(last=False)
@@ -0,0 +1,198 @@
+import re
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from .document_chunker import PAGE_BREAK
+from .metrics import registry
+
+# Document types found in claim submission packets. "title" is matched against the
+# first lines of a page (a form header or document title starts a new document);
+# "keywords" score untitled pages and segments. Patterns are case-insensitive.
+SEGMENT_TYPE_RULES = {
+    "claim_form": {
+        "label": "Claim form",
+        "title": r"^(?:HEALTH )?INSURANCE CLAIM FORM\b|^(?:CMS|HCFA)[-\s]?1500\b|^UB[-\s]?04\b",
+        "keywords": [
+            r"^\s*(?:1a|2|3|11|21|24|28|33)\.\s+[A-Z]", r"Insured(?:'s)? I\.?D", r"Federal Tax I\.?D",
+            r"Billing Provider", r"Total Charges?", r"Policy (?:Number|Holder)"
+        ],
+    },
+    "prior_authorization": {
+        "label": "Prior authorization",
+        "title": r"^(?:Re:\s*)?(?:Prior|Pre)[-\s]?Authori[sz]ation (?:Confirmation|Approval|Letter|Notice|Request|Determination)",
+        "keywords": [r"Authori[sz]ation (?:Number|#)", r"authori[sz]ation was (?:obtained|approved)", r"\bPA\d{4,}\b"],
+    },
+    "physician_order": {
+        "label": "Physician order / referral",
+        "title": r"^(?:Physician|Provider|Doctor'?s?) Orders?\b|^Prescription\b|^Referral\b",
+        "keywords": [r"^ORDER:", r"Order Date", r"Referring (?:Physician|Provider)", r"Referral for"],
+    },
+    "medical_necessity_letter": {
+        "label": "Medical necessity letter",
+        "title": r"^(?:Letter of )?Medical Necessity(?: Letter)?\b",
+        "keywords": [r"medical(?:ly)? necess", r"failed conservative", r"To: Claims Review"],
+    },
+    "clinical_note": {
+        "label": "Clinical / procedure note",
+        "title": (
+            r"^(?:Operative|Procedure|Progress|Consult\w*|Clinical|Office|Visit|Discharge)\b[\w /&()-]*\b"
+            r"(?:Note|Report|Summary)\b|^History and Physical\b"
+        ),
+        "keywords": [
+            r"^Subjective:", r"^Objective:", r"^Assessment", r"^Plan:", r"Chief Complaint",
+            r"History of Present Illness", r"Physical Exam", r"Indication:"
+        ],
+    },
+    "billing_record": {
+        "label": "Itemized bill / coding sheet",
+        "title": r"^Itemized (?:Invoice|Bill|Statement)\b|^Superbill\b|^Invoice\b|Coding Sheet\b|^CPT\s*/\s*ICD",
+        "keywords": [r"CPT Code", r"ICD-?10 Code", r"^\s*Units\b", r"Itemized Charges", r"Tax ID"],
+    },
+    "insurance_card": {
+        "label": "Insurance card",
+        "title": r"^(?:.*\()?(?:Sample )?Member ID Card\b|^Insurance Card\b",
+        "keywords": [r"Member ID", r"Group Number", r"Copay", r"Payer ID", r"Member Services", r"Provider Services"],
+    },
+    "payer_policy": {
+        "label": "Payer coverage policy",
+        "title": r"^(?:Payer|Medical|Coverage|Clinical) Policy\b|^Policy Summary\b|^(?:Local|National) Coverage Determination\b",
+        "keywords": [r"medically necessary", r"^\s*-?\s*Coverage:", r"^\s*-?\s*Requirements:", r"\b(?:NCD|LCD)\b", r"Effective"],
+    },
+}
+
+OTHER_TYPE = "other"
+OTHER_LABEL = "Other document"
+
+# Page footers like "Page 2 of 5" / "Page 2"; a reset to 1 starts a new document
+PAGE_NUMBER_PATTERN = re.compile(r"^\s*Page\s+(\d+)(?:\s+of\s+(\d+))?\s*$", re.IGNORECASE | re.MULTILINE)
+
+# Keyword hits an untitled page needs before its type counts as a boundary signal
+MIN_KEYWORD_SCORE = 2
+
+PACKET_SEGMENTS = registry.counter(
+    "claimsai_packet_segments_total",
+    "Documents analyzed separately from multi-document claim packets, by document type",
+    ("document_type",)
+)
+
+_TITLE_PATTERNS = {
+    name: re.compile(rule["title"], re.IGNORECASE) for name, rule in SEGMENT_TYPE_RULES.items()
+}
+_KEYWORD_PATTERNS = {
+    name: [re.compile(keyword, re.IGNORECASE | re.MULTILINE) for keyword in rule["keywords"]]
+    for name, rule in SEGMENT_TYPE_RULES.items()
+}
+
+
+def segment_label(document_type: str) -> str:
+    return SEGMENT_TYPE_RULES.get(document_type, {}).get("label", OTHER_LABEL)
+
+
+def classify_text(text: str, min_score: int = 1) -> Optional[str]:
+    """Document type with the most keyword hits (None below min_score)"""
+    best_type, best_score = None, 0
+    for name, patterns in _KEYWORD_PATTERNS.items():
+        score = sum(1 for pattern in patterns if pattern.search(text))
+        if score > best_score:
+            best_type, best_score = name, score
+    return best_type if best_score >= min_score else None
+
+
+class PacketSegmenter:
+    """
+    Split a claim packet (claim form plus supporting records in one PDF) into
+    its documents from page text features: form headers/document titles at the
+    top of a page, page-number resets and letterhead changes. Pages without
+    any boundary signal continue the current document.
+    """
+
+    def __init__(self, header_lines: int = 6):
+        self.header_lines = header_lines
+
+    def page_features(self, page_text: str) -> Dict[str, Any]:
+        lines = [line.strip() for line in page_text.splitlines() if line.strip()]
+        header = lines[:self.header_lines]
+        title_type = next(
+            (name for line in header for name, pattern in _TITLE_PATTERNS.items() if pattern.search(line)),
+            None
+        )
+        page_match = PAGE_NUMBER_PATTERN.search(page_text)
+        return {
+            "letterhead": " ".join(lines[0].lower().split()) if lines else "",
+            "title_type": title_type,
+            "keyword_type": classify_text(page_text, MIN_KEYWORD_SCORE),
+            "page_number": int(page_match.group(1)) if page_match else None
+        }
+
+    def segment(self, pages: Iterable) -> List[Dict[str, Any]]:
+        """Segment (page_number, page_text) pairs; see iter_segments"""
+        return list(self.iter_segments(pages))
+
+    def iter_segments(self, pages: Iterable) -> Iterator[Dict[str, Any]]:
+        """
+        Yield each document as soon as the page after it starts a new one, so
+        callers can analyze the first documents while later pages still extract.
+        Segments: {"index", "document_type", "label", "start_page", "end_page",
+        "pages": [(page_number, text)], "text", "boundary"}
+        """
+        current = None
+        index = 0
+        for page_number, page_text in pages:
+            if not page_text or not page_text.strip():
+                if current is not None:
+                    current["pages"].append((page_number, page_text or ""))
+                continue
+
+            features = self.page_features(page_text)
+            boundary = "first_page" if current is None else self._boundary(current, features)
+            if boundary:
+                if current is not None:
+                    yield self._close(current)
+                    index += 1
+                current = {
+                    "index": index,
+                    "boundary": boundary,
+                    "provisional_type": features["title_type"] or features["keyword_type"],
+                    "titled": features["title_type"] is not None,
+                    "letterhead": features["letterhead"],
+                    "pages": []
+                }
+            elif current["provisional_type"] is None:
+                current["provisional_type"] = features["title_type"] or features["keyword_type"]
+            current["pages"].append((page_number, page_text))
+            current["last_page_label"] = features["page_number"]
+
+        if current is not None:
+            yield self._close(current)
+
+    @staticmethod
+    def _boundary(current: Dict[str, Any], features: Dict[str, Any]) -> Optional[str]:
+        """Reason the page starts a new document, or None when it continues the current one"""
+        page_label = features["page_number"]
+        previous_label = current.get("last_page_label")
+        if page_label is not None and previous_label is not None and page_label == previous_label + 1:
+            return None  # numbered continuation
+        if page_label == 1:
+            return "page_number_reset"
+        current_type = current["provisional_type"]
+        if features["title_type"] and (features["title_type"] != current_type or current["titled"] is False):
+            return "form_header"
+        page_type = features["keyword_type"]
+        if (page_type and current_type and page_type != current_type
+                and features["letterhead"] != current["letterhead"]):
+            return "letterhead"
+        return None
+
+    @staticmethod
+    def _close(current: Dict[str, Any]) -> Dict[str, Any]:
+        text = ("\n" + PAGE_BREAK).join(text for _, text in current["pages"] if text.strip())
+        document_type = current["provisional_type"] or classify_text(text) or OTHER_TYPE
+        return {
+            "index": current["index"],
+            "document_type": document_type,
+            "label": segment_label(document_type),
+            "start_page": current["pages"][0][0],
+            "end_page": current["pages"][-1][0],
+            "pages": current["pages"],
+            "text": text,
+            "boundary": current["boundary"]
+        }
@@ -0,0 +1,166 @@
+import os
+import time
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Any, Iterator, Tuple
+
+import PyPDF2
+
+from .metrics import STAGE_ERRORS, observe_stage
+
+# Pages handed to one worker process per task; small enough that early pages
+# come back quickly, large enough to amortize re-opening the PDF in the worker
+PAGES_PER_TASK = int(os.getenv('PDF_PAGES_PER_TASK', '4'))
+PDF_WORKERS = int(os.getenv('PDF_EXTRACT_WORKERS', str(max(1, (os.cpu_count() or 2) - 1))))
+
+# Pages with fewer non-whitespace characters than this have no usable text layer
+MIN_TEXT_LAYER_CHARS = int(os.getenv('PDF_MIN_TEXT_LAYER_CHARS', '20'))
+
+
+def _page_images(page) -> List[bytes]:
+    """Encoded images embedded in a page (the scan itself for image-only pages)"""
+    try:
+        return [image.data for image in page.images]
+    except Exception:
+        return []
+
+
+def _extract_page_range(file_path: str, start: int, end: int) -> List[Tuple[int, str, float, List[bytes]]]:
+    """
+    Worker: extract text for pages [start, end) and time each page.
+    Pages without a text layer also return their embedded images for OCR.
+    """
+    pages = []
+    with open(file_path, 'rb') as file:
+        reader = PyPDF2.PdfReader(file)
+        for index in range(start, min(end, len(reader.pages))):
+            page_start = time.perf_counter()
+            page = reader.pages[index]
+            text = page.extract_text() or ""
+            images = _page_images(page) if len("".join(text.split())) < MIN_TEXT_LAYER_CHARS else []
+            pages.append((index + 1, text, time.perf_counter() - page_start, images))
+    return pages
+
+
+class PDFTextExtractor:
+    """
+    Page-parallel, hybrid PDF text extraction
+
+    Page ranges are extracted in a shared process pool and yielded in page
+    order as soon as each range finishes, so callers can start analyzing the
+    first pages while the rest of the document is still being extracted.
+    Pages without a text layer (scans) are sent to the OCR pool; digital
+    pages never touch OCR. Each page records where its text came from.
+    """
+
+    _pool = None
+    _pool_lock = threading.Lock()
+
+    def __init__(self, max_workers: int = PDF_WORKERS, pages_per_task: int = PAGES_PER_TASK,
+                 ocr_engine=None):
+        self.max_workers = max_workers
+        self.pages_per_task = max(1, pages_per_task)
+        self.ocr_engine = ocr_engine
+
+    @classmethod
+    def _get_pool(cls, max_workers: int) -> ProcessPoolExecutor:
+        """Lazily create one process pool shared by all requests"""
+        with cls._pool_lock:
+            if cls._pool is None:
+                cls._pool = ProcessPoolExecutor(max_workers=max_workers)
+            return cls._pool
+
+    def page_count(self, file_path: str) -> int:
+        with open(file_path, 'rb') as file:
+            return len(PyPDF2.PdfReader(file).pages)
+
+    def _iter_raw_pages(self, file_path: str) -> Iterator[Tuple[int, str, float, List[bytes]]]:
+        total_pages = self.page_count(file_path)
+
+        # Not worth the inter-process round trip for short documents
+        if total_pages <= self.pages_per_task or self.max_workers <= 1:
+            yield from _extract_page_range(file_path, 0, total_pages)
+            return
+
+        pool = self._get_pool(self.max_workers)
+        futures = [
+            pool.submit(_extract_page_range, file_path, start, start + self.pages_per_task)
+            for start in range(0, total_pages, self.pages_per_task)
+        ]
+        try:
+            for future in futures:
+                yield from future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def iter_pages(self, file_path: str) -> Iterator[Dict[str, Any]]:
+        """
+        Yield {"page_number", "text", "seconds", "source"} for each page, in page order.
+        source is "text_layer", "ocr", "ocr_failed" or "empty".
+        """
+        # OCR jobs run in the background while later pages are still being extracted
+        pending = deque()
+        for page_number, text, seconds, images in self._iter_raw_pages(file_path):
+            page = {"page_number": page_number, "text": text, "seconds": seconds, "source": "text_layer"}
+            future = None
+            if images and self.ocr_engine is not None:
+                future = self.ocr_engine.submit_page_images(images)
+            elif not text.strip():
+                page["source"] = "empty"
+            pending.append((page, future))
+
+            while pending and (pending[0][1] is None or pending[0][1].done()):
+                yield self._resolve(*pending.popleft())
+
+        while pending:
+            yield self._resolve(*pending.popleft())
+
+    @staticmethod
+    def _resolve(page: Dict[str, Any], future) -> Dict[str, Any]:
+        """Merge a finished OCR job into its page record"""
+        if future is None:
+            return page
+        try:
+            ocr_result = future.result()
+            ocr_text = ocr_result["text"]
+            # Keep whatever sparse text layer there was (e.g. a stamped header) ahead of the OCR text
+            page["text"] = f"{page['text'].strip()}\n{ocr_text}".strip() if page["text"].strip() else ocr_text
+            page["seconds"] += ocr_result["seconds"]
+            page["source"] = "ocr"
+            page["ocr_cached"] = ocr_result.get("cached", False)
+            if not page["ocr_cached"]:
+                observe_stage("ocr", ocr_result["seconds"])
+        except Exception as e:
+            STAGE_ERRORS.inc(stage="ocr")
+            page["source"] = "ocr_failed"
+            page["error"] = str(e)
+        return page
+
+    def extract(self, file_path: str, page_separator: str = "\n") -> Dict[str, Any]:
+        """
+        Extract the full document, joining pages once at the end
+        """
+        start = time.perf_counter()
+        pages = list(self.iter_pages(file_path))
+        return {
+            "text": page_separator.join(page["text"] for page in pages),
+            "pages": [self.page_timing(page) for page in pages],
+            "total_seconds": round(time.perf_counter() - start, 4)
+        }
+
+    @staticmethod
+    def page_timing(page: Dict[str, Any]) -> Dict[str, Any]:
+        """Per-page metadata (timing and provenance) without the text itself"""
+        timing = {
+            "page_number": page["page_number"],
+            "chars": len(page["text"]),
+            "seconds": round(page["seconds"], 4),
+            "source": page.get("source", "text_layer")
+        }
+        if "ocr_cached" in page:
+            timing["ocr_cached"] = page["ocr_cached"]
+        if "error" in page:
+            timing["error"] = page["error"]
+        return timing
@@ -26,16 +26,10 @@ Your expertise includes:
 """
 
 # Main analysis prompt template
+# Static instructions come first and per-request values last, so the long shared
+# prefix is identical across calls and can be served from the provider's prompt cache.
 CLAIMS_ANALYSIS_PROMPT_TEMPLATE = """
-Analyze this insurance claim document and make a coverage decision with detailed reasoning.
-
-DOCUMENT TO ANALYZE:
-{document_text}
-
-CLAIM TYPE: {claim_type}
-
-REFERENCE STANDARDS:
-{reference_document}
+Analyze the insurance claim document at the end of this prompt and make a coverage decision with detailed reasoning.
 
 Return JSON with these exact fields:
 - overall_status: "APPROVED", "DENIED", or "NEEDS_REVIEW"
@@ -84,14 +78,75 @@ NEEDS_REVIEW - Flag for manual review when:
 
 Analyze this claim as if making a real coverage decision that affects both patient care and company liability. 
 Be thorough, fair, and follow industry best practices.
+
+REFERENCE STANDARDS:
+{reference_document}
+
+CLAIM TYPE: {claim_type}
+
+DOCUMENT TO ANALYZE:
+{document_text}
+"""
+
+# Prepended to each part when a long document is analyzed in chunks
+CHUNK_CONTEXT_NOTE = """[PART {part} - PAGES {start_page}-{end_page}]
+This is one part of a longer claim document. Extract only what appears in this part;
+leave fields you cannot see here empty instead of guessing.
+
+"""
+
+# Prepended to each supporting record when a claim packet is analyzed document by document
+SUPPORTING_DOCUMENT_NOTE = """[SUPPORTING DOCUMENT {part} - {label}, PAGES {start_page}-{end_page}]
+This is a supporting record submitted with a claim, not the claim form itself. {focus}
+Put what this record documents in extracted_data. Do not list claim-form fields as missing just because
+this record does not repeat them. Set overall_status by whether the record supports the claim: APPROVED if it
+does, NEEDS_REVIEW if it is incomplete or inconsistent, DENIED only if it shows the service is not covered.
+
+"""
+
+# What to look for in each supporting record type (see utils/packet_segmenter.py)
+SUPPORTING_DOCUMENT_FOCUS = {
+    "prior_authorization": "Extract the authorization number, authorized procedure codes, dates and payer reference.",
+    "physician_order": "Extract the ordered procedure, indication, ordering/referring physician with NPI, and order date.",
+    "medical_necessity_letter": "Extract the diagnosis, failed prior treatments and the stated medical necessity rationale.",
+    "clinical_note": "Extract diagnoses, procedures performed, dates of service and documentation of medical necessity.",
+    "billing_record": "Extract each billed line (date, CPT/HCPCS code, units, charge) and the diagnosis codes.",
+    "insurance_card": "Extract the member ID, group number, plan name and payer ID.",
+    "payer_policy": "Extract the coverage criteria and prior authorization requirements that apply to this claim.",
+    "other": "Extract any information relevant to the claim."
+}
+
+# Targeted extraction of the few form fields the rule-based extractor could not read confidently
+FIELD_EXTRACTION_PROMPT = """
+Extract only the requested fields from the {document_description} text below.
+Return a JSON object with exactly these keys. Use null for any field that does not
+appear in the document - do not guess. Dates as YYYY-MM-DD, amounts as numbers.
+
+FIELDS:
+{fields}
+
+DOCUMENT:
+{document_text}
+"""
+
+# Re-ask for only the analysis fields that failed schema validation
+ANALYSIS_REASK_PROMPT = """
+Your previous analysis of the claim document below was valid except for these fields.
+Re-extract only the listed fields and return a JSON object with exactly these keys.
+
+FIELDS:
+{fields}
+
+PREVIOUS ANALYSIS (valid fields):
+{previous_analysis}
+
+DOCUMENT:
+{document_text}
 """
 
 # Improvement suggestions prompt
 IMPROVEMENT_SUGGESTIONS_PROMPT = """
-Based on the analysis results, generate specific improvement suggestions for this claim document.
-
-ANALYSIS RESULTS:
-{analysis_results}
+Based on the analysis results below, generate specific improvement suggestions for this claim document.
 
 Provide detailed suggestions in these categories:
 1. Priority Fixes: Critical issues that must be addressed
@@ -99,23 +154,26 @@ Provide detailed suggestions in these categories:
 3. Template Recommendations: Suggestions for better documentation practices
 
 Format as JSON with structured recommendations.
+
+ANALYSIS RESULTS:
+{analysis_results}
 """
 
 # Document comparison prompt
 DOCUMENT_COMPARISON_PROMPT = """
-Compare this claim document against approved claim examples to determine best match and compliance level.
-
-DOCUMENT TO ANALYZE:
-{document_text}
-
-REFERENCE CLAIMS:
-{reference_claims}
+Compare the claim document below against the approved claim examples to determine best match and compliance level.
 
 Return a detailed comparison including:
 - best_match_type: The closest matching claim type
 - match_score: Similarity percentage (0-100)
 - compliance_gaps: Areas where the document differs from standards
 - recommendations: Specific steps to improve compliance
+
+REFERENCE CLAIMS:
+{reference_claims}
+
+DOCUMENT TO ANALYZE:
+{document_text}
 """
 
 # OCR fallback message
@@ -183,6 +241,19 @@ ERROR_RESPONSE_TEMPLATES = {
         "extracted_data": {},
         "confidence_level": 0,
         "processing_notes": "System error occurred during processing"
+    },
+    "llm_unavailable": {
+        "overall_status": "NEEDS_REVIEW",
+        "completeness_score": 0,
+        "missing_sections": ["AI analysis unavailable"],
+        "found_sections": [],
+        "data_quality_issues": [],
+        "validation_errors": [{"field": "llm", "error": "LLM provider degraded - analysis skipped", "expected_format": "manual_review"}],
+        "recommendations": ["Re-run AI analysis once the LLM provider has recovered", "Review the claim manually"],
+        "extracted_data": {},
+        "confidence_level": 0,
+        "processing_notes": "LLM provider is degraded (circuit open); claim queued for manual review",
+        "processing_method": "llm_unavailable"
     }
 }
 
@@ -201,6 +272,109 @@ LANGFLOW_CONFIG = {
     }
 }
 
+# Chunked (map-reduce) analysis for documents longer than a single prompt
+CHUNKED_ANALYSIS_CONFIG = {
+    "enabled": True,
+    "threshold_chars": 4000,      # documents above this size are chunked
+    "max_chunk_tokens": 1500,     # token budget for document text per chunk
+    "max_parallel_chunks": 4,     # concurrent LLM calls per document
+    "max_chunks": 12              # hard cap to keep latency bounded
+}
+
+# Multi-document packets: split into claim form + supporting records, analyzed in parallel
+PACKET_SEGMENTATION_CONFIG = {
+    "enabled": True,
+    "min_pages": 2,               # single-page uploads are never packets
+    "header_lines": 6,            # lines at the top of a page searched for a form header/title
+    "lookahead_pages": 4,         # pages checked for a boundary before streaming chunk analysis starts
+    "max_parallel_segments": 4,   # concurrent LLM calls per packet
+    "max_segments": 12            # documents beyond this are reported as skipped
+}
+
+# Rule-based CMS-1500 extraction; the LLM only fills fields the rules could not read confidently
+RULE_EXTRACTION_CONFIG = {
+    "enabled": True,
+    "min_field_confidence": 0.8,  # fields below this are re-extracted by the LLM
+    "max_llm_fields": 4,          # more doubtful fields than this -> full LLM analysis
+    "llm_field_confidence": 0.8,  # confidence recorded for LLM-filled fields
+    "required_fields": [
+        "patient_name", "patient_id", "date_of_birth", "policy_number", "service_date",
+        "provider_name", "provider_id", "diagnosis_code", "procedure_code", "billed_amount"
+    ]
+}
+
+# Tiered adjudication: deterministic rules, then a short field-extraction call, and the
+# full reasoning analysis only for claims that are ambiguous, high-value or fail a tier
+ADJUDICATION_CASCADE_CONFIG = {
+    "enabled": True,
+    "high_value_amount": 5000.0,         # billed amounts at or above this always get full analysis
+    "extraction_max_tokens": 300,        # output cap for the extraction tier's LLM call
+    "max_extraction_fields": 4,          # more unread required fields than this -> straight to full analysis
+    "escalate_on_flag": True,            # validator FLAG (medium issues) counts as ambiguous
+    "escalate_on_unknown_policy": False  # policy missing from the database -> full analysis
+}
+
+# Similar-claim index: hashed word n-grams of the document text plus structured claim fields
+SIMILARITY_INDEX_CONFIG = {
+    "ngram_range": (1, 2),        # word unigrams and bigrams
+    "max_text_chars": 20000,      # text beyond this adds little beyond the first pages
+    "text_weight": 0.6,           # share of the vector from document wording
+    "field_weight": 0.4,          # share from the structured fields below
+    "field_weights": {
+        "provider_id": 1.0,
+        "provider_name": 1.0,
+        "procedure_code": 1.0,
+        "diagnosis_code": 0.8,
+        "policy_number": 0.3,
+        "service_type": 0.3
+    },
+    # Code prefixes that group related procedures/diagnoses (e.g. CPT 992xx, ICD-10 M54)
+    "prefix_fields": {"procedure_code": 3, "diagnosis_code": 3},
+    "max_k": 50
+}
+
+# Reference block of the analysis prompt: the most similar approved claim of the same
+# type, summarized to its fields; the static examples are used until one exists
+REFERENCE_SELECTION_CONFIG = {
+    "enabled": True,
+    "min_similarity": 0.15,       # below this the static example is a better reference
+    "max_similarity": 0.995,      # the same document re-analyzed would only echo its own decision
+    "max_claims": 5000,           # most recently approved claims kept in the index
+    "max_key_factors": 3,         # approval reasons carried into the summary
+    "refresh_seconds": 600        # periodic rebuild; approvals trigger an immediate one
+}
+
+# Schema-enforced analysis output (see utils/analysis_schema.py)
+STRUCTURED_OUTPUT_CONFIG = {
+    # OpenAI JSON mode; strict json_schema cannot express the open-ended extracted_data object
+    "response_format": {"type": "json_object"},
+    "repair_json": True,          # fix fences, trailing commas and truncation locally before re-asking
+    "max_reask_attempts": 1       # targeted re-asks for invalid fields before falling back to defaults
+}
+
+# Prompt token budgets and compaction
+TOKEN_BUDGET_CONFIG = {
+    "model": "gpt-4o-mini",
+    "max_document_tokens": 1500,   # document text per call when not chunking (truncation)
+    "log_token_counts": True,
+    # The only analysis fields the suggestions prompt needs
+    "suggestion_input_fields": [
+        "overall_status", "completeness_score", "missing_sections", "validation_errors",
+        "data_quality_issues", "recommendations", "decision_reasoning"
+    ],
+    # Never useful to the model: bookkeeping added after analysis
+    "drop_fields": [
+        "raw_llm_response", "trace_id", "processing_method", "processing_notes",
+        "chunk_index", "chunked_analysis", "field_confidence", "field_sources", "output_repairs",
+        "packet_segments", "adjudication"
+    ],
+    # Lines dropped from document text before prompting (generator footers, disclaimers)
+    "boilerplate_patterns": [
+        r"^Generated:\s",
+        r"^Page \d+ of \d+$"
+    ]
+}
+
 # Opik tracing configuration
 OPIK_TRACE_CONFIG = {
     "project_name": "claimsai-document-analysis",
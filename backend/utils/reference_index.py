@@ -0,0 +1,143 @@
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from .prompt import REFERENCE_SELECTION_CONFIG
+from .similarity_index import ClaimVectorizer
+
+# Values the upload pipeline stores when a field could not be extracted
+PLACEHOLDER_VALUES = {"", "N/A", "NONE", "NULL", "DOC_UPLOAD"}
+
+
+def reference_claim_type(service_type: Optional[str]) -> str:
+    """Analysis claim type of a stored claim (uploads store it as service_type; submitted claims store a service)"""
+    service_type = (service_type or "").lower()
+    return "pharmacy_claim" if "pharmacy" in service_type else "medical_claim"
+
+
+def _known(value) -> Optional[str]:
+    if value is None or str(value).strip().upper() in PLACEHOLDER_VALUES:
+        return None
+    return str(value).strip()
+
+
+def summarize_approved_claim(claim: Dict[str, Any], claim_type: str) -> str:
+    """Compact field summary of an approved claim, used in place of a full example document"""
+    analysis = claim.get("analysis") or {}
+    extracted_data = analysis.get("extracted_data") or {}
+
+    provider = _known(claim.get("provider_name"))
+    provider_id = _known(claim.get("provider_id"))
+    if provider and provider_id:
+        provider = f"{provider} ({provider_id})"
+    amount = claim.get("amount_billed")
+    details = [
+        ("Provider", provider or provider_id),
+        ("Service date", _known(claim.get("service_date"))),
+        ("Diagnosis code", _known(claim.get("diagnosis_code"))),
+        ("Procedure code", _known(claim.get("procedure_code"))),
+        ("Billed amount", f"${float(amount):,.2f}" if amount else None),
+        ("Prior authorization", _known(extracted_data.get("prior_authorization"))),
+        ("Completeness", f"{analysis['completeness_score']}%" if analysis.get("completeness_score") is not None else None)
+    ]
+    label = claim_type.replace("_", " ").upper()
+    lines = [f"APPROVED {label} (reference claim {claim['claim_id']}):"]
+    lines.extend(f"- {name}: {value}" for name, value in details if value)
+    key_factors = (analysis.get("key_factors") or [])[:REFERENCE_SELECTION_CONFIG["max_key_factors"]]
+    if key_factors:
+        lines.append(f"- Approved because: {'; '.join(str(factor) for factor in key_factors)}")
+    return "\n".join(lines)
+
+
+class ApprovedClaimIndex:
+    """
+    Vectors and field summaries of approved claims, per claim type, used to pick
+    the analysis prompt's reference block. Built off the request path by a
+    background thread that rebuilds periodically and whenever a claim is approved;
+    select() only reads the current snapshot (one matrix-vector product, no LLM call).
+    """
+
+    def __init__(self):
+        self.vectorizer = ClaimVectorizer()
+        self._lock = threading.Lock()
+        self._by_type: Dict[str, Dict[str, Any]] = {}
+        self._refresh_requested = threading.Event()
+        self._thread = None
+        self.last_refreshed = None
+
+    def ensure_started(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='reference-index', daemon=True)
+                self._thread.start()
+
+    def request_refresh(self):
+        """Rebuild soon (e.g. after a claim was approved); repeated requests coalesce"""
+        self.ensure_started()
+        self._refresh_requested.set()
+
+    def _run(self):
+        while True:
+            self._refresh_requested.clear()
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"⚠️  Reference claim index refresh failed: {e}")
+            self._refresh_requested.wait(REFERENCE_SELECTION_CONFIG["refresh_seconds"])
+
+    def refresh(self):
+        from .database import DatabaseManager
+        claims = DatabaseManager().get_approved_reference_claims(REFERENCE_SELECTION_CONFIG["max_claims"])
+
+        grouped: Dict[str, List[Dict[str, Any]]] = {}
+        for claim in claims:
+            grouped.setdefault(reference_claim_type(claim.get("service_type")), []).append(claim)
+
+        by_type = {}
+        for claim_type, type_claims in grouped.items():
+            summaries = [summarize_approved_claim(claim, claim_type) for claim in type_claims]
+            # Text-only vectors, comparable with the incoming document before any field is extracted;
+            # claims submitted without a document are matched on their summary
+            by_type[claim_type] = {
+                "vectors": np.stack([
+                    self.vectorizer.vectorize(claim.get("extracted_text") or summary)
+                    for claim, summary in zip(type_claims, summaries)
+                ]),
+                "claim_ids": [claim["claim_id"] for claim in type_claims],
+                "summaries": summaries
+            }
+        with self._lock:
+            self._by_type = by_type
+            self.last_refreshed = datetime.now().isoformat()
+        print(f"✅ Reference claim index: {len(claims)} approved claims "
+              f"({', '.join(f'{t}: {len(c)}' for t, c in grouped.items()) or 'none'})")
+
+    def select(self, document_text: str, claim_type: str) -> Optional[Dict[str, Any]]:
+        """Most similar approved claim of this type: {"claim_id", "similarity", "summary"}, or None"""
+        with self._lock:
+            entry = self._by_type.get(claim_type)
+        if entry is None:
+            return None
+
+        scores = entry["vectors"] @ self.vectorizer.vectorize(document_text)
+        scores[scores >= REFERENCE_SELECTION_CONFIG["max_similarity"]] = -np.inf
+        best = int(np.argmax(scores))
+        if not scores[best] >= REFERENCE_SELECTION_CONFIG["min_similarity"]:
+            return None
+        return {
+            "claim_id": entry["claim_ids"][best],
+            "similarity": round(float(scores[best]), 4),
+            "summary": entry["summaries"][best]
+        }
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "claims": {claim_type: len(entry["claim_ids"]) for claim_type, entry in self._by_type.items()},
+                "last_refreshed": self.last_refreshed
+            }
+
+
+approved_claim_index = ApprovedClaimIndex()
@@ -0,0 +1,359 @@
+import os
+import re
+import json
+import math
+import threading
+import time
+import zlib
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+    FILE_LOCKS_AVAILABLE = True
+except ImportError:  # Windows: writers are serialized within one process only
+    FILE_LOCKS_AVAILABLE = False
+
+from .prompt import SIMILARITY_INDEX_CONFIG
+
+# On-disk similar-claim index (overridable from .env)
+SIMILARITY_INDEX_DIR = os.getenv(
+    'SIMILARITY_INDEX_DIR', os.path.join(os.path.dirname(__file__), '..', 'database', 'similarity_index')
+)
+# Search cost is linear in rows x dim: ~120 ms per query at 1M rows and dim 256 on one
+# core, ~230 ms at dim 512 (benchmark_similarity_index.py); changing it rebuilds the index
+SIMILARITY_INDEX_DIM = int(os.getenv('SIMILARITY_INDEX_DIM', '256'))
+# Rows scored per matrix-vector product; bounds scratch memory on very large indexes
+SIMILARITY_SCAN_ROWS = int(os.getenv('SIMILARITY_SCAN_ROWS', '262144'))
+
+INDEX_FORMAT_VERSION = 1
+INITIAL_CAPACITY = 1024
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9.\-/]*[a-z0-9]|[a-z]")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or the to was were with this that "
+    "page date name no yes".split()
+)
+
+
+def _hash_feature(feature: str, dim: int) -> Tuple[int, float]:
+    """Bucket and sign of a feature (signed hashing keeps collisions unbiased)"""
+    h = zlib.crc32(feature.encode("utf-8"))
+    return h % dim, 1.0 if h & 0x80000000 else -1.0
+
+
+def _normalized(vector: np.ndarray) -> np.ndarray:
+    norm = float(np.linalg.norm(vector))
+    return vector / norm if norm > 0 else vector
+
+
+class ClaimVectorizer:
+    """
+    Fixed-size vectors from claim text and structured fields. Hashed n-grams need
+    no vocabulary or IDF statistics, so a vector never changes once computed and
+    the index can grow one claim at a time.
+    """
+
+    def __init__(self, dim: int = SIMILARITY_INDEX_DIM, config: Dict[str, Any] = SIMILARITY_INDEX_CONFIG):
+        self.dim = dim
+        self.config = config
+
+    def text_features(self, text: str) -> Counter:
+        tokens = [
+            token for token in TOKEN_PATTERN.findall((text or "")[:self.config["max_text_chars"]].lower())
+            if token not in STOPWORDS
+        ]
+        low, high = self.config["ngram_range"]
+        features = Counter()
+        for n in range(low, high + 1):
+            for i in range(len(tokens) - n + 1):
+                features[" ".join(tokens[i:i + n])] += 1
+        return features
+
+    def field_features(self, fields: Dict[str, Any]) -> Dict[str, float]:
+        features = {}
+        for name, weight in self.config["field_weights"].items():
+            value = str(fields.get(name) or "").strip().upper()
+            if not value or value in ("N/A", "NONE", "NULL", "DOC_UPLOAD"):
+                continue
+            features[f"{name}={value}"] = weight
+            prefix = self.config["prefix_fields"].get(name)
+            if prefix and len(value) > prefix:
+                features[f"{name}~{value[:prefix]}"] = weight / 2
+        return features
+
+    def vectorize(self, text: str, fields: Optional[Dict[str, Any]] = None) -> np.ndarray:
+        text_vector = np.zeros(self.dim, dtype=np.float32)
+        for feature, count in self.text_features(text).items():
+            bucket, sign = _hash_feature(f"t:{feature}", self.dim)
+            text_vector[bucket] += sign * (1.0 + math.log(count))  # sublinear term frequency
+
+        field_vector = np.zeros(self.dim, dtype=np.float32)
+        for feature, weight in self.field_features(fields or {}).items():
+            bucket, sign = _hash_feature(f"f:{feature}", self.dim)
+            field_vector[bucket] += sign * weight
+
+        # Text and fields are normalized separately so long documents don't drown the fields
+        combined = (self.config["text_weight"] * _normalized(text_vector)
+                    + self.config["field_weight"] * _normalized(field_vector))
+        return _normalized(combined).astype(np.float32)
+
+
+class SimilarityIndex:
+    """
+    Nearest-neighbour index over claim documents, persisted as memory-mapped
+    float32 vectors (vectors.f32) with their document ids (doc_ids.i64) and a small
+    meta.json holding the row count. Vectors are unit length, so cosine similarity
+    is one matrix-vector product over the mapped rows; the OS pages vectors in on
+    demand and shares them between processes. Search is exact and memory-bandwidth
+    bound (about 1 GB of vectors per million claims at dim 256); approximate search
+    (IVF/HNSW) is out of scope while an exact scan stays within the latency budget.
+    """
+
+    def __init__(self, directory: str = SIMILARITY_INDEX_DIR, dim: int = SIMILARITY_INDEX_DIM):
+        self.directory = directory
+        self.dim = dim
+        self.vectorizer = ClaimVectorizer(dim)
+        self._lock = threading.RLock()
+        self._vectors_path = os.path.join(directory, 'vectors.f32')
+        self._ids_path = os.path.join(directory, 'doc_ids.i64')
+        self._meta_path = os.path.join(directory, 'meta.json')
+        self._lock_path = os.path.join(directory, 'index.lock')
+        self._meta_mtime = None
+        self.count = 0
+        self.capacity = 0
+        self.backfilling = False
+        self._rows: Dict[int, int] = {}
+        self._load()
+
+    def _load(self):
+        os.makedirs(self.directory, exist_ok=True)
+        meta = None
+        if os.path.exists(self._meta_path):
+            meta = self._read_meta()
+            if meta.get('dim') != self.dim or meta.get('version') != INDEX_FORMAT_VERSION:
+                print(f"⚠️  Similarity index at {self.directory} has a different layout - rebuilding")
+                meta = None
+        self.count = meta['count'] if meta else 0
+        self._open(max(self.count, INITIAL_CAPACITY), reset=meta is None)
+        self._rows = {int(doc_id): row for row, doc_id in enumerate(self._doc_ids[:self.count])}
+
+    def _read_meta(self) -> Dict[str, Any]:
+        self._meta_mtime = os.stat(self._meta_path).st_mtime_ns
+        with open(self._meta_path) as f:
+            return json.load(f)
+
+    def _refresh(self):
+        """Pick up rows another process appended since this one last looked (caller holds _lock)"""
+        if not os.path.exists(self._meta_path) or os.stat(self._meta_path).st_mtime_ns == self._meta_mtime:
+            return
+        count = self._read_meta()['count']
+        if count < self.count:
+            self._load()  # rebuilt elsewhere
+            return
+        if count > self.capacity:
+            self._open(count)
+        for row in range(self.count, count):
+            self._rows[int(self._doc_ids[row])] = row
+        self.count = count
+
+    @contextmanager
+    def _writer(self):
+        """Exclusive writer across threads and (where supported) processes"""
+        with self._lock:
+            if not FILE_LOCKS_AVAILABLE:
+                yield
+                return
+            with open(self._lock_path, 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    self._refresh()
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _open(self, capacity: int, reset: bool = False):
+        """(Re)map the vector and id files, growing them to hold capacity rows"""
+        for path, itemsize in ((self._vectors_path, 4 * self.dim), (self._ids_path, 8)):
+            mode = 'w+b' if reset or not os.path.exists(path) else 'r+b'
+            with open(path, mode) as f:
+                f.seek(0, os.SEEK_END)
+                if f.tell() < capacity * itemsize:
+                    f.truncate(capacity * itemsize)
+        self.capacity = capacity
+        self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode='r+', shape=(capacity, self.dim))
+        self._doc_ids = np.memmap(self._ids_path, dtype=np.int64, mode='r+', shape=(capacity,))
+
+    def _write_meta(self):
+        tmp_path = f"{self._meta_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'version': INDEX_FORMAT_VERSION, 'dim': self.dim, 'count': self.count}, f)
+        os.replace(tmp_path, self._meta_path)
+        self._meta_mtime = os.stat(self._meta_path).st_mtime_ns
+
+    def add_document(self, document_id: int, text: str, fields: Optional[Dict[str, Any]] = None):
+        """Index (or re-index) one document"""
+        self.add_documents([(document_id, text, fields)])
+
+    def add_documents(self, documents: Iterable[Tuple[int, str, Optional[Dict[str, Any]]]]):
+        vectors = [(int(document_id), self.vectorizer.vectorize(text, fields)) for document_id, text, fields in documents]
+        if not vectors:
+            return
+        with self._writer():
+            needed = self.count + len(vectors)
+            if needed > self.capacity:
+                self._vectors.flush()
+                self._doc_ids.flush()
+                self._open(max(needed, self.capacity * 2))
+            for document_id, vector in vectors:
+                row = self._rows.get(document_id)
+                if row is None:
+                    row = self.count
+                    self._rows[document_id] = row
+                    self._doc_ids[row] = document_id
+                    self.count += 1
+                self._vectors[row] = vector
+            # Rows are visible to readers once the count that covers them is published
+            self._write_meta()
+
+    def vector_for(self, document_ids: Iterable[int]) -> Optional[np.ndarray]:
+        """Mean vector of already indexed documents (None if none are indexed)"""
+        with self._lock:
+            self._refresh()
+            rows = [self._rows[int(doc_id)] for doc_id in document_ids if int(doc_id) in self._rows]
+            if not rows:
+                return None
+            return _normalized(np.asarray(self._vectors[rows]).mean(axis=0))
+
+    def search(self, vector: np.ndarray, k: int = 10,
+               exclude_document_ids: Iterable[int] = ()) -> List[Tuple[int, float]]:
+        """Top-k (document_id, cosine similarity) by blocked exact scan of the mapped vectors"""
+        with self._lock:
+            self._refresh()
+            count = self.count
+            vectors, doc_ids = self._vectors, self._doc_ids
+            excluded_rows = [self._rows[int(doc_id)] for doc_id in exclude_document_ids if int(doc_id) in self._rows]
+        if count == 0 or k <= 0:
+            return []
+
+        query = np.asarray(vector, dtype=np.float32)
+        best_scores = np.empty(0, dtype=np.float32)
+        best_rows = np.empty(0, dtype=np.int64)
+        for start in range(0, count, SIMILARITY_SCAN_ROWS):
+            end = min(start + SIMILARITY_SCAN_ROWS, count)
+            scores = vectors[start:end] @ query
+            for row in excluded_rows:
+                if start <= row < end:
+                    scores[row - start] = -np.inf
+            take = min(k, end - start)
+            top = np.argpartition(-scores, take - 1)[:take]
+            best_scores = np.concatenate([best_scores, scores[top]])
+            best_rows = np.concatenate([best_rows, top + start])
+            if len(best_scores) > k:
+                keep = np.argpartition(-best_scores, k - 1)[:k]
+                best_scores, best_rows = best_scores[keep], best_rows[keep]
+
+        order = np.argsort(-best_scores)
+        return [
+            (int(doc_ids[best_rows[i]]), float(best_scores[i]))
+            for i in order if np.isfinite(best_scores[i])
+        ]
+
+    def backfill(self, db, batch_size: int = 500):
+        """Index documents saved before the index existed (or after a layout change)"""
+        self.backfilling = True
+        try:
+            after_id = 0
+            while True:
+                batch = db.get_documents_for_indexing(after_id, batch_size)
+                if not batch:
+                    break
+                self.add_documents(
+                    (document['id'], document.get('extracted_text') or '', document)
+                    for document in batch if document['id'] not in self._rows
+                )
+                after_id = batch[-1]['id']
+            print(f"✅ Similarity index ready: {self.count} documents")
+        except Exception as e:
+            print(f"⚠️  Similarity index backfill failed: {e}")
+        finally:
+            self.backfilling = False
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            'documents': self.count,
+            'dim': self.dim,
+            'backfilling': self.backfilling,
+            'size_bytes': self.capacity * (4 * self.dim + 8)
+        }
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_similarity_index() -> SimilarityIndex:
+    """Process-wide index; an empty index is backfilled from the database in the background"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = SimilarityIndex()
+            if _index.count == 0:
+                from .database import DatabaseManager
+                _index.backfilling = True
+                threading.Thread(target=_index.backfill, args=(DatabaseManager(),),
+                                 name='similarity-backfill', daemon=True).start()
+        return _index
+
+
+# Nearest documents fetched per requested claim (several hits may belong to one claim)
+CANDIDATES_PER_RESULT = 3
+MATCH_FIELDS = ("provider_id", "provider_name", "procedure_code", "diagnosis_code", "service_type")
+
+
+def find_similar_claims(db, claim_id: str, k: int = 10) -> Optional[Dict[str, Any]]:
+    """Claims most similar to claim_id, best first; None if the claim does not exist"""
+    claim = db.get_claim(claim_id)
+    if not claim:
+        return None
+    index = get_similarity_index()
+    k = max(1, min(k, SIMILARITY_INDEX_CONFIG["max_k"]))
+
+    document_ids = db.get_claim_document_ids(claim_id)
+    vector = index.vector_for(document_ids)
+    query_source = 'documents'
+    if vector is None:
+        # Submitted without documents (or not indexed yet): match on its structured fields
+        vector = index.vectorizer.vectorize('', claim)
+        query_source = 'fields'
+
+    start = time.perf_counter()
+    hits = index.search(vector, k * CANDIDATES_PER_RESULT, exclude_document_ids=document_ids)
+    search_ms = (time.perf_counter() - start) * 1000
+
+    summaries = db.get_document_claims([document_id for document_id, _ in hits])
+    similar, seen = [], {claim_id}
+    for document_id, score in hits:
+        summary = summaries.get(document_id)
+        if not summary or summary['claim_id'] in seen:
+            continue
+        seen.add(summary['claim_id'])
+        summary['similarity'] = round(score, 4)
+        summary['matched_fields'] = [
+            name for name in MATCH_FIELDS
+            if claim.get(name) and str(claim[name]).strip().upper() == str(summary.get(name) or '').strip().upper()
+            and str(claim[name]).strip().upper() not in ('N/A', 'DOC_UPLOAD')
+        ]
+        similar.append(summary)
+        if len(similar) == k:
+            break
+
+    return {
+        'claim_id': claim_id,
+        'similar': similar,
+        'query': {'source': query_source, 'search_ms': round(search_ms, 2)},
+        'index': index.status()
+    }
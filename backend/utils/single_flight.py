@@ -0,0 +1,124 @@
+import os
+import hashlib
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from .metrics import registry
+
+# How long a duplicate request waits for the identical in-flight analysis (overridable from .env)
+SINGLE_FLIGHT_WAIT_SECONDS = float(os.getenv('SINGLE_FLIGHT_WAIT_SECONDS', '600'))
+
+SINGLE_FLIGHT_CALLS = registry.counter(
+    "claimsai_single_flight_total",
+    "Coalesced work by role: leader ran it, shared waited for the leader, rejected hit a busy guard",
+    ("group", "role")
+)
+
+
+class LeaderAbandonedError(Exception):
+    """The leading call stopped without a result (e.g. its SSE client disconnected)"""
+
+
+class FlightTimeoutError(Exception):
+    """A duplicate request gave up waiting for the in-flight call"""
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    In-process call coalescing: while a call for a key is running, identical
+    calls wait for its result instead of starting their own.
+    Only covers this process - separate server workers each run their own leader.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+
+    def begin(self, key: str) -> Tuple[_Call, bool]:
+        """Join the call for key; returns (call, is_leader). The leader must call finish()"""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                SINGLE_FLIGHT_CALLS.inc(group=self.name, role="shared")
+                return call, False
+            call = self._calls[key] = _Call()
+        SINGLE_FLIGHT_CALLS.inc(group=self.name, role="leader")
+        return call, True
+
+    def finish(self, key: str, call: _Call, result: Any = None, error: Optional[BaseException] = None):
+        """Publish the leader's outcome to every waiter (only the first finish counts)"""
+        with self._lock:
+            if call.done.is_set():
+                return
+            if self._calls.get(key) is call:
+                del self._calls[key]
+            call.result = result
+            call.error = error
+            call.done.set()
+
+    @staticmethod
+    def wait(call: _Call, timeout: float = SINGLE_FLIGHT_WAIT_SECONDS) -> Any:
+        """Block until the leader finishes; re-raises the leader's error"""
+        if not call.done.wait(timeout):
+            raise FlightTimeoutError(f"Timed out after {timeout:.0f}s waiting for an identical request in flight")
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+
+class InFlightGuard:
+    """Non-blocking per-key guard: a second caller is told the key is busy instead of waiting"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._held = set()
+
+    def try_acquire(self, key: str) -> bool:
+        with self._lock:
+            if key in self._held:
+                SINGLE_FLIGHT_CALLS.inc(group=self.name, role="rejected")
+                return False
+            self._held.add(key)
+        SINGLE_FLIGHT_CALLS.inc(group=self.name, role="leader")
+        return True
+
+    def release(self, key: str):
+        with self._lock:
+            self._held.discard(key)
+
+
+def file_sha256(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Content hash of a stored file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(chunk_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def text_sha256(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+# Identical documents (content hash + claim type) analyzed once at a time
+document_flights = SingleFlight("document_analysis")
+# One AI processing run per claim at a time
+claim_guard = InFlightGuard("claim_ai_process")
+
+registry.gauge_callback(
+    "claimsai_single_flight_in_flight", "Distinct analyses currently coalescing duplicate requests", (),
+    lambda: {(): document_flights.in_flight()}
+)
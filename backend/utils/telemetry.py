@@ -0,0 +1,480 @@
+import os
+import json
+import time
+import hashlib
+import uuid
+import atexit
+import random
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from functools import wraps
+from typing import Dict, Any, List, Optional
+
+from .prompt import OPIK_TRACE_CONFIG
+
+# LangChain callback base class; without LangChain only the decorator is usable
+try:
+    from langchain_core.callbacks import BaseCallbackHandler
+except ImportError:
+    BaseCallbackHandler = object
+
+# Telemetry configuration (overridable from .env)
+TELEMETRY_ENABLED = os.getenv('TELEMETRY_ENABLED', 'true').lower() == 'true'
+TELEMETRY_SAMPLE_RATE = float(os.getenv('TELEMETRY_SAMPLE_RATE', '1.0'))
+# Per-endpoint head sampling, e.g. "claims.upload_claim_documents_batch=0.1,job:document_analysis=0.5"
+TELEMETRY_ENDPOINT_SAMPLE_RATES = os.getenv('TELEMETRY_ENDPOINT_SAMPLE_RATES', '')
+TELEMETRY_BUFFER_SIZE = int(os.getenv('TELEMETRY_BUFFER_SIZE', '1000'))
+TELEMETRY_FLUSH_INTERVAL = float(os.getenv('TELEMETRY_FLUSH_INTERVAL', '2.0'))
+TELEMETRY_EXPORT_TIMEOUT = int(os.getenv('TELEMETRY_EXPORT_TIMEOUT', '10'))
+TELEMETRY_SPOOL_DIR = os.getenv(
+    'TELEMETRY_SPOOL_DIR', os.path.join(os.path.dirname(__file__), '..', 'telemetry_spool')
+)
+TELEMETRY_SPOOL_MAX_MB = float(os.getenv('TELEMETRY_SPOOL_MAX_MB', '50'))
+TELEMETRY_MAX_FIELD_CHARS = int(os.getenv('TELEMETRY_MAX_FIELD_CHARS', '2000'))
+# Spooled traces are plaintext on local disk: keep only the shape of inputs/outputs
+# (keys, numbers, string lengths and hashes), not claim text. Set false to spool as exported.
+TELEMETRY_SPOOL_REDACT = os.getenv('TELEMETRY_SPOOL_REDACT', 'true').lower() == 'true'
+
+_sampled = contextvars.ContextVar("telemetry_sampled", default=None)
+_endpoint = contextvars.ContextVar("telemetry_endpoint", default=None)
+_active_trace = contextvars.ContextVar("telemetry_active_trace", default=None)
+
+
+def _parse_sample_rates(spec: str) -> Dict[str, float]:
+    rates = {}
+    for item in spec.split(","):
+        if "=" in item:
+            endpoint, rate = item.rsplit("=", 1)
+            rates[endpoint.strip()] = max(0.0, min(1.0, float(rate)))
+    return rates
+
+
+ENDPOINT_SAMPLE_RATES = _parse_sample_rates(TELEMETRY_ENDPOINT_SAMPLE_RATES)
+
+
+def sample_rate(endpoint: Optional[str]) -> float:
+    return ENDPOINT_SAMPLE_RATES.get(endpoint or "", TELEMETRY_SAMPLE_RATE)
+
+
+def begin_request(endpoint: Optional[str]):
+    """Head-based sampling: decide once per request/job whether its traces are kept"""
+    _endpoint.set(endpoint)
+    _sampled.set(TELEMETRY_ENABLED and random.random() < sample_rate(endpoint))
+
+
+@contextmanager
+def sampling_scope(endpoint: str):
+    """Sampling decision for work outside a Flask request (background jobs, scripts)"""
+    endpoint_token = _endpoint.set(endpoint)
+    sampled_token = _sampled.set(TELEMETRY_ENABLED and random.random() < sample_rate(endpoint))
+    try:
+        yield
+    finally:
+        _sampled.reset(sampled_token)
+        _endpoint.reset(endpoint_token)
+
+
+def is_sampled() -> bool:
+    sampled = _sampled.get()
+    if sampled is None:
+        # No request decided yet (e.g. a script) - decide now for this context
+        begin_request(None)
+        sampled = _sampled.get()
+    return sampled
+
+
+def _now() -> float:
+    return time.time()
+
+
+def _timestamp(seconds: Optional[float]) -> Optional[datetime]:
+    return datetime.fromtimestamp(seconds, tz=timezone.utc) if seconds else None
+
+
+def _as_dict(value: Any, key: str) -> Optional[Dict[str, Any]]:
+    """Opik wants dict inputs/outputs"""
+    if value is None or isinstance(value, dict):
+        return value
+    return {key: value}
+
+
+def _truncate(value: Any) -> Any:
+    """JSON-safe copy of a span payload with long strings cut (runs in the exporter, not the request)"""
+    if isinstance(value, str):
+        return value if len(value) <= TELEMETRY_MAX_FIELD_CHARS else value[:TELEMETRY_MAX_FIELD_CHARS] + "...[truncated]"
+    if isinstance(value, dict):
+        return {str(key): _truncate(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_truncate(item) for item in value]
+    if value is None or isinstance(value, (int, float, bool)):
+        return value
+    return _truncate(str(value))
+
+
+def _redact(value: Any) -> Any:
+    """Copy of a (truncated) span payload with every string replaced by its length and hash"""
+    if isinstance(value, str):
+        digest = hashlib.sha256(value.encode("utf-8")).hexdigest()[:12]
+        return f"[redacted {len(value)} chars sha256:{digest}]"
+    if isinstance(value, dict):
+        return {key: _redact(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_redact(item) for item in value]
+    return value
+
+
+def _redact_error(error: Optional[str]) -> Optional[str]:
+    """Keep the exception type of a "Type: message" error, redact the message"""
+    if not error:
+        return error
+    kind, _, message = error.partition(": ")
+    return f"{kind}: {_redact(message)}"
+
+
+def _redact_trace(trace: Dict[str, Any]) -> Dict[str, Any]:
+    """Trace dict safe to write to the spool: inputs, outputs and errors of the trace and its spans redacted"""
+    return dict(
+        trace,
+        input=_redact(trace["input"]),
+        output=_redact(trace["output"]),
+        error=_redact_error(trace["error"]),
+        spans=[
+            dict(span, input=_redact(span.get("input")), output=_redact(span.get("output")),
+                 error=_redact_error(span.get("error")))
+            for span in trace["spans"]
+        ]
+    )
+
+
+class TraceRecord:
+    """One trace and its spans, collected in memory until the root finishes"""
+
+    __slots__ = ("id", "name", "endpoint", "start_time", "end_time", "input", "output", "error", "metadata", "spans")
+
+    def __init__(self, name: str, input: Any = None, metadata: Optional[Dict[str, Any]] = None):
+        self.id = str(uuid.uuid4())
+        self.name = name
+        self.endpoint = _endpoint.get()
+        self.start_time = _now()
+        self.end_time = None
+        self.input = input
+        self.output = None
+        self.error = None
+        self.metadata = metadata or {}
+        self.spans: List[Dict[str, Any]] = []
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "endpoint": self.endpoint,
+            "start_time": self.start_time,
+            "end_time": self.end_time,
+            "input": _truncate(self.input),
+            "output": _truncate(self.output),
+            "error": self.error,
+            "metadata": _truncate(self.metadata),
+            "spans": [
+                dict(span, input=_truncate(span.get("input")), output=_truncate(span.get("output")))
+                for span in self.spans
+            ]
+        }
+
+
+class TelemetryExporter:
+    """
+    Ring buffer of finished traces drained by a background thread
+
+    enqueue() is the only call on the request path: an append to a bounded deque.
+    The exporter thread ships traces to Opik every TELEMETRY_FLUSH_INTERVAL seconds;
+    when an export fails (Opik configured but unreachable), traces are spooled to
+    local disk as JSON lines, redacted unless TELEMETRY_SPOOL_REDACT is false, and
+    re-sent once exports succeed again. Without an Opik client nothing is recorded
+    or spooled. A full buffer drops the oldest trace.
+    """
+
+    def __init__(self, buffer_size: int = TELEMETRY_BUFFER_SIZE, spool_dir: str = TELEMETRY_SPOOL_DIR):
+        self._buffer = deque(maxlen=buffer_size)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._client = None
+        self.spool_dir = spool_dir
+        self.graph_definition = None
+        self.counters = {"enqueued": 0, "exported": 0, "spooled": 0, "respooled": 0, "dropped": 0}
+        self.last_error = None
+
+    def set_client(self, client):
+        """Opik client to export to; telemetry stays off until one is set"""
+        self._client = client
+
+    @property
+    def active(self) -> bool:
+        return TELEMETRY_ENABLED and self._client is not None
+
+    def enqueue(self, record: TraceRecord):
+        with self._lock:
+            if len(self._buffer) == self._buffer.maxlen:
+                self.counters["dropped"] += 1
+            self._buffer.append(record)
+            self.counters["enqueued"] += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="telemetry-exporter", daemon=True)
+                self._thread.start()
+
+    def _drain(self) -> List[TraceRecord]:
+        with self._lock:
+            records = list(self._buffer)
+            self._buffer.clear()
+        return records
+
+    def _run(self):
+        while True:
+            time.sleep(TELEMETRY_FLUSH_INTERVAL)
+            self.flush()
+
+    def flush(self):
+        """Export everything buffered, then retry the disk spool if Opik is reachable"""
+        records = self._drain()
+        if records:
+            traces = [record.to_dict() for record in records]
+            if self._export(traces):
+                self.counters["exported"] += len(traces)
+            else:
+                self._spool(traces)
+                return
+        self._resend_spool()
+
+    def _export(self, traces: List[Dict[str, Any]]) -> bool:
+        try:
+            for trace in traces:
+                self._export_trace(trace)
+            if self._client.flush(timeout=TELEMETRY_EXPORT_TIMEOUT) is False:
+                raise Exception("Opik flush timed out")
+        except Exception as e:
+            if self.last_error is None:
+                print(f"⚠️  Telemetry export failed, spooling to disk until Opik is reachable: {e}")
+            self.last_error = str(e)
+            return False
+        if self.last_error is not None:
+            print("✅ Telemetry export recovered - sending spooled traces")
+            self.last_error = None
+        return True
+
+    def _export_trace(self, trace: Dict[str, Any]):
+        metadata = dict(trace["metadata"], endpoint=trace["endpoint"])
+        if trace["error"]:
+            metadata["error"] = trace["error"]
+        if self.graph_definition:
+            metadata["_opik_graph_definition"] = self.graph_definition
+        opik_trace = self._client.trace(
+            name=trace["name"],
+            start_time=_timestamp(trace["start_time"]),
+            end_time=_timestamp(trace["end_time"]),
+            input=_as_dict(trace["input"], "input"),
+            output=_as_dict(trace["output"], "output"),
+            metadata=metadata,
+            tags=OPIK_TRACE_CONFIG["tags"]
+        )
+        created = {}
+        for span in sorted(trace["spans"], key=lambda item: item["start_time"]):
+            span_metadata = dict(span.get("metadata") or {})
+            if span.get("error"):
+                span_metadata["error"] = span["error"]
+            parent = created.get(span["parent_id"], opik_trace)
+            created[span["id"]] = parent.span(
+                name=span["name"],
+                type=span["type"],
+                start_time=_timestamp(span["start_time"]),
+                end_time=_timestamp(span["end_time"]),
+                input=_as_dict(span["input"], "input"),
+                output=_as_dict(span["output"], "output"),
+                metadata=span_metadata or None
+            )
+
+    def _spool(self, traces: List[Dict[str, Any]]):
+        try:
+            os.makedirs(self.spool_dir, exist_ok=True)
+            path = os.path.join(self.spool_dir, f"traces-{int(time.time() * 1000)}-{uuid.uuid4().hex[:6]}.jsonl")
+            with open(path, "w", encoding="utf-8") as f:
+                for trace in traces:
+                    if TELEMETRY_SPOOL_REDACT:
+                        trace = _redact_trace(trace)
+                    f.write(json.dumps(trace, default=str) + "\n")
+            self.counters["spooled"] += len(traces)
+            self._trim_spool()
+        except OSError as e:
+            self.counters["dropped"] += len(traces)
+            print(f"⚠️  Telemetry spool write failed, dropping {len(traces)} traces: {e}")
+
+    def _spool_files(self) -> List[str]:
+        if not os.path.isdir(self.spool_dir):
+            return []
+        return sorted(
+            os.path.join(self.spool_dir, name) for name in os.listdir(self.spool_dir) if name.endswith(".jsonl")
+        )
+
+    def _trim_spool(self):
+        """Keep the spool under TELEMETRY_SPOOL_MAX_MB by deleting the oldest files"""
+        files = self._spool_files()
+        total = sum(os.path.getsize(path) for path in files)
+        while files and total > TELEMETRY_SPOOL_MAX_MB * 1024 * 1024:
+            oldest = files.pop(0)
+            total -= os.path.getsize(oldest)
+            with open(oldest, encoding="utf-8") as f:
+                self.counters["dropped"] += sum(1 for _ in f)
+            os.remove(oldest)
+
+    def _resend_spool(self):
+        for path in self._spool_files():
+            with open(path, encoding="utf-8") as f:
+                traces = [json.loads(line) for line in f if line.strip()]
+            if not self._export(traces):
+                return  # still unreachable; keep the rest for the next cycle
+            os.remove(path)
+            self.counters["respooled"] += len(traces)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.active,
+            "default_sample_rate": TELEMETRY_SAMPLE_RATE,
+            "endpoint_sample_rates": ENDPOINT_SAMPLE_RATES,
+            "buffered": len(self._buffer),
+            "buffer_size": self._buffer.maxlen,
+            "spool_files": len(self._spool_files()),
+            "counters": dict(self.counters),
+            "last_error": self.last_error
+        }
+
+
+class BufferedTraceHandler(BaseCallbackHandler):
+    """
+    LangChain callback handler that records runs as spans in memory and hands
+    finished traces to the exporter. Shared by every processor; runs of
+    unsampled requests are ignored. Nested under an active @traced function
+    when there is one.
+    """
+
+    def __init__(self, exporter: TelemetryExporter):
+        self.exporter = exporter
+        self._lock = threading.Lock()
+        self._runs: Dict[Any, tuple] = {}   # run_id -> (TraceRecord, span, owns_trace)
+
+    def _start(self, run_id, parent_run_id, name: str, span_type: str, inputs: Any, metadata=None):
+        with self._lock:
+            parent = self._runs.get(parent_run_id) if parent_run_id else None
+        if parent_run_id and parent is None:
+            return  # child of an unsampled run
+        if parent is None and not (self.exporter.active and is_sampled()):
+            return
+        span = {
+            "id": str(run_id),
+            "parent_id": None,
+            "name": name,
+            "type": span_type,
+            "start_time": _now(),
+            "end_time": None,
+            "input": inputs,
+            "output": None,
+            "metadata": metadata
+        }
+        if parent is not None:
+            record, owns = parent[0], False
+            span["parent_id"] = parent[1]["id"]
+        else:
+            active = _active_trace.get()
+            if active is not None:
+                # Top-level run inside a @traced function: a span under the function's root span
+                record, owns = active[0], False
+                span["parent_id"] = record.spans[0]["id"]
+            else:
+                record, owns = TraceRecord(name, input=inputs), True
+        record.spans.append(span)
+        with self._lock:
+            self._runs[run_id] = (record, span, owns)
+
+    def _end(self, run_id, output: Any = None, error: Optional[BaseException] = None):
+        with self._lock:
+            entry = self._runs.pop(run_id, None)
+        if entry is None:
+            return
+        record, span, owns = entry
+        span["end_time"] = _now()
+        span["output"] = output
+        if error is not None:
+            span["error"] = f"{type(error).__name__}: {error}"
+        if owns:
+            record.end_time = span["end_time"]
+            record.output = output
+            record.error = span.get("error")
+            self.exporter.enqueue(record)
+
+    @staticmethod
+    def _name(serialized, kwargs, default: str) -> str:
+        if kwargs.get("name"):
+            return kwargs["name"]
+        serialized = serialized or {}
+        return serialized.get("name") or (serialized.get("id") or [default])[-1]
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, **kwargs):
+        self._start(run_id, parent_run_id, self._name(serialized, kwargs, "chain"), "general", inputs)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._end(run_id, outputs)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=error)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, **kwargs):
+        inputs = [[{"role": message.type, "content": message.content} for message in batch] for batch in messages]
+        metadata = {"invocation_params": kwargs.get("invocation_params")}
+        self._start(run_id, parent_run_id, self._name(serialized, kwargs, "llm"), "llm", {"messages": inputs}, metadata)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, parent_run_id=None, **kwargs):
+        self._start(run_id, parent_run_id, self._name(serialized, kwargs, "llm"), "llm", {"prompts": prompts})
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        generations = [[generation.text for generation in batch] for batch in response.generations]
+        self._end(run_id, {"generations": generations, "llm_output": response.llm_output})
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=error)
+
+
+def traced(name: str):
+    """
+    Decorator: record a function call as a sampled trace (LangChain runs inside
+    it become its spans). Unsampled calls run with no telemetry work at all.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not telemetry_exporter.active or _active_trace.get() is not None or not is_sampled():
+                return func(*args, **kwargs)
+            record = TraceRecord(name, input={"function": func.__qualname__})
+            root = {"id": str(uuid.uuid4()), "parent_id": None, "name": name, "type": "general",
+                    "start_time": record.start_time, "end_time": None, "input": None, "output": None, "metadata": None}
+            record.spans.append(root)
+            token = _active_trace.set((record, True))
+            try:
+                result = func(*args, **kwargs)
+                record.output = {"result_type": type(result).__name__}
+                return result
+            except Exception as e:
+                record.error = f"{type(e).__name__}: {e}"
+                raise
+            finally:
+                _active_trace.reset(token)
+                record.end_time = root["end_time"] = _now()
+                root["output"] = record.output
+                telemetry_exporter.enqueue(record)
+        return wrapper
+    return decorator
+
+
+# Process-wide exporter and callback handler, built once
+telemetry_exporter = TelemetryExporter()
+trace_handler = BufferedTraceHandler(telemetry_exporter) if BaseCallbackHandler is not object else None
+atexit.register(telemetry_exporter.flush)
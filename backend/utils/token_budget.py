@@ -0,0 +1,156 @@
+import re
+import json
+import threading
+from collections import defaultdict
+from typing import Dict, Any, Iterable, Optional
+
+from .prompt import TOKEN_BUDGET_CONFIG
+
+# tiktoken gives exact counts for OpenAI models; without it we fall back to ~4 chars/token
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+
+_encodings = {}
+_encodings_lock = threading.Lock()
+
+PLACEHOLDER_PATTERN = re.compile(r"\{[a-z_]+\}")
+
+
+def _load_encoding(model: str):
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+
+def _get_encoding(model: str):
+    """
+    tiktoken encoding for the model, or None when it is not installed or cannot be
+    loaded (the BPE file is downloaded on first use, which fails offline). The
+    outcome is cached, so a failed load is not retried on every request.
+    """
+    if not TIKTOKEN_AVAILABLE:
+        return None
+    with _encodings_lock:
+        if model not in _encodings:
+            try:
+                _encodings[model] = _load_encoding(model)
+            except Exception as e:
+                print(f"⚠️  tiktoken encoding for {model} unavailable ({type(e).__name__}: {e}) "
+                      f"- estimating ~4 chars/token")
+                _encodings[model] = None
+        return _encodings[model]
+
+
+def count_tokens(text: str, model: str = TOKEN_BUDGET_CONFIG["model"]) -> int:
+    """Token count for a prompt section (exact with tiktoken, estimated otherwise)"""
+    if not text:
+        return 0
+    encoding = _get_encoding(model)
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model: str = TOKEN_BUDGET_CONFIG["model"]) -> str:
+    """Cut text to at most max_tokens, marking the cut"""
+    if count_tokens(text, model) <= max_tokens:
+        return text
+    encoding = _get_encoding(model)
+    if encoding is not None:
+        truncated = encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens])
+    else:
+        truncated = text[:max_tokens * 4]
+    return truncated + f"\n[DOCUMENT TRUNCATED - SHOWING FIRST {max_tokens} TOKENS]"
+
+
+_boilerplate = [re.compile(pattern, re.IGNORECASE) for pattern in TOKEN_BUDGET_CONFIG["boilerplate_patterns"]]
+
+
+def compact_text(text: str) -> str:
+    """
+    Strip layout whitespace and boilerplate lines (generator footers, disclaimers)
+    from document text; page breaks become plain line breaks
+    """
+    lines = []
+    for line in text.splitlines():
+        line = re.sub(r"[ \t]+", " ", line).strip()
+        if line and any(pattern.search(line) for pattern in _boilerplate):
+            continue
+        if not line and (not lines or not lines[-1]):
+            continue  # collapse runs of blank lines
+        lines.append(line)
+    return "\n".join(lines).strip()
+
+
+def _prune(value: Any, drop_fields: frozenset) -> Any:
+    if isinstance(value, dict):
+        pruned = {}
+        for key, item in value.items():
+            if key in drop_fields:
+                continue
+            item = _prune(item, drop_fields)
+            if item in (None, "", [], {}):
+                continue
+            pruned[key] = item
+        return pruned
+    if isinstance(value, list):
+        return [_prune(item, drop_fields) for item in value]
+    return value
+
+
+def compact_json(value: Any, drop_fields: Optional[Iterable[str]] = None) -> str:
+    """
+    JSON for prompts: no indentation, no bookkeeping fields (raw LLM output,
+    trace ids, per-chunk metadata) and no empty values
+    """
+    drop = frozenset(TOKEN_BUDGET_CONFIG["drop_fields"] if drop_fields is None else drop_fields)
+    return json.dumps(_prune(value, drop), separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+class PromptTokenLog:
+    """
+    Per-call prompt token accounting, broken down by prompt section
+    Totals are kept per call name so a benchmark or status endpoint can report them.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals = defaultdict(lambda: defaultdict(int))
+        self._calls = defaultdict(int)
+        self._template_tokens = {}
+
+    def template_tokens(self, template: str) -> int:
+        """Tokens in the static part of a template (cached per template)"""
+        key = hash(template)
+        if key not in self._template_tokens:
+            self._template_tokens[key] = count_tokens(PLACEHOLDER_PATTERN.sub("", template))
+        return self._template_tokens[key]
+
+    def record(self, call: str, template: str, sections: Dict[str, str]) -> Dict[str, int]:
+        """Count tokens per section, log them, and add them to the running totals"""
+        counts = {name: count_tokens(text) for name, text in sections.items()}
+        counts["template"] = self.template_tokens(template)
+        counts["total"] = sum(counts.values())
+        with self._lock:
+            self._calls[call] += 1
+            for name, tokens in counts.items():
+                self._totals[call][name] += tokens
+        if TOKEN_BUDGET_CONFIG["log_token_counts"]:
+            breakdown = ", ".join(f"{name}={tokens}" for name, tokens in counts.items() if name != "total")
+            print(f"🧮 Prompt tokens [{call}]: {counts['total']} ({breakdown})")
+        return counts
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                call: {"calls": self._calls[call], "tokens": dict(totals)}
+                for call, totals in self._totals.items()
+            }
+
+
+# Process-wide token accounting
+prompt_token_log = PromptTokenLog()
@@ -7,20 +7,129 @@ const api = axios.create({
   timeout: 90000, // 90 seconds for file uploads and AI processing
 });
 
+const JOB_POLL_INTERVAL_MS = 1500;
+const JOB_MAX_WAIT_MS = 10 * 60 * 1000; // analysis runs in the background, so allow long jobs
+
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+const IDEMPOTENT_MAX_ATTEMPTS = 4;
+
+// POST with an Idempotency-Key, retrying network errors, 5xx and 409 (first attempt
+// still running) with the same key - the server replays the first response instead
+// of creating a second claim or re-running the analysis
+const postIdempotent = async (url, data, config = {}) => {
+  const key = crypto.randomUUID();
+  for (let attempt = 1; ; attempt += 1) {
+    try {
+      return await api.post(url, data, {
+        ...config,
+        headers: { ...(config.headers || {}), 'Idempotency-Key': key },
+      });
+    } catch (error) {
+      const status = error.response && error.response.status;
+      const retryable = !status || status >= 500 || status === 409;
+      if (!retryable || attempt >= IDEMPOTENT_MAX_ATTEMPTS) throw error;
+      await sleep(500 * 2 ** (attempt - 1));
+    }
+  }
+};
+
+// Parse a Server-Sent Events response body, calling onEvent(event, data) for each
+// event; resolves with the 'complete' payload
+const readEventStream = async (response, onEvent) => {
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  let result = null;
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    const messages = buffer.split('\n\n');
+    buffer = messages.pop();
+    for (const message of messages) {
+      const event = (message.match(/^event: (.*)$/m) || [])[1];
+      const data = JSON.parse((message.match(/^data: (.*)$/m) || [])[1] || 'null');
+      if (onEvent) onEvent(event, data);
+      if (event === 'error') throw new Error(data.error);
+      if (event === 'complete') result = data;
+    }
+  }
+  return result;
+};
+
+export const jobsAPI = {
+  // Get background job status/progress
+  getJob: async (jobId) => {
+    const response = await api.get(`/jobs/${jobId}`);
+    return response.data;
+  },
+
+  // Poll a job until it finishes; onProgress receives each status payload
+  waitForJob: async (jobId, onProgress) => {
+    const deadline = Date.now() + JOB_MAX_WAIT_MS;
+    while (Date.now() < deadline) {
+      const job = await jobsAPI.getJob(jobId);
+      if (onProgress) onProgress(job);
+      if (job.status === 'succeeded') return job.result;
+      if (job.status === 'failed') throw new Error(job.error || 'Document analysis failed');
+      await sleep(JOB_POLL_INTERVAL_MS);
+    }
+    throw new Error('Timed out waiting for document analysis');
+  },
+};
+
 export const claimsAPI = {
-  // Upload and analyze document
-  uploadDocument: async (file, claimType = 'medical_claim') => {
+  // Upload document; analysis runs as a background job that we poll until done
+  uploadDocument: async (file, claimType = 'medical_claim', onProgress) => {
     const formData = new FormData();
     formData.append('document', file);
     formData.append('claim_type', claimType);
 
-    const response = await api.post('/claims/upload', formData, {
+    const response = await postIdempotent('/claims/upload', formData, {
       headers: {
         'Content-Type': 'multipart/form-data',
       },
-      timeout: 120000, // 2 minutes for document upload and AI processing
     });
-    return response.data;
+    return jobsAPI.waitForJob(response.data.job_id, onProgress);
+  },
+
+  // Upload and analyze with Server-Sent Events progress; onEvent(event, data) is called
+  // for each stage/partial event and the final 'complete' payload is returned
+  uploadDocumentStream: async (file, claimType = 'medical_claim', onEvent) => {
+    const formData = new FormData();
+    formData.append('document', file);
+    formData.append('claim_type', claimType);
+
+    const response = await fetch(`${API_BASE_URL}/claims/upload/stream`, {
+      method: 'POST',
+      body: formData,
+    });
+    if (!response.ok) {
+      const body = await response.json().catch(() => ({}));
+      throw new Error(body.error || `Upload failed with status ${response.status}`);
+    }
+
+    return readEventStream(response, onEvent);
+  },
+
+  // Upload many documents in one request; onEvent(event, data) receives a
+  // 'file_result' per file as it finishes. Returns the final batch summary.
+  uploadDocumentsBatch: async (files, claimType = 'medical_claim', onEvent, maxConcurrency) => {
+    const formData = new FormData();
+    files.forEach((file) => formData.append('documents', file));
+    formData.append('claim_type', claimType);
+    if (maxConcurrency) formData.append('max_concurrency', maxConcurrency);
+
+    const response = await fetch(`${API_BASE_URL}/claims/upload/batch`, {
+      method: 'POST',
+      body: formData,
+    });
+    if (!response.ok) {
+      const body = await response.json().catch(() => ({}));
+      throw new Error(body.error || `Batch upload failed with status ${response.status}`);
+    }
+    return readEventStream(response, onEvent);
   },
 
   // Analyze text directly
@@ -36,7 +145,7 @@ export const claimsAPI = {
 
   // Submit traditional claim
   submitClaim: async (claimData) => {
-    const response = await api.post('/claims/submit', claimData);
+    const response = await postIdempotent('/claims/submit', claimData);
     return response.data;
   },
 